@@ -0,0 +1,64 @@
+# Auswertung: Vollscan über alle Transkripte vs. Lesen der Rollups (inkl. inkrementeller Nachbuchung).
+#
+#   python -m benchmarks.bench_analytics --rows 50000
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from interview_store import InterviewStore, analytics
+
+from .synthetic import generate_interviews, transcript
+
+
+def full_scan(store):
+    # Bisheriger Weg: alle Transkripte lesen und pro Rerun neu zählen
+    per_interviewer = {}
+    with store.pool.connection() as conn:
+        for _, day, interviewer, text, duration_ms in conn.execute(analytics.SQL_STATS_SOURCE):
+            entry = per_interviewer.setdefault(interviewer, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += len(analytics.WORD_RE.findall(text or ''))
+            entry[2] += duration_ms or 0
+    return per_interviewer
+
+
+def dashboard(store):
+    analytics.refresh(store)
+    return analytics.summary(store), analytics.per_day(store), analytics.per_interviewer(store)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:38s} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Auswertung (Rollups)")
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--edits', type=int, default=20, help="geänderte Interviews vor dem zweiten Dashboard-Aufruf")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InterviewStore(os.path.join(tmp, 'analytics.db'))
+        store.init_database()
+        generate_interviews(store, args.rows, words=args.words)
+        print(f"{args.rows} Interviews")
+
+        timed("Vollscan (alle Transkripte)", full_scan, store)
+        timed(f"Backfill ({'pandas' if analytics.pd is not None else 'inkrementell'})", analytics.rebuild, store)
+        timed("Dashboard (nur Rollups)", dashboard, store)
+        rng = random.Random(1)
+        for interview_id in rng.sample(range(1, args.rows + 1), args.edits):
+            store.update_interview_transcription(interview_id, transcript(rng, args.words))
+        timed(f"Dashboard nach {args.edits} Änderungen", dashboard, store)
+        timed("Top-Begriffe (fts5vocab)", analytics.top_terms, store)
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
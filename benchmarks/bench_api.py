@@ -0,0 +1,163 @@
+# Lasttest der HTTP-API: N gleichzeitige Clients (Keep-Alive) mit gemischter Last.
+# Ohne --url wird eine lokale Instanz mit temporärer Datenbank im selben Prozess gestartet.
+#
+#   python -m benchmarks.bench_api --clients 32 --seconds 10
+#   python -m benchmarks.bench_api --url http://127.0.0.1:8600 --clients 16
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from interview_store import InterviewStore
+from interview_store.api import InterviewApi
+
+from .synthetic import generate_interviews, transcript
+
+SEARCH_TERMS = ["Storch", "Greifvogel", "Igel", "Familie", "Pflegestation"]
+
+
+class Client:
+    # Minimaler HTTP/1.1-Client mit einer Keep-Alive-Verbindung
+    def __init__(self, host, port, token=''):
+        self.host, self.port, self.token = host, port, token
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write(head.encode() + b'\r\n' + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            payload = b''
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                payload += chunk[:-2]
+            return status, payload
+        payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        return status, json.loads(payload) if payload else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def user(client, rng, deadline, timings, errors):
+    async def call(name, method, path, body=None):
+        start = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+        return payload
+
+    created = await call('POST /interviews', 'POST', '/interviews',
+                         {'interviewer': 'Lasttest', 'interviewee_info': 'Bench', 'metadata': {}})
+    interview_id, seq = created['id'], 0
+    while time.perf_counter() < deadline:
+        op = rng.random()
+        if op < 0.35:
+            seq += 1
+            await call('POST segments', 'POST', f'/interviews/{interview_id}/segments',
+                       {'segments': [{'seq': seq, 'text': transcript(rng, 12)}]})
+        elif op < 0.6:
+            await call('GET /interviews/{id}', 'GET', f'/interviews/{interview_id}')
+        elif op < 0.75:
+            await call('GET /interviews', 'GET', '/interviews?limit=20')
+        elif op < 0.85:
+            await call('GET /search', 'GET', f'/search?q={quote(rng.choice(SEARCH_TERMS))}')
+        elif op < 0.95:
+            await call('PATCH notes', 'PATCH', f'/interviews/{interview_id}', {'notes': f"Notiz {rng.random():.5f}"})
+        else:
+            await call('POST /batch', 'POST', '/batch', [
+                {'method': 'GET', 'path': f'/interviews/{interview_id}'},
+                {'method': 'PATCH', 'path': f'/interviews/{interview_id}', 'body': {'notes': 'Batch'}},
+            ])
+
+
+async def run_load(host, port, clients, seconds, token):
+    timings, errors = {}, {}
+    deadline = time.perf_counter() + seconds
+    pool = [Client(host, port, token) for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(user(c, random.Random(i), deadline, timings, errors) for i, c in enumerate(pool)))
+    elapsed = time.perf_counter() - start
+    for c in pool:
+        c.close()
+    return timings, errors, elapsed
+
+
+def start_local_server(rows, threads):
+    tmp = tempfile.mkdtemp()
+    store = InterviewStore(os.path.join(tmp, 'api.db'), pool_size=threads)
+    store.init_database()
+    generate_interviews(store, rows, words=200)
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        api = InterviewApi(store, threads)
+        state['server'] = loop.run_until_complete(api.start('127.0.0.1', 0))
+        state['port'] = state['server'].sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return '127.0.0.1', state['port']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest der Interview-API")
+    parser.add_argument('--url', help="Laufende Instanz, z.B. http://127.0.0.1:8600 (sonst lokal gestartet)")
+    parser.add_argument('--token', default=os.environ.get('API_TOKEN', ''))
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=10000, help="Interviews in der lokalen Testdatenbank")
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = start_local_server(args.rows, args.threads)
+        print(f"Lokale Instanz auf Port {port} mit {args.rows} Interviews")
+
+    timings, errors, elapsed = asyncio.run(run_load(host, port, args.clients, args.seconds, args.token))
+    total = sum(len(t) for t in timings.values())
+    print(f"{args.clients} Clients, {elapsed:.1f} s: {total} Anfragen, {total / elapsed:.0f} req/s, Fehler: {errors or 'keine'}")
+    everything = []
+    for name, values in sorted(timings.items()):
+        everything.extend(values)
+        values.sort()
+        print(f"{name:24s} n={len(values):6d}  p50 {statistics.median(values) * 1000:7.1f} ms  "
+              f"p99 {values[max(0, int(len(values) * 0.99) - 1)] * 1000:7.1f} ms")
+    everything.sort()
+    print(f"{'gesamt':24s} n={len(everything):6d}  p50 {statistics.median(everything) * 1000:7.1f} ms  "
+          f"p99 {everything[max(0, int(len(everything) * 0.99) - 1)] * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
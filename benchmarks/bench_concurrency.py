@@ -0,0 +1,112 @@
+# Simuliert N gleichzeitige Streamlit-Sessions (Threads in einem Prozess),
+# die Interviews anlegen, Transkriptionen speichern und die Übersicht lesen.
+#
+#   python -m benchmarks.bench_concurrency --sessions 8 --ops 200
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from interview_store import InterviewStore
+
+TEXT = "Grüezi, mir händ de Storch bim Pflegestation gseh und d Füetterig isch spannend gsi. " * 20
+
+
+class NaiveStore:
+    # Altes Verhalten: eine Verbindung pro Aufruf, Standard-Journal
+    def __init__(self, path):
+        self.path = path
+
+    def init_database(self):
+        store = InterviewStore(self.path)
+        store.init_database()
+        store.close()
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+
+    def save_interview(self, data):
+        conn = sqlite3.connect(self.path)
+        cursor = conn.execute('INSERT INTO interviews (interview_date, interviewer, interviewee_info, transcription, notes, metadata) VALUES (?, ?, ?, ?, ?, ?)',
+                              (data['date'], data['interviewer'], '', '', '', '{}'))
+        conn.commit()
+        conn.close()
+        return cursor.lastrowid
+
+    def update_interview_transcription(self, interview_id, text):
+        conn = sqlite3.connect(self.path)
+        conn.execute('UPDATE interviews SET transcription = ? WHERE id = ?', (text, interview_id))
+        conn.commit()
+        conn.close()
+
+    def get_interview_by_id(self, interview_id):
+        conn = sqlite3.connect(self.path)
+        row = conn.execute('SELECT * FROM interviews WHERE id = ?', (interview_id,)).fetchone()
+        conn.close()
+        return row
+
+    def list_interviews_page(self):
+        conn = sqlite3.connect(self.path)
+        rows = conn.execute('SELECT id, interview_date, interviewer FROM interviews ORDER BY created_at DESC, id DESC LIMIT 20').fetchall()
+        conn.close()
+        return rows
+
+    def close(self):
+        pass
+
+
+def session(store, ops, latencies, errors):
+    try:
+        interview_id = store.save_interview({'date': '2026-05-01', 'interviewer': 'Bench'})
+    except sqlite3.OperationalError:
+        errors.append(-1)
+        return
+    for i in range(ops):
+        start = time.perf_counter()
+        try:
+            if i % 4 == 0:
+                store.update_interview_transcription(interview_id, TEXT[: (i + 1) * 10])
+            elif i % 4 == 1:
+                store.get_interview_by_id(interview_id)
+            else:
+                store.list_interviews_page()
+        except sqlite3.OperationalError:
+            errors.append(i)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(name, store, sessions, ops):
+    store.init_database()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=session, args=(store, ops, latencies, errors)) for _ in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float('nan')
+    print(f"{name:8s} {len(latencies) / elapsed:10.0f} ops/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms   "
+          f"Fehler {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency-Benchmark für die Interview-DB")
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=200)
+    args = parser.parse_args()
+    print(f"{args.sessions} Sessions x {args.ops} Operationen")
+    with tempfile.TemporaryDirectory() as tmp:
+        run('naiv', NaiveStore(os.path.join(tmp, 'naive.db')), args.sessions, args.ops)
+        run('pool', InterviewStore(os.path.join(tmp, 'pool.db'), pool_size=args.sessions), args.sessions, args.ops)
+
+
+if __name__ == '__main__':
+    main()
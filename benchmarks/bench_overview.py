@@ -0,0 +1,59 @@
+# Benchmark der Übersicht: Datenbankarbeit pro Rerun (Anzahl + eine Seite Metadaten) für 100 bis 50 000 Interviews.
+# Zum Vergleich die frühere Abfrage (alle Zeilen inkl. Transkription bei jedem Rerun).
+#
+#   python -m benchmarks.bench_overview --rows 100,1000,10000,50000
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from interview_store import PAGE_SIZE, InterviewStore
+
+from .synthetic import generate_interviews
+
+
+def overview_rerun(store: InterviewStore):
+    # Wie die Übersicht in der App: count_interviews() + list_interviews_page()
+    total = store.count_interviews()
+    page = store.list_interviews_page(None, PAGE_SIZE)
+    return total, [f"Interview #{r['id']} - {r['date']} - {r['interviewer']}" for r in page]
+
+
+def full_listing(store: InterviewStore):
+    # Frühere Übersicht: alle Interviews mit Transkription und Notizen
+    with store.pool.connection() as conn:
+        return conn.execute('SELECT id, interview_date, interviewer, interviewee_info, transcription, notes '
+                            'FROM interviews ORDER BY created_at DESC').fetchall()
+
+
+def measure(fn, store: InterviewStore, repeat: int) -> float:
+    fn(store)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(store)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der paginierten Übersicht")
+    parser.add_argument('--rows', default='100,1000,10000,50000', help="Kommagetrennte Datenbankgrössen")
+    parser.add_argument('--words', type=int, default=300, help="Wörter pro Transkription")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    print(f"{'Zeilen':>8} {'Seite ms':>10} {'alle Zeilen ms':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(value) for value in args.rows.split(',')):
+            store = InterviewStore(os.path.join(tmp, f'interviews_{rows}.db'))
+            store.init_database()
+            generate_interviews(store, rows, words=args.words)
+            page_ms = measure(overview_rerun, store, args.repeat)
+            full_ms = measure(full_listing, store, max(1, args.repeat // 10))
+            print(f"{rows:>8} {page_ms:10.2f} {full_ms:15.2f}")
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# Batch-Berichte: eine ganze Saison als ZIP bzw. Sammeldokument.
+#
+#   python -m benchmarks.bench_reports --rows 5000
+import argparse
+import os
+import tempfile
+import time
+
+from interview_store import InterviewStore
+from interview_store.reports import ReportCache, build_report
+
+from .synthetic import generate_interviews
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    data, count = fn()
+    print(f"{label:28s} {time.perf_counter() - start:7.2f} s   {count} Interviews, {len(data) / 1e6:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Berichtserstellung")
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InterviewStore(os.path.join(tmp, 'reports.db'))
+        store.init_database()
+        generate_interviews(store, args.rows)
+
+        timed("ZIP", lambda: build_report(store, 'zip', cache=None))
+        cache = ReportCache()
+        timed("HTML, Cache kalt", lambda: build_report(store, 'html', cache=cache))
+        timed("HTML, Cache warm", lambda: build_report(store, 'html', cache=cache))
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Transkript speichern: ganze Spalte neu schreiben vs. Patch (mit periodischem Kompaktieren).
+# Gemessen werden Zeit und WAL-Bytes pro Speichern bei einer kleinen Korrektur in einem langen Text.
+#
+#   python -m benchmarks.bench_revisions --words 9000 --saves 300
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from interview_store import InterviewStore
+from interview_store import revisions
+
+from .synthetic import transcript
+
+
+def wal_bytes(store: InterviewStore) -> int:
+    return os.path.getsize(store.pool.path + '-wal')
+
+
+def run(store: InterviewStore, interview_id: int, words, saves: int, rng: random.Random, save) -> tuple:
+    # Ohne automatischen Checkpoint entspricht die WAL-Grösse den insgesamt geschriebenen Seiten
+    with store.pool.connection() as conn:
+        conn.execute('PRAGMA wal_autocheckpoint = 0')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    start = time.perf_counter()
+    for _ in range(saves):
+        words[rng.randrange(len(words))] = rng.choice(('Storch', 'Weissstorch', 'Rotmilan', 'Graureiher'))
+        save(interview_id, ' '.join(words))
+    return (time.perf_counter() - start) / saves, wal_bytes(store) / saves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Transkript als Patch statt Volltext speichern")
+    parser.add_argument('--words', type=int, default=9000, help="Länge des Transkripts (ca. 1 h Gespräch)")
+    parser.add_argument('--saves', type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InterviewStore(os.path.join(tmp, 'bench.db'), pool_size=1)
+        store.init_database()
+        text = transcript(rng, args.words)
+        full_id = store.save_interview({'interviewer': 'Bench', 'transcription': text})
+        patch_id = store.save_interview({'interviewer': 'Bench', 'transcription': text})
+        # Ausgangssnapshot anlegen, damit er nicht in die Messung eingeht
+        revisions.save_transcript(store, patch_id, text, compact=True)
+        print(f"Transkript: {len(text)} Zeichen, {args.saves} Korrekturen à ein Wort")
+
+        full = run(store, full_id, text.split(' '), args.saves, rng, store.update_interview_transcription)
+
+        state = {'base': revisions.load_transcript(store, patch_id)}
+
+        def save_patch(interview_id, new_text):
+            state['base'] = revisions.save_transcript(store, interview_id, new_text, base=state['base'])
+
+        patch = run(store, patch_id, text.split(' '), args.saves, rng, save_patch)
+        assert store.get_interview_by_id(patch_id)['transcription'] == state['base'][1]
+        compactions = sum(entry['note'] == 'Kompaktiert' for entry in revisions.history(store, patch_id))
+
+        print(f"{'Volltext':<10} {full[0] * 1000:8.2f} ms/Speichern {full[1] / 1024:10.1f} KiB WAL/Speichern")
+        print(f"{'Patch':<10} {patch[0] * 1000:8.2f} ms/Speichern {patch[1] / 1024:10.1f} KiB WAL/Speichern"
+              f"  (inkl. {compactions} Kompaktierungen)")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
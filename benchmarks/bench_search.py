@@ -0,0 +1,45 @@
+# Latenz der Volltextsuche (FTS5) bei grossen Datenbeständen.
+#
+#   python -m benchmarks.bench_search --rows 100000
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from interview_store import InterviewStore
+
+from .synthetic import generate_interviews
+
+QUERIES = ["Storch", "Greifvogel", "Mäusebussard Flügel", "verletzt Igel", "Auswild", "Uhu Nest Kinder"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Volltextsuche")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=200, help="mittlere Wörter pro Transkription")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InterviewStore(os.path.join(tmp, 'search.db'))
+        store.init_database()
+        start = time.perf_counter()
+        generate_interviews(store, args.rows, words=args.words)
+        print(f"{args.rows} Interviews indexiert in {time.perf_counter() - start:.1f} s")
+
+        for query in QUERIES:
+            timings = []
+            for page in range(args.repeat):
+                t = time.perf_counter()
+                store.count_search_results(query)
+                store.search_interviews(query, offset=(page % 5) * 20)
+                timings.append(time.perf_counter() - t)
+            timings.sort()
+            print(f"{query:22s} p50 {statistics.median(timings) * 1000:8.1f} ms   "
+                  f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:8.1f} ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# Gesamt-Benchmark der Hot Paths über mehrere Datenbankgrössen: Übersicht und App-Rerun (Abfragen pro Rerun),
+# Einzelbericht (früher generate_pdf_simple), JSON-Export, Speichern und Nachschlagen.
+# Ergebnisse als JSON speichern und mit einem früheren Lauf vergleichen (Exit-Code 1 bei Regression).
+#
+#   python -m benchmarks.bench_suite --rows 1000,10000,100000 --data-dir ~/.cache/interview-bench -o neu.json
+#   python -m benchmarks.bench_suite --rows 1000,10000 --compare alt.json
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from interview_store import PAGE_SIZE, InterviewStore, export_interviews
+from interview_store import revisions
+from interview_store.reports import render_interview_report
+from interview_store.stt import job_stats
+from interview_store.vocabulary import load_normalizer
+
+from .synthetic import generate_interviews, transcript
+
+# Teure Fälle (ganze Tabelle) werden seltener wiederholt
+SLOW_CASES = {'export_json'}
+
+
+def dataset(rows: int, words: int, data_dir: str, tmp: str) -> str:
+    # Datensätze einmal erzeugen und wiederverwenden; gemessen wird auf einer Kopie (Schreibfälle verändern sie)
+    source = os.path.join(data_dir or tmp, f'interviews_{rows}_{words}.db')
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        store = InterviewStore(source)
+        store.init_database()
+        generate_interviews(store, rows, words=words)
+        with store.pool.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        store.close()
+        print(f"Datensatz {rows} Interviews erzeugt in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    target = os.path.join(tmp, f'run_{rows}.db')
+    shutil.copyfile(source, target)
+    return target
+
+
+def cases(store: InterviewStore, rows: int, words: int, rng: random.Random):
+    ids = [rng.randint(1, rows) for _ in range(1000)]
+    next_id = iter(ids * 10)
+    edit = {'id': None, 'base': None, 'words': None}
+    recording = {'id': ids[0], 'seq': store.last_segment_seq(ids[0])}
+
+    def overview():
+        # Was die Übersicht pro Rerun liest und aufbereitet: Anzahl, erste Seite, Beschriftungen
+        total = store.count_interviews()
+        page = store.list_interviews_page(None, PAGE_SIZE)
+        return total, [f"#{r['id']} - {r['date']} - {r['interviewer']} ({r['length']} Zeichen)" for r in page]
+
+    def rerun():
+        # Abfragen eines Reruns der App mit geöffnetem Interview (Aufnahme-Tab, Notizen, Vokabular, Übersicht)
+        load_normalizer(store).to_component()
+        job_stats(store, recording['id'])
+        store.get_interview_by_id(recording['id'], cached=True)
+        load_normalizer(store)
+        return overview()
+
+    def rerun_recording():
+        # Rerun durch die Aufnahme: ein neues Live-Segment übernehmen
+        recording['seq'] += 1
+        store.append_segments(recording['id'], [{'seq': recording['seq'], 'text': 'Ein Weissstorch'}])
+        return rerun()
+
+    def overview_page_10():
+        # Zehnmal "Weiter" (Keyset-Cursor); kleine Datensätze beginnen am Ende wieder vorne
+        cursor = None
+        for _ in range(10):
+            page = store.list_interviews_page(cursor, PAGE_SIZE)
+            cursor = (page[-1]['created_at'], page[-1]['id']) if len(page) == PAGE_SIZE else None
+        return page
+
+    def export_json():
+        with open(os.devnull, 'w', encoding='utf-8') as fh:
+            return export_interviews(store, fh, 'json')
+
+    def save_transcript_edit():
+        # Ein Wort korrigieren und als Patch speichern (wie Autosave im Editor)
+        if edit['id'] is None:
+            edit['id'] = next(next_id)
+            edit['base'] = revisions.load_transcript(store, edit['id'])
+            edit['words'] = edit['base'][1].split(' ')
+        edit['words'][rng.randrange(len(edit['words']))] = 'Weissstorch'
+        text = ' '.join(edit['words'])
+        edit['base'] = revisions.save_transcript(store, edit['id'], text, base=edit['base'])
+
+    return {
+        'overview': overview,
+        'overview_page_10': overview_page_10,
+        'rerun': rerun,
+        'rerun_recording': rerun_recording,
+        'lookup': lambda: store.get_interview_by_id(next(next_id)),
+        'lookup_cached': lambda: store.get_interview_by_id(ids[0], cached=True),
+        'search': lambda: (store.count_search_results('Storch'), store.search_interviews('Storch', PAGE_SIZE)),
+        'report_single': lambda: render_interview_report(store, next(next_id), cache=None),
+        'export_json': export_json,
+        'save_interview': lambda: store.save_interview({'interviewer': 'Bench', 'interviewee_info': 'Benchmark',
+                                                       'transcription': transcript(rng, words), 'metadata': {}}),
+        'save_transcript_edit': save_transcript_edit,
+        'update_notes': lambda: store.update_interview_notes(next(next_id), 'Notiz ' * rng.randint(1, 20)),
+    }
+
+
+def measure(store: InterviewStore, fn, repeat: int) -> dict:
+    fn()  # Aufwärmen (Verbindungen, Statement-Cache)
+    times, queries = [], []
+    for _ in range(repeat):
+        before = store.pool.query_count()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+        queries.append(store.pool.query_count() - before)
+    times.sort()
+    return {'median_ms': round(statistics.median(times), 3),
+            'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+            'queries': statistics.median(queries)}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for rows, by_case in results['results'].items():
+        for case, result in by_case.items():
+            old = baseline.get('results', {}).get(rows, {}).get(case)
+            if not old:
+                continue
+            ratio = result['median_ms'] / old['median_ms'] if old['median_ms'] else 1.0
+            marker = ''
+            # Kleine absolute Unterschiede (< 0.5 ms) sind Messrauschen
+            if ratio > threshold and result['median_ms'] - old['median_ms'] > 0.5:
+                marker = '  <-- Regression'
+                regressions.append((rows, case, ratio))
+            elif result['queries'] > old['queries']:
+                marker = f"  <-- mehr SQL ({old['queries']} -> {result['queries']})"
+                regressions.append((rows, case, ratio))
+            print(f"{rows:>8} {case:22} {old['median_ms']:9.2f} -> {result['median_ms']:9.2f} ms  x{ratio:5.2f}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Suite der Hot Paths (Übersicht, Berichte, Export, Speichern, Nachschlagen)")
+    parser.add_argument('--rows', default='100,1000,10000,50000', help="Kommagetrennte Datenbankgrössen, z.B. 1000,10000,100000")
+    parser.add_argument('--words', type=int, default=400, help="mittlere Wörter pro Transkription (ca. 3 min Gespräch)")
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--slow-repeat', type=int, default=3, help="Wiederholungen für den kompletten Export")
+    parser.add_argument('--cases', help="Nur diese Fälle (kommagetrennt)")
+    parser.add_argument('--data-dir', help="Erzeugte Datensätze hier ablegen und wiederverwenden")
+    parser.add_argument('-o', '--output', help="Ergebnisse als JSON schreiben")
+    parser.add_argument('--compare', help="Mit früheren Ergebnissen (JSON) vergleichen")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Faktor, ab dem ein Median als Regression gilt")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+    selected = set(args.cases.split(',')) if args.cases else None
+    results = {'meta': {'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                        'sqlite': sqlite3.sqlite_version, 'platform': platform.platform(), 'words': args.words,
+                        'repeat': args.repeat},
+               'results': {}}
+    print(f"{'Zeilen':>8} {'Fall':22} {'Median ms':>10} {'p95 ms':>10} {'SQL':>5}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(value) for value in args.rows.split(',')):
+            store = InterviewStore(dataset(rows, args.words, args.data_dir, tmp))
+            store.init_database()
+            by_case = results['results'][str(rows)] = {}
+            for name, fn in cases(store, rows, args.words, random.Random(rows)).items():
+                if selected and name not in selected:
+                    continue
+                result = by_case[name] = measure(store, fn, args.slow_repeat if name in SLOW_CASES else args.repeat)
+                print(f"{rows:>8} {name:22} {result['median_ms']:10.2f} {result['p95_ms']:10.2f} {result['queries']:5.0f}")
+            store.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        print(f"\nVergleich mit {args.compare} ({baseline['meta'].get('created', '?')}):")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Abgleich zweier Stationen: Erstabgleich vs. Delta nach wenigen Änderungen.
+#
+#   python -m benchmarks.bench_sync --rows 100000 --changes 100
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+from interview_store import InterviewStore, sync
+
+from .synthetic import generate_interviews
+
+
+def transfer(source, target):
+    # Wie sync_stores, aber mit Messung der übertragenen Zeilen und Bytes
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    exported = sync.export_delta(source, buffer, peer=sync.site_id(target),
+                                 since=sync.imported_seq(target, sync.site_id(source)))
+    size = buffer.tell()
+    buffer.seek(0)
+    imported = sync.import_delta(target, buffer)
+    return exported['rows'], size, imported, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Stationsabgleichs")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--changes', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kiosk = InterviewStore(os.path.join(tmp, 'kiosk.db'))
+        central = InterviewStore(os.path.join(tmp, 'central.db'))
+        kiosk.init_database()
+        central.init_database()
+        generate_interviews(kiosk, args.rows, words=args.words)
+
+        rows, size, result, seconds = transfer(kiosk, central)
+        print(f"Erstabgleich        {rows:8d} Zeilen  {size / 1024 ** 2:8.1f} MB  {seconds:7.2f} s")
+
+        rng = random.Random(3)
+        for interview_id in rng.sample(range(1, args.rows + 1), args.changes):
+            kiosk.update_interview_notes(interview_id, f"Nachtrag {rng.random():.6f}")
+        rows, size, result, seconds = transfer(kiosk, central)
+        print(f"Delta ({args.changes} geändert) {rows:8d} Zeilen  {size / 1024:8.1f} KB  {seconds:7.2f} s  "
+              f"({result['updated']} aktualisiert)")
+
+        rows, size, result, seconds = transfer(central, kiosk)
+        print(f"Rückrichtung        {rows:8d} Zeilen  {size / 1024:8.1f} KB  {seconds:7.2f} s")
+        kiosk.close()
+        central.close()
+
+
+if __name__ == '__main__':
+    main()
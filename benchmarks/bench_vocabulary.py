@@ -0,0 +1,68 @@
+# Vokabular-Normalisierung: N einzelne Regex-Durchläufe vs. eine kombinierte Regex.
+#
+#   python -m benchmarks.bench_vocabulary --rules 1000 --segments 5000
+import argparse
+import random
+import re
+import time
+
+from interview_store.vocabulary import Normalizer
+
+from .synthetic import transcript
+
+PREFIXES = "Rot Schwarz Gross Klein Mittel Grau Weiss Gelb Blau Grün Wald Berg Wasser Sumpf Feld Garten Haus Turm Zwerg Kiefern".split()
+SUFFIXES = "milan specht meise falke reiher ammer fink drossel taucher läufer sänger schnäpper rotschwanz kauz eule ente gans möwe".split()
+
+
+def make_rules(count: int, rng: random.Random):
+    # Dialekt-/Erkennungsvarianten (klein geschrieben, ohne Umlaut) -> korrekter Artname
+    rules, names = [], [p + s for p in PREFIXES for s in SUFFIXES]
+    rng.shuffle(names)
+    for name in names:
+        variant = name.lower().replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
+        rules.append({'pattern': variant, 'replacement': name, 'whole_word': True})
+        if len(rules) >= count:
+            break
+    while len(rules) < count:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(5, 12)))
+        rules.append({'pattern': word, 'replacement': word.capitalize(), 'whole_word': True})
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Vokabular-Normalisierung")
+    parser.add_argument('--rules', type=int, default=1000)
+    parser.add_argument('--segments', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    rules = make_rules(args.rules, rng)
+    names = [rule['pattern'] for rule in rules[:200]]
+    segments = [transcript(rng, 12) + ' ' + rng.choice(names) for _ in range(args.segments)]
+
+    start = time.perf_counter()
+    naive = [(re.compile(r'(?<!\w)' + re.escape(r['pattern']) + r'(?!\w)', re.IGNORECASE), r['replacement']) for r in rules]
+    naive_compile = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = []
+    for segment in segments:
+        for pattern, replacement in naive:
+            segment = pattern.sub(replacement, segment)
+        expected.append(segment)
+    naive_run = time.perf_counter() - start
+
+    start = time.perf_counter()
+    normalizer = Normalizer(rules, version=1)
+    combined_compile = time.perf_counter() - start
+    start = time.perf_counter()
+    result = [normalizer.normalize(segment) for segment in segments]
+    combined_run = time.perf_counter() - start
+
+    assert result == expected, "Kombinierte Regex liefert andere Ergebnisse"
+    print(f"{args.rules} Regeln, {args.segments} Segmente")
+    print(f"einzeln      kompilieren {naive_compile * 1000:8.1f} ms   {naive_run / args.segments * 1e6:9.1f} µs/Segment")
+    print(f"kombiniert   kompilieren {combined_compile * 1000:8.1f} ms   {combined_run / args.segments * 1e6:9.1f} µs/Segment")
+
+
+if __name__ == '__main__':
+    main()
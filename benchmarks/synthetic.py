@@ -0,0 +1,55 @@
+# Synthetische Interviews für Benchmarks (deterministisch über seed)
+import json
+import random
+from datetime import datetime, timedelta
+
+COMMON = (
+    "der die das und ist nicht ein eine mir händ gsi isch au scho no chli gseh de am im vo mit "
+    "Vogel Vögel Besuch Kinder Familie spannend schön interessant wichtig gelernt Natur Wald See"
+).split()
+# Fachbegriffe kommen selten vor, wie in echten Interviews
+RARE = (
+    "Storch Störche Greifvogel Greifvögel Mäusebussard Turmfalke Eule Uhu Schwalbe Mauersegler "
+    "Amsel Igel Pflegestation Füetterig Flügel Nest Junge Auswilderung Tierarzt traurig verletzt gesund"
+).split()
+INTERVIEWERS = ["Anna", "Beat", "Carla", "Daniel", "Eva", "Fabio"]
+
+
+def transcript(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        n = min(words, rng.randint(6, 16))
+        sentence = ' '.join(rng.choice(RARE) if rng.random() < 0.01 else rng.choice(COMMON) for _ in range(n))
+        sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        words -= n
+    return ' '.join(sentences)
+
+
+def generate_interviews(store, count: int, words: int = 400, seed: int = 42, batch: int = 1000):
+    rng = random.Random(seed)
+    start = datetime(2026, 4, 1, 9, 0)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(minutes=7 * i)
+        rows.append((
+            created.date().isoformat(),
+            rng.choice(INTERVIEWERS),
+            f"{rng.randint(8, 80)} Jahre, {rng.choice(['Familie', 'Schulklasse', 'allein', 'Paar'])}",
+            transcript(rng, rng.randint(words // 2, words * 3 // 2)),
+            rng.choice(['', '', 'Sehr interessiert an Greifvögeln', 'Kinder wollten den Storch sehen']),
+            json.dumps({'duration_s': rng.randint(120, 1800)}),
+            created.strftime('%Y-%m-%d %H:%M:%S'),
+        ))
+        if len(rows) >= batch:
+            _insert(store, rows)
+            rows = []
+    if rows:
+        _insert(store, rows)
+
+
+def _insert(store, rows):
+    with store.pool.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO interviews (interview_date, interviewer, interviewee_info, transcription, notes, metadata, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
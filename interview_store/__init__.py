@@ -0,0 +1,4 @@
+from .db import DB_PATH, PAGE_SIZE, ConnectionPool, InterviewStore
+from .export import export_interviews, export_to_tempfile
+
+__all__ = ['DB_PATH', 'PAGE_SIZE', 'ConnectionPool', 'InterviewStore', 'export_interviews', 'export_to_tempfile']
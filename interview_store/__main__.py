@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+
+from .db import DB_PATH, InterviewStore
+from .audio import AUDIO_DIR, AUDIO_MAX_AGE_DAYS, AUDIO_MAX_BYTES, AudioStore
+from .export import FORMATS, export_interviews
+from . import analytics, api, jobs, migrations, profiling, retranscribe, revisions, sync, vocabulary
+from .stt import BACKENDS, STT_BACKEND, STT_MODEL, STT_WORKERS, SttWorkerPool, job_stats
+
+
+def cmd_rebuild_search(store: InterviewStore, args):
+    count = store.rebuild_search_index()
+    print(f"Suchindex neu aufgebaut: {count} Interviews")
+
+
+def cmd_export(store: InterviewStore, args):
+    filters = {'date_from': args.date_from, 'date_to': args.date_to, 'interviewer': args.interviewer}
+    if args.output == '-':
+        count = export_interviews(store, sys.stdout, args.format, **filters)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as fh:
+            count = export_interviews(store, fh, args.format, **filters)
+    print(f"{count} Interviews exportiert", file=sys.stderr)
+
+
+def cmd_stt_worker(store: InterviewStore, args):
+    pool = SttWorkerPool(args.db, backend=args.backend, workers=args.workers, model=args.model).start()
+    print(f"{args.workers} STT-Worker ({args.backend}) gestartet, Abbruch mit Ctrl+C", file=sys.stderr)
+    try:
+        while pool.alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+def cmd_stt_stats(store: InterviewStore, args):
+    stats = job_stats(store)
+    print(f"Warteschlange: {stats['queued']}  läuft: {stats['running']}  fertig: {stats['done']}  fehlgeschlagen: {stats['failed']}")
+    print(f"Wartezeit Ø {stats['avg_wait_ms']:.0f} ms  Verarbeitung Ø {stats['avg_processing_ms']:.0f} ms  "
+          f"Echtzeitfaktor {stats['real_time_factor']:.2f}")
+
+
+def cmd_audio(store: InterviewStore, args):
+    audio_store = AudioStore(store, args.audio_dir)
+    if args.retention:
+        result = audio_store.enforce_retention(int(args.max_gb * 1024 ** 3), args.max_age_days)
+        print(f"Audio von {result['interviews']} Interviews entfernt, {result['blobs']} Dateien gelöscht")
+    usage = audio_store.usage()
+    ratio = usage['stored_bytes'] / usage['pcm_bytes'] if usage['pcm_bytes'] else 0
+    print(f"{usage['interviews']} Interviews, {usage['chunks']} Chunks, {usage['blobs']} Dateien, "
+          f"{usage['stored_bytes'] / 1024 ** 2:.1f} MB auf Disk (Kompression {ratio:.0%})")
+
+
+def cmd_retranscribe(store: InterviewStore, args):
+    def report(stats):
+        print(f"#{stats['run_id']}: {stats['processed']} Interviews (bis id {stats['last_interview_id']}), "
+              f"{stats['interviews_per_min']:.0f} Interviews/min, {stats['chars_per_sec']:.0f} Zeichen/s"
+              + (f", {stats['skipped']} zwischenzeitlich geändert (nicht übernommen)" if stats['skipped'] else ''), file=sys.stderr)
+
+    config = None
+    if args.resume is None:
+        vocabulary_version = args.vocabulary_version
+        if args.rules:
+            vocabulary_version = vocabulary.save_rules(store, vocabulary.read_rules_file(args.rules), f"Import {args.rules}")
+        config = retranscribe.default_config(store, args.source, vocabulary_version, args.apply, args.backend,
+                                             args.model, args.audio_dir)
+    report(retranscribe.run(store, config, resume=args.resume, workers=args.workers, limit=args.limit, progress=report))
+
+
+def cmd_vocabulary(store: InterviewStore, args):
+    if args.import_file:
+        rules = vocabulary.read_rules_file(args.import_file)
+        if args.replace:
+            version = vocabulary.save_rules(store, rules, f"Import {args.import_file}")
+        else:
+            version = vocabulary.add_rules(store, rules, f"Import {args.import_file}")
+        print(f"Vokabular-Version {version} gespeichert")
+    for entry in vocabulary.list_versions(store)[:args.limit]:
+        print(f"v{entry['version']:<5} {entry['rules']:6} Regeln  {entry['created_at']}  {entry['note'] or ''}")
+
+
+def cmd_analytics(store: InterviewStore, args):
+    if args.rebuild:
+        print(f"Kennzahlen für {analytics.rebuild(store)} Interviews neu berechnet", file=sys.stderr)
+    else:
+        analytics.refresh(store)
+    total = analytics.summary(store, args.date_from, args.date_to)
+    wpm = f"{total['words_per_minute']:.0f}" if total['words_per_minute'] is not None else '-'
+    print(f"{total['interviews']} Interviews, Ø {total['avg_words']:.0f} Wörter / {total['avg_chars']:.0f} Zeichen, {wpm} Wörter/min")
+    for row in analytics.per_interviewer(store, args.date_from, args.date_to):
+        print(f"  {row['interviewer'] or '-':<20} {row['interviews']:6} Interviews  Ø {row['avg_words']:6.0f} Wörter")
+    print("Häufigste Begriffe: " + ', '.join(f"{t['term']} ({t['count']})" for t in analytics.top_terms(store, args.terms)))
+
+
+def cmd_migrate(store: InterviewStore, args):
+    # Ausstehende Migrationen hat main() bereits über init_database() angewendet
+    for entry in migrations.history(store.pool):
+        print(f"v{entry['version']:<3} {entry['applied_at']}  {entry['description']}")
+    if args.check:
+        failed = 0
+        for result in migrations.check_query_plans(store.pool):
+            print(f"{'OK  ' if result['ok'] else 'FEHLER'} {result['name']}: {result['plan'][0] if result['plan'] else ''}")
+            for problem in result['problems']:
+                print(f"       {problem}")
+            failed += not result['ok']
+        if failed:
+            sys.exit(1)
+
+
+def cmd_api(store: InterviewStore, args):
+    # Eigener Store: Verbindungspool so gross wie der Thread-Pool der API
+    api_store = InterviewStore(args.db, pool_size=args.threads)
+    print(f"API auf http://{args.host}:{args.port} ({args.threads} DB-Threads), Abbruch mit Ctrl+C", file=sys.stderr)
+    try:
+        asyncio.run(api.serve(api_store, args.host, args.port, args.threads))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api_store.close()
+
+
+def cmd_revisions(store: InterviewStore, args):
+    if args.rollback is not None:
+        rev = revisions.rollback(store, args.interview, args.rollback)
+        print(f"Interview #{args.interview} auf Revision {args.rollback} zurückgesetzt (neue Revision {rev})")
+    if args.compact:
+        print(f"{revisions.compact_pending(store)} Interviews kompaktiert")
+    if args.interview is not None:
+        for entry in revisions.history(store, args.interview)[:args.limit]:
+            print(f"r{entry['rev']:<5} {entry['kind']:8} {entry['size']:8} Zeichen  {entry['created_at']}  {entry['note'] or ''}")
+    pending = revisions.pending_stats(store)
+    print(f"Offen: {pending['patches']} Patches ({pending['chars']} Zeichen) in {pending['interviews']} Interviews", file=sys.stderr)
+
+
+def cmd_profile(store: InterviewStore, args):
+    # Auswertung einer PROFILE_LOG-Datei, gruppiert nach Release und Art (rerun/api)
+    entries = profiling.read_log(args.log)
+    print(f"{'Release':<16} {'Art':<6} {'Anzahl':>7} {'p50 ms':>9} {'p95 ms':>9} {'SQL/Eintrag':>12} {'SQL ms':>8}")
+    for row in profiling.summarize(entries):
+        print(f"{row['release'] or '-':<16} {row['kind']:<6} {row['count']:7} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+              f"{row['sql_count']:12.1f} {row['sql_ms']:8.1f}")
+    totals = {}
+    for entry in entries:
+        for statement in entry.get('top_sql', []):
+            count, ms = totals.get(statement['sql'], (0, 0.0))
+            totals[statement['sql']] = (count + statement['count'], ms + statement['ms'])
+    print("Teuerste Anweisungen:")
+    for sql, (count, ms) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:args.top]:
+        print(f"  {ms:9.1f} ms {count:7}x  {sql[:100]}")
+
+
+def cmd_jobs(store: InterviewStore, args):
+    if args.submit:
+        params = {'format': args.format} if args.format else {}
+        job_id = jobs.submit(store, args.submit, params, dedupe_key=args.submit if args.submit in jobs.MAINTENANCE else None)
+        print(f"Auftrag #{job_id} ({args.submit}) eingereiht" if job_id else f"{args.submit} ist bereits eingereiht", file=sys.stderr)
+    if args.cancel is not None:
+        print(f"Auftrag #{args.cancel} abgebrochen" if jobs.cancel(store, args.cancel) else f"Auftrag #{args.cancel} läuft nicht mehr",
+              file=sys.stderr)
+    if args.worker:
+        pool = jobs.JobWorkerPool(args.db, workers=args.threads).start()
+        print(f"{args.threads} Auftrags-Worker gestartet, Abbruch mit Ctrl+C", file=sys.stderr)
+        try:
+            while pool.alive():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.stop()
+        return
+    for job in jobs.list_jobs(store, args.limit):
+        artifact = f"  {job['artifact_path']} ({job['artifact_bytes'] / 1024 ** 2:.1f} MB, bis {job['expires_at']})" if job['artifact_path'] else ''
+        print(f"#{job['id']:<6} {job['kind']:20} {job['status']:9} {job['progress']:4.0%}  {job['enqueued_at']}  "
+              f"{job['error'] or job['message'] or ''}{artifact}")
+    counts = jobs.job_counts(store)
+    print(' '.join(f"{status}: {count}" for status, count in sorted(counts.items())) or "Keine Aufträge", file=sys.stderr)
+
+
+def open_sync_file(path: str, mode: str):
+    # *.gz wird transparent komprimiert
+    if path == '-':
+        return sys.stdout if 'w' in mode else sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def cmd_sync(store: InterviewStore, args):
+    def show(result):
+        print(f"{result['site']}: {result['rows']} Zeilen, {result['inserted']} neu, {result['updated']} aktualisiert, "
+              f"{result['skipped']} unverändert, {result['conflicts']} Konflikte", file=sys.stderr)
+
+    if args.merge:
+        other = InterviewStore(args.merge)
+        try:
+            other.init_database()
+            for result in sync.sync_stores(store, other):
+                show(result)
+        finally:
+            other.close()
+    if args.import_file:
+        with open_sync_file(args.import_file, 'r') as fh:
+            show(sync.import_delta(store, fh))
+    if args.export_file:
+        fh = open_sync_file(args.export_file, 'w')
+        try:
+            result = sync.export_delta(store, fh, peer=args.peer, since=args.since)
+        finally:
+            if fh is not sys.stdout:
+                fh.close()
+        print(f"{result['rows']} geänderte Interviews exportiert (change_seq {result['since']}..{result['until']})", file=sys.stderr)
+    print(f"Station {sync.site_id(store)}", file=sys.stderr)
+    for peer in sync.peers(store):
+        print(f"  {peer['site']}  exportiert bis {peer['exported_seq']}, importiert bis {peer['imported_seq']}  ({peer['updated_at']})", file=sys.stderr)
+    for conflict in sync.conflicts(store, args.conflicts):
+        print(f"  Konflikt {conflict['detected_at']}: {conflict['uuid']} – Fassung von {conflict['loser']['changed_by']} unterlegen", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m interview_store', description="Wartung der Interview-Datenbank")
+    parser.add_argument('--db', default=DB_PATH, help="Pfad zur SQLite-Datei (Standard: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser('rebuild-search', help="Volltextindex (FTS5) neu aufbauen / nachfüllen")
+    rebuild.set_defaults(func=cmd_rebuild_search)
+
+    export = commands.add_parser('export', help="Interviews gestreamt als NDJSON/CSV/JSON exportieren")
+    export.add_argument('--format', choices=FORMATS, default='ndjson')
+    export.add_argument('--from', dest='date_from', help="Interviewdatum ab (YYYY-MM-DD)")
+    export.add_argument('--to', dest='date_to', help="Interviewdatum bis einschliesslich (YYYY-MM-DD)")
+    export.add_argument('--interviewer', help="Nur Interviews dieser Person")
+    export.add_argument('-o', '--output', default='-', help="Zieldatei (Standard: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    worker = commands.add_parser('stt-worker', help="Server-seitige Spracherkennung (Worker-Prozesse) starten")
+    worker.add_argument('--backend', choices=sorted(BACKENDS), default=STT_BACKEND or 'stub')
+    worker.add_argument('--workers', type=int, default=STT_WORKERS)
+    worker.add_argument('--model', default=STT_MODEL, help="Pfad zum Modell (Vosk-Verzeichnis bzw. whisper.cpp-Datei)")
+    worker.set_defaults(func=cmd_stt_worker)
+
+    stats = commands.add_parser('stt-stats', help="Status und Laufzeiten der STT-Aufträge anzeigen")
+    stats.set_defaults(func=cmd_stt_stats)
+
+    audio = commands.add_parser('audio', help="Audio-Speicher anzeigen und Aufbewahrungsregeln anwenden")
+    audio.add_argument('--audio-dir', default=AUDIO_DIR)
+    audio.add_argument('--retention', action='store_true', help="Älteste Aufnahmen löschen, bis die Grenzen eingehalten sind")
+    audio.add_argument('--max-gb', type=float, default=AUDIO_MAX_BYTES / 1024 ** 3)
+    audio.add_argument('--max-age-days', type=int, default=AUDIO_MAX_AGE_DAYS)
+    audio.set_defaults(func=cmd_audio)
+
+    retrans = commands.add_parser('retranscribe', help="Interviews erneut nachbearbeiten bzw. aus Audio transkribieren")
+    retrans.add_argument('--source', choices=('text', 'audio'), default='text')
+    retrans.add_argument('--rules', help="JSON-Datei mit Regeln; wird vorher als neue Vokabular-Version gespeichert")
+    retrans.add_argument('--vocabulary-version', type=int, help="Bestimmte Vokabular-Version statt der aktuellen verwenden")
+    retrans.add_argument('--backend', choices=sorted(BACKENDS), default=STT_BACKEND or 'stub')
+    retrans.add_argument('--model', default=STT_MODEL)
+    retrans.add_argument('--audio-dir', default=AUDIO_DIR)
+    retrans.add_argument('--workers', type=int, default=2)
+    retrans.add_argument('--limit', type=int, help="Höchstens so viele Interviews in diesem Durchgang")
+    retrans.add_argument('--apply', action='store_true', help="Neue Fassung auch als aktuelle Transkription übernehmen")
+    retrans.add_argument('--resume', type=int, metavar='RUN_ID', help="Abgebrochenen Lauf ab dem letzten Checkpoint fortsetzen")
+    retrans.set_defaults(func=cmd_retranscribe)
+
+    vocab = commands.add_parser('vocabulary', help="Vokabular-Regeln (Dialekt, Vogelnamen) anzeigen und importieren")
+    vocab.add_argument('--import', dest='import_file', help="JSON-Datei: [{pattern, replacement, whole_word}] oder [[muster, ersatz], ...]")
+    vocab.add_argument('--replace', action='store_true', help="Bestehende Regeln ersetzen statt ergänzen")
+    vocab.add_argument('--limit', type=int, default=10)
+    vocab.set_defaults(func=cmd_vocabulary)
+
+    stats_cmd = commands.add_parser('analytics', help="Kennzahlen (Rollups) anzeigen bzw. komplett neu berechnen")
+    stats_cmd.add_argument('--rebuild', action='store_true', help="Alle Rollups neu berechnen (vektorisiert, falls pandas installiert ist)")
+    stats_cmd.add_argument('--from', dest='date_from', help="Interviewdatum ab (YYYY-MM-DD)")
+    stats_cmd.add_argument('--to', dest='date_to', help="Interviewdatum bis einschliesslich (YYYY-MM-DD)")
+    stats_cmd.add_argument('--terms', type=int, default=15)
+    stats_cmd.set_defaults(func=cmd_analytics)
+
+    migrate = commands.add_parser('migrate', help="Schema auf den neuesten Stand bringen und Migrationsverlauf anzeigen")
+    migrate.add_argument('--check', action='store_true', help="Abfragepläne (EXPLAIN QUERY PLAN) der Hauptabfragen prüfen; Exit-Code 1 bei Vollscans")
+    migrate.set_defaults(func=cmd_migrate)
+
+    api_cmd = commands.add_parser('api', help="HTTP/JSON-API (Interviews anlegen/ändern, Segmente, Liste, Suche, Export) starten")
+    api_cmd.add_argument('--host', default=api.API_HOST)
+    api_cmd.add_argument('--port', type=int, default=api.API_PORT)
+    api_cmd.add_argument('--threads', type=int, default=api.API_THREADS, help="Threads bzw. SQLite-Verbindungen für Datenbankzugriffe")
+    api_cmd.set_defaults(func=cmd_api)
+
+    rev_cmd = commands.add_parser('revisions', help="Revisionsverlauf der Transkripte anzeigen, kompaktieren, zurücksetzen")
+    rev_cmd.add_argument('--interview', type=int, help="Verlauf dieses Interviews anzeigen")
+    rev_cmd.add_argument('--rollback', type=int, metavar='REV', help="Interview (--interview) auf diese Revision zurücksetzen")
+    rev_cmd.add_argument('--compact', action='store_true', help="Offene Patches aller Interviews in die Transkription übernehmen")
+    rev_cmd.add_argument('--limit', type=int, default=20)
+    rev_cmd.set_defaults(func=cmd_revisions)
+
+    profile_cmd = commands.add_parser('profile', help="Mit PROFILE_LOG aufgezeichnete Laufzeiten auswerten (Vergleich von Releases)")
+    profile_cmd.add_argument('log', help="Protokolldatei (JSON-Zeilen)")
+    profile_cmd.add_argument('--top', type=int, default=10, help="Anzahl der teuersten SQL-Anweisungen")
+    profile_cmd.set_defaults(func=cmd_profile)
+
+    sync_cmd = commands.add_parser('sync', help="Stationen abgleichen: Änderungen exportieren/importieren oder zwei Datenbanken zusammenführen")
+    sync_cmd.add_argument('--export', dest='export_file', metavar='DATEI', help="Delta seit dem letzten Export an --peer schreiben (*.gz komprimiert)")
+    sync_cmd.add_argument('--import', dest='import_file', metavar='DATEI', help="Delta einer anderen Station übernehmen")
+    sync_cmd.add_argument('--merge', metavar='DB', help="Mit einer zweiten SQLite-Datei in beide Richtungen abgleichen")
+    sync_cmd.add_argument('--peer', help="Stations-Kennung des Ziels (merkt sich den Exportstand)")
+    sync_cmd.add_argument('--since', type=int, help="Exportstand (change_seq) überschreiben, 0 = alles")
+    sync_cmd.add_argument('--conflicts', type=int, default=10, help="Anzahl angezeigter Konflikte")
+    sync_cmd.set_defaults(func=cmd_sync)
+
+    jobs_cmd = commands.add_parser('jobs', help="Hintergrundaufträge (Export, Berichte, Wartung) anzeigen, einreihen oder abarbeiten")
+    jobs_cmd.add_argument('--worker', action='store_true', help="Aufträge abarbeiten (statt Worker im App-Prozess, JOB_WORKERS=0)")
+    jobs_cmd.add_argument('--threads', type=int, default=max(1, jobs.JOB_WORKERS))
+    jobs_cmd.add_argument('--submit', choices=list(jobs.TASKS), help="Auftrag einreihen, z.B. backup oder export")
+    jobs_cmd.add_argument('--format', help="Format für export (ndjson, csv, json) bzw. report (zip, html)")
+    jobs_cmd.add_argument('--cancel', type=int, metavar='ID', help="Auftrag abbrechen")
+    jobs_cmd.add_argument('--limit', type=int, default=20)
+    jobs_cmd.set_defaults(func=cmd_jobs)
+
+    args = parser.parse_args(argv)
+    store = InterviewStore(args.db)
+    try:
+        store.init_database()
+        args.func(store, args)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import json
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .db import SQL_TRANSCRIPT, InterviewStore
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+WORD_RE = re.compile(r'\w+')
+REFRESH_BATCH = 500
+
+# Häufige Füllwörter (Hochdeutsch + Dialekt) für die Top-Begriffe ausblenden;
+# Begriffe kommen aus dem FTS-Index, also klein und ohne Umlaute
+STOPWORDS = sorted(set(
+    "aber alle also auch auf aus bei bin bis das dass dem den der des die dies diese doch dort durch ein eine einem "
+    "einen einer eines er es fur gibt hab habe haben hat hatte ich ihr ihre im in ist ja jetzt kann mal man mehr mir "
+    "mit nach nicht noch nur oder schon sehr sich sie sind so uber um und uns von vor war waren was weil wenn wie "
+    "wir wird wo zu zum zur au bim chli de gsi gseh hand isch mer no nod scho vo gsy hani"
+    .split()
+))
+
+ANALYTICS_SCHEMA = (
+    # Von Triggern befüllt: Interviews, deren Kennzahlen neu berechnet werden müssen
+    'CREATE TABLE IF NOT EXISTS analytics_dirty (interview_id INTEGER PRIMARY KEY)',
+    # Kennzahlen pro Interview (Basis für die Deltas in daily_stats)
+    '''CREATE TABLE IF NOT EXISTS interview_stats (
+        interview_id INTEGER PRIMARY KEY,
+        day TEXT NOT NULL,
+        interviewer TEXT NOT NULL,
+        chars INTEGER NOT NULL,
+        words INTEGER NOT NULL,
+        duration_ms INTEGER
+    )''',
+    # Rollup pro Tag und Interviewer*in; timed_* nur für Interviews mit bekannter Dauer (Wörter/Minute)
+    '''CREATE TABLE IF NOT EXISTS daily_stats (
+        day TEXT NOT NULL,
+        interviewer TEXT NOT NULL,
+        interviews INTEGER NOT NULL DEFAULT 0,
+        chars INTEGER NOT NULL DEFAULT 0,
+        words INTEGER NOT NULL DEFAULT 0,
+        timed_words INTEGER NOT NULL DEFAULT 0,
+        duration_ms INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, interviewer)
+    ) WITHOUT ROWID''',
+    # Begriffshäufigkeiten pflegt FTS5 ohnehin; fts5vocab macht sie abfragbar
+    "CREATE VIRTUAL TABLE IF NOT EXISTS interviews_fts_vocab USING fts5vocab (interviews_fts, 'col')",
+    '''CREATE TRIGGER IF NOT EXISTS interviews_analytics_ai AFTER INSERT ON interviews BEGIN
+        INSERT OR IGNORE INTO analytics_dirty VALUES (new.id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS interviews_analytics_au AFTER UPDATE OF interview_date, interviewer, transcription, metadata ON interviews BEGIN
+        INSERT OR IGNORE INTO analytics_dirty VALUES (new.id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS interviews_analytics_ad AFTER DELETE ON interviews BEGIN
+        INSERT OR IGNORE INTO analytics_dirty VALUES (old.id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS interview_segments_analytics_ai AFTER INSERT ON interview_segments BEGIN
+        INSERT OR IGNORE INTO analytics_dirty VALUES (new.interview_id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS audio_chunks_analytics_ai AFTER INSERT ON audio_chunks BEGIN
+        INSERT OR IGNORE INTO analytics_dirty VALUES (new.interview_id);
+    END''',
+)
+
+# Dauer: Angabe in metadata, sonst Zeitspanne der Live-Segmente, sonst Länge der Server-Aufnahme
+SQL_DURATION_MS = '''COALESCE(
+    CAST(interviews.meta_duration_s * 1000 AS INTEGER),
+    (SELECT CASE WHEN COUNT(*) > 1 THEN CAST((julianday(MAX(ts)) - julianday(MIN(ts))) * 86400000 AS INTEGER) END
+     FROM interview_segments WHERE interview_id = interviews.id),
+    (SELECT SUM(duration_ms) FROM audio_chunks WHERE interview_id = interviews.id)
+)'''
+SQL_STATS_SOURCE = f'''
+    SELECT interviews.id, COALESCE(date(interviews.interview_date), substr(interviews.interview_date, 1, 10)),
+           COALESCE(interviews.interviewer, ''), {SQL_TRANSCRIPT}, {SQL_DURATION_MS}
+    FROM interviews
+'''
+SQL_APPLY_DELTA = '''
+    INSERT INTO daily_stats (day, interviewer, interviews, chars, words, timed_words, duration_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, interviewer) DO UPDATE SET
+        interviews = interviews + excluded.interviews, chars = chars + excluded.chars,
+        words = words + excluded.words, timed_words = timed_words + excluded.timed_words,
+        duration_ms = duration_ms + excluded.duration_ms
+'''
+
+StatsRow = Tuple[int, str, str, int, int, Optional[int]]
+
+
+def create_analytics_schema(conn: sqlite3.Connection) -> bool:
+    # Gibt True zurück, wenn die Rollups neu angelegt wurden und alle Interviews nachgerechnet werden müssen
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='interview_stats'").fetchone()
+    for statement in ANALYTICS_SCHEMA:
+        conn.execute(statement)
+    if exists is None:
+        conn.execute('INSERT OR IGNORE INTO analytics_dirty SELECT id FROM interviews')
+    return exists is None
+
+
+def _compute(rows: Sequence[Tuple[int, str, str, Optional[str], Optional[int]]]) -> List[StatsRow]:
+    return [(interview_id, day or '', interviewer, len(text or ''), len(WORD_RE.findall(text or '')), duration_ms)
+            for interview_id, day, interviewer, text, duration_ms in rows]
+
+
+def _delta(stats: StatsRow, sign: int) -> Tuple[Any, ...]:
+    _, day, interviewer, chars, words, duration_ms = stats
+    timed = duration_ms is not None and duration_ms > 0
+    return (day, interviewer, sign, sign * chars, sign * words,
+            sign * words if timed else 0, sign * duration_ms if timed else 0)
+
+
+def pending(store: InterviewStore) -> int:
+    # Nur lesend: wie viele geänderte Interviews noch nicht in den Rollups stehen
+    with store.pool.connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM analytics_dirty').fetchone()[0]
+
+
+def refresh(store: InterviewStore, batch: int = REFRESH_BATCH) -> int:
+    # Inkrementell: nur markierte Interviews neu berechnen und als Differenz in die Rollups buchen.
+    # Läuft als Wartungsauftrag (jobs.py) bzw. auf Knopfdruck, nicht bei jedem Seitenaufbau
+    if not pending(store):
+        return 0
+    total = 0
+    while True:
+        with store.pool.transaction() as conn:
+            ids = [row[0] for row in conn.execute('SELECT interview_id FROM analytics_dirty LIMIT ?', (batch,))]
+            if not ids:
+                return total
+            marks = ','.join('?' * len(ids))
+            old = conn.execute(f'SELECT interview_id, day, interviewer, chars, words, duration_ms FROM interview_stats '
+                               f'WHERE interview_id IN ({marks})', ids).fetchall()
+            new = _compute(conn.execute(f'{SQL_STATS_SOURCE} WHERE interviews.id IN ({marks})', ids).fetchall())
+            conn.executemany(SQL_APPLY_DELTA, [_delta(row, -1) for row in old] + [_delta(row, 1) for row in new])
+            conn.execute(f'DELETE FROM interview_stats WHERE interview_id IN ({marks})', ids)
+            conn.executemany('INSERT INTO interview_stats VALUES (?, ?, ?, ?, ?, ?)', new)
+            conn.execute('DELETE FROM daily_stats WHERE interviews <= 0')
+            conn.execute(f'DELETE FROM analytics_dirty WHERE interview_id IN ({marks})', ids)
+        total += len(ids)
+
+
+def rebuild(store: InterviewStore) -> int:
+    # Backfill: alle Kennzahlen neu; vektorisiert mit pandas/NumPy, sonst über den inkrementellen Weg
+    if pd is None:
+        with store.pool.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO analytics_dirty SELECT id FROM interviews')
+        return refresh(store)
+    # Markierungen und Quelldaten aus demselben Lesestand; danach markierte Interviews bleiben für refresh
+    with store.pool.connection() as conn:
+        conn.execute('BEGIN')
+        try:
+            dirty = [row[0] for row in conn.execute('SELECT interview_id FROM analytics_dirty')]
+            df = pd.read_sql_query(SQL_STATS_SOURCE, conn)
+        finally:
+            conn.execute('COMMIT')
+    df.columns = ['interview_id', 'day', 'interviewer', 'text', 'duration_ms']
+    text = df['text'].fillna('')
+    df['day'] = df['day'].fillna('')
+    df['chars'] = text.str.len().to_numpy(dtype=np.int64)
+    df['words'] = text.str.count(WORD_RE.pattern).to_numpy(dtype=np.int64)
+    duration = df['duration_ms'].to_numpy(dtype=np.float64, na_value=np.nan)
+    timed = np.nan_to_num(duration) > 0
+    df['timed_words'] = np.where(timed, df['words'], 0)
+    df['timed_ms'] = np.where(timed, duration, 0).astype(np.int64)
+    daily = (df.groupby(['day', 'interviewer'], sort=False)
+               .agg(interviews=('interview_id', 'size'), chars=('chars', 'sum'), words=('words', 'sum'),
+                    timed_words=('timed_words', 'sum'), duration_ms=('timed_ms', 'sum'))
+               .reset_index())
+    stats = df[['interview_id', 'day', 'interviewer', 'chars', 'words', 'duration_ms']].astype(object)
+    stats = stats.where(stats.notna(), None)
+    with store.pool.transaction() as conn:
+        conn.execute('DELETE FROM interview_stats')
+        conn.execute('DELETE FROM daily_stats')
+        conn.execute('DELETE FROM analytics_dirty WHERE interview_id IN (SELECT value FROM json_each(?))',
+                     (json.dumps(dirty),))
+        conn.executemany('INSERT INTO interview_stats VALUES (?, ?, ?, ?, ?, ?)',
+                         [(int(r[0]), r[1], r[2], int(r[3]), int(r[4]), None if r[5] is None else int(r[5]))
+                          for r in stats.itertuples(index=False)])
+        conn.executemany('INSERT INTO daily_stats VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         [(r[0], r[1], *(int(v) for v in r[2:])) for r in daily.itertuples(index=False)])
+    return len(df)
+
+
+# Lesen: nur Rollups, nie die Transkripte
+
+def _where(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, List[str]]:
+    clauses, params = [], []
+    if date_from:
+        clauses.append('day >= ?')
+        params.append(date_from)
+    if date_to:
+        clauses.append('day <= ?')
+        params.append(date_to)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def _summary(row: Sequence[Any]) -> Dict[str, Any]:
+    interviews, chars, words, timed_words, duration_ms = (value or 0 for value in row)
+    return {'interviews': interviews, 'chars': chars, 'words': words,
+            'avg_chars': chars / interviews if interviews else 0.0,
+            'avg_words': words / interviews if interviews else 0.0,
+            'words_per_minute': timed_words / (duration_ms / 60000) if duration_ms else None}
+
+
+SQL_SUMS = 'SUM(interviews), SUM(chars), SUM(words), SUM(timed_words), SUM(duration_ms)'
+
+
+def summary(store: InterviewStore, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+    where, params = _where(date_from, date_to)
+    with store.pool.connection() as conn:
+        return _summary(conn.execute(f'SELECT {SQL_SUMS} FROM daily_stats{where}', params).fetchone())
+
+
+def per_day(store: InterviewStore, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    where, params = _where(date_from, date_to)
+    with store.pool.connection() as conn:
+        rows = conn.execute(f'SELECT day, interviewer, interviews, words FROM daily_stats{where} ORDER BY day', params).fetchall()
+    return [{'day': r[0], 'interviewer': r[1], 'interviews': r[2], 'words': r[3]} for r in rows]
+
+
+def per_interviewer(store: InterviewStore, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    where, params = _where(date_from, date_to)
+    with store.pool.connection() as conn:
+        rows = conn.execute(f'SELECT interviewer, {SQL_SUMS} FROM daily_stats{where} GROUP BY interviewer '
+                            f'ORDER BY SUM(interviews) DESC', params).fetchall()
+    return [{'interviewer': r[0], **_summary(r[1:])} for r in rows]
+
+
+SQL_TERM_INTERVIEWS = 'SELECT COUNT(DISTINCT rowid >> 32) FROM interviews_fts WHERE interviews_fts MATCH ?'
+
+
+def top_terms(store: InterviewStore, limit: int = 20, min_length: int = 4) -> List[Dict[str, Any]]:
+    with store.pool.connection() as conn:
+        rows = conn.execute('''
+            SELECT term, cnt FROM interviews_fts_vocab
+            WHERE col = 'transcription' AND length(term) >= ? AND term NOT IN (SELECT value FROM json_each(?))
+            ORDER BY cnt DESC LIMIT ?
+        ''', (min_length, json.dumps(STOPWORDS), limit)).fetchall()
+        # doc zählt Indexzeilen (auch einzelne Live-Segmente), daher Interviews nur für die Top-Begriffe zählen
+        return [{'term': term, 'interviews': conn.execute(SQL_TERM_INTERVIEWS, (f'transcription : "{term}"',)).fetchone()[0],
+                 'count': count} for term, count in rows]
@@ -0,0 +1,329 @@
+import asyncio
+import hmac
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from . import migrations, revisions
+from .profiling import profiler
+from .db import PAGE_SIZE, InterviewStore
+from .export import FORMATS, MIME_TYPES, export_to_tempfile
+
+API_HOST = os.environ.get('API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('API_PORT', '8600'))
+# Threads für SQLite (= Grösse des Verbindungspools) und maximale Anzahl wartender Anfragen
+API_THREADS = int(os.environ.get('API_THREADS', '4'))
+API_MAX_PENDING = int(os.environ.get('API_MAX_PENDING', '256'))
+# Optional: Anfragen nur mit "Authorization: Bearer <token>"
+API_TOKEN = os.environ.get('API_TOKEN', '')
+
+MAX_BODY = 8 * 1024 * 1024
+MAX_BATCH = 500
+STREAM_CHUNK = 64 * 1024
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+           501: 'Not Implemented', 503: 'Service Unavailable'}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FileBody:
+    # Antwort, die aus einer (temporären) Datei gestreamt wird
+    def __init__(self, fh: IO[bytes], content_type: str, filename: str, count: int):
+        self.fh = fh
+        self.content_type = content_type
+        self.filename = filename
+        self.count = count
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({'error': message}, ensure_ascii=False).encode()
+
+
+def _int(query: Dict[str, str], name: str, default: int, maximum: Optional[int] = None) -> int:
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} muss eine Zahl sein") from None
+    if value < 0:
+        raise ApiError(400, f"{name} darf nicht negativ sein")
+    return min(value, maximum) if maximum else value
+
+
+def _object(body: Any) -> Dict[str, Any]:
+    if not isinstance(body, dict):
+        raise ApiError(400, "JSON-Objekt erwartet")
+    return body
+
+
+def _list(body: Any, name: str) -> List[Any]:
+    if not isinstance(body, list):
+        raise ApiError(400, f"{name}: JSON-Liste erwartet")
+    if len(body) > MAX_BATCH:
+        raise ApiError(413, f"Höchstens {MAX_BATCH} Einträge pro Batch")
+    return body
+
+
+def _segment(body: Any) -> Dict[str, Any]:
+    segment = _object(body)
+    # bool ist in Python ein int, als seq aber sicher ein Fehler
+    if not isinstance(segment.get('seq'), int) or isinstance(segment['seq'], bool):
+        raise ApiError(400, "Jedes Segment braucht seq als ganze Zahl")
+    if not isinstance(segment.get('text'), str):
+        raise ApiError(400, f"Segment {segment['seq']}: text muss ein String sein")
+    return segment
+
+
+class InterviewApi:
+    # Routen: (Methode, Pfad-Regex, Handler); Handler laufen im Thread-Pool und liefern (Status, JSON-Daten)
+    ROUTES = (
+        ('GET', r'/health', 'health'),
+        ('GET', r'/interviews', 'list_interviews'),
+        ('POST', r'/interviews', 'create_interview'),
+        ('POST', r'/interviews/batch', 'create_interviews'),
+        ('GET', r'/interviews/(\d+)', 'get_interview'),
+        ('PATCH', r'/interviews/(\d+)', 'update_interview'),
+        ('POST', r'/interviews/(\d+)/segments', 'append_segments'),
+        ('GET', r'/search', 'search'),
+        ('GET', r'/export', 'export'),
+        ('POST', r'/batch', 'batch'),
+    )
+
+    def __init__(self, store: InterviewStore, threads: int = API_THREADS, max_pending: int = API_MAX_PENDING,
+                 token: str = API_TOKEN):
+        self.store = store
+        self.token = token
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api-db')
+        self.routes = [(method, re.compile(pattern + '$'), getattr(self, name)) for method, pattern, name in self.ROUTES]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    # Routing und Handler (synchron, im Thread-Pool)
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler(query, body, *(int(group) for group in match.groups()))
+                allowed = True
+        raise ApiError(405 if allowed else 404, f"{method} {path} nicht unterstützt" if allowed else f"{path} nicht gefunden")
+
+    def health(self, query, body):
+        with self.store.pool.connection() as conn:
+            version = migrations.current_version(conn)
+        return 200, {'status': 'ok', 'schema_version': version}
+
+    def list_interviews(self, query, body):
+        # Keyset-Pagination wie in der Übersicht: cursor = "<created_at>|<id>" aus next_cursor
+        cursor_key = None
+        if query.get('cursor'):
+            created_at, _, last_id = query['cursor'].rpartition('|')
+            if not created_at or not last_id.isdigit():
+                raise ApiError(400, "Ungültiger cursor")
+            cursor_key = (created_at, int(last_id))
+        limit = _int(query, 'limit', PAGE_SIZE, 500) or PAGE_SIZE
+        items = self.store.list_interviews_page(cursor_key, limit)
+        next_cursor = f"{items[-1]['created_at']}|{items[-1]['id']}" if len(items) == limit else None
+        return 200, {'items': items, 'next_cursor': next_cursor}
+
+    def create_interview(self, query, body):
+        return 201, {'id': self.store.save_interview(_object(body))}
+
+    def create_interviews(self, query, body):
+        interviews = [_object(item) for item in _list(body, 'interviews')]
+        return 201, {'ids': self.store.save_interviews(interviews)}
+
+    def get_interview(self, query, body, interview_id):
+        interview = self.store.get_interview_by_id(interview_id, cached=True)
+        if interview is None:
+            raise ApiError(404, f"Interview {interview_id} nicht gefunden")
+        return 200, interview
+
+    def update_interview(self, query, body, interview_id):
+        body = _object(body)
+        if not {'transcription', 'notes'} & body.keys():
+            raise ApiError(400, "transcription und/oder notes erwartet")
+        if self.store.get_interview_by_id(interview_id, cached=True) is None:
+            raise ApiError(404, f"Interview {interview_id} nicht gefunden")
+        if 'transcription' in body:
+            # Als Patch zum letzten Stand, nicht als Neuschreiben des ganzen Textes
+            revisions.save_transcript(self.store, interview_id, str(body['transcription'] or ''), note="API")
+        if 'notes' in body:
+            self.store.update_interview_notes(interview_id, str(body['notes'] or ''))
+        return 200, {'id': interview_id}
+
+    def append_segments(self, query, body, interview_id):
+        # Gleiche Semantik wie die Aufnahme-Komponente: doppelte seq werden ignoriert, Antwort = bestätigte seq
+        segments = _object(body).get('segments')
+        segments = [_segment(segment) for segment in _list(segments, 'segments')]
+        if self.store.get_interview_by_id(interview_id, cached=True) is None:
+            raise ApiError(404, f"Interview {interview_id} nicht gefunden")
+        return 200, {'id': interview_id, 'acked_seq': self.store.append_segments(interview_id, segments)}
+
+    def search(self, query, body):
+        text = query.get('q', '')
+        limit = _int(query, 'limit', PAGE_SIZE, 200)
+        offset = _int(query, 'offset', 0)
+        return 200, {'total': self.store.count_search_results(text),
+                     'items': self.store.search_interviews(text, limit, offset)}
+
+    def export(self, query, body):
+        fmt = query.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            raise ApiError(400, f"format: {', '.join(FORMATS)}")
+        fh, count = export_to_tempfile(self.store, fmt, date_from=query.get('from'), date_to=query.get('to'),
+                                       interviewer=query.get('interviewer'))
+        return 200, FileBody(fh, MIME_TYPES[fmt], f"interviews.{fmt}", count)
+
+    def batch(self, query, body):
+        # Mehrere Operationen mit einer Anfrage: [{method, path, body}] -> [{status, body}]
+        results = []
+        for item in _list(body, 'batch'):
+            try:
+                item = _object(item)
+                url = urlsplit(str(item.get('path', '')))
+                if url.path in ('/batch', '/export'):
+                    raise ApiError(400, f"{url.path} ist im Batch nicht erlaubt")
+                status, payload = self.dispatch(str(item.get('method', 'GET')).upper(), url.path,
+                                                dict(parse_qsl(url.query)), item.get('body'))
+            except ApiError as e:
+                status, payload = e.status, {'error': e.message}
+            results.append({'status': status, 'body': payload})
+        return 200, results
+
+    def execute(self, method: str, path: str, query: Dict[str, str], raw_body: bytes) -> Tuple[int, Any]:
+        # Läuft im Thread-Pool: JSON parsen, Handler ausführen, Antwort serialisieren
+        if profiler.enabled:
+            profiler.start()
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            return 400, _error("Ungültiges JSON")
+        try:
+            status, payload = self.dispatch(method, path, query, body)
+        except ApiError as e:
+            status, payload = e.status, {'error': e.message}
+        except Exception as e:
+            status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+        if not isinstance(payload, FileBody):
+            payload = json.dumps(payload, ensure_ascii=False, default=str).encode()
+        profiler.finish('api', request=f"{method} {path}", status=status)
+        return status, payload
+
+    # HTTP/1.1 auf asyncio-Streams (Keep-Alive, Content-Length; Export per chunked Transfer-Encoding)
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise ApiError(400, "Ungültige Anfragezeile") from None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > 100:
+                raise ApiError(400, "Zu viele Header")
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise ApiError(501, "Chunked-Anfragen werden nicht unterstützt")
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, f"Anfrage grösser als {MAX_BODY} Bytes")
+        body = await reader.readexactly(length) if length else b''
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1' \
+            or headers.get('connection', '').lower() == 'keep-alive'
+        return method.upper(), target, headers, body, keep_alive
+
+    def _authorized(self, headers: Dict[str, str]) -> bool:
+        if not self.token:
+            return True
+        return hmac.compare_digest(headers.get('authorization', ''), f"Bearer {self.token}")
+
+    async def _run(self, func: Callable, *args):
+        # Begrenzte Warteschlange vor dem Pool: bei Überlast sofort 503 statt unbegrenzt zu puffern
+        if self.pending >= self.max_pending:
+            raise ApiError(503, "Server ausgelastet")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        if not self._authorized(headers):
+            raise ApiError(401, "Token fehlt oder ist ungültig")
+        url = urlsplit(target)
+        return await self._run(self.execute, method, unquote(url.path).rstrip('/') or '/', dict(parse_qsl(url.query)), body)
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if isinstance(payload, FileBody):
+            head += [f"Content-Type: {payload.content_type}; charset=utf-8", 'Transfer-Encoding: chunked',
+                     f'Content-Disposition: attachment; filename="{payload.filename}"', f"X-Interview-Count: {payload.count}"]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            loop = asyncio.get_running_loop()
+            with payload.fh:
+                while True:
+                    chunk = await loop.run_in_executor(None, payload.fh.read, STREAM_CHUNK)
+                    if not chunk:
+                        break
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    await writer.drain()
+            writer.write(b'0\r\n\r\n')
+        else:
+            head += ['Content-Type: application/json; charset=utf-8', f"Content-Length: {len(payload)}"]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body, keep_alive = request
+                    status, payload = await self.handle(method, target, headers, body)
+                except ApiError as e:
+                    status, payload = e.status, _error(e.message)
+                except (ValueError, asyncio.LimitOverrunError):
+                    status, payload = 400, _error("Ungültige Anfrage")
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+
+async def serve(store: InterviewStore, host: str = API_HOST, port: int = API_PORT, threads: int = API_THREADS):
+    api = InterviewApi(store, threads)
+    server = await api.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
@@ -0,0 +1,251 @@
+import hashlib
+import io
+import os
+import sqlite3
+import time
+import wave
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import SQL_NOW, InterviewStore
+
+try:
+    import numpy as np
+    import soundfile
+except ImportError:
+    np = soundfile = None
+
+AUDIO_DIR = os.environ.get('AUDIO_DIR', 'audio_store')
+CHUNK_SECONDS = 10
+# Aufbewahrung: 0 = unbegrenzt
+AUDIO_MAX_BYTES = int(float(os.environ.get('AUDIO_MAX_GB', '20')) * 1024 ** 3)
+AUDIO_MAX_AGE_DAYS = int(os.environ.get('AUDIO_MAX_AGE_DAYS', '0'))
+SAMPLE_WIDTH = 2
+
+AUDIO_SCHEMA = (
+    # Inhaltsadressierte Dateien (sha256 über PCM + Abtastrate); nur der Index liegt in SQLite
+    '''CREATE TABLE IF NOT EXISTS audio_blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        stored_bytes INTEGER NOT NULL,
+        pcm_bytes INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS audio_chunks (
+        interview_id INTEGER NOT NULL REFERENCES interviews (id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        hash TEXT NOT NULL REFERENCES audio_blobs (hash),
+        sample_rate INTEGER NOT NULL,
+        duration_ms INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (interview_id, seq)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS idx_audio_chunks_hash ON audio_chunks (hash)',
+)
+
+SQL_RETENTION_CANDIDATES = '''
+    SELECT c.interview_id, MAX(c.created_at) AS last_write
+    FROM audio_chunks c
+    WHERE NOT EXISTS (SELECT 1 FROM stt_jobs j WHERE j.interview_id = c.interview_id AND j.status IN ('queued', 'running'))
+    GROUP BY c.interview_id ORDER BY last_write
+'''
+SQL_REFERENCED_BYTES = '''
+    SELECT COALESCE(SUM(stored_bytes), 0) FROM audio_blobs b WHERE EXISTS (SELECT 1 FROM audio_chunks c WHERE c.hash = b.hash)
+'''
+# Blobs des Interviews, die kein anderes (noch vorhandenes) Interview referenziert
+SQL_FREED_BYTES = '''
+    SELECT COALESCE(SUM(b.stored_bytes), 0) FROM audio_blobs b
+    WHERE b.hash IN (SELECT hash FROM audio_chunks WHERE interview_id = ?)
+      AND NOT EXISTS (SELECT 1 FROM audio_chunks o WHERE o.hash = b.hash AND o.interview_id != ?)
+'''
+SQL_DELETE_ORPHANS = '''
+    DELETE FROM audio_blobs WHERE NOT EXISTS (SELECT 1 FROM audio_chunks c WHERE c.hash = audio_blobs.hash)
+    RETURNING hash, codec
+'''
+
+
+def create_audio_schema(conn: sqlite3.Connection):
+    for statement in AUDIO_SCHEMA:
+        conn.execute(statement)
+
+
+def read_wav(audio: bytes) -> Tuple[bytes, int]:
+    with wave.open(io.BytesIO(audio), 'rb') as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError("Nur WAV mit PCM16 mono wird unterstützt")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+def write_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def encode(pcm: bytes, sample_rate: int) -> Tuple[str, bytes]:
+    # FLAC, wenn soundfile verfügbar ist, sonst verlustfrei zlib-komprimiertes PCM
+    if soundfile is not None:
+        buffer = io.BytesIO()
+        soundfile.write(buffer, np.frombuffer(pcm, dtype='<i2'), sample_rate, format='FLAC', subtype='PCM_16')
+        return 'flac', buffer.getvalue()
+    return 'pcm.zlib', zlib.compress(pcm, 6)
+
+
+def decode(codec: str, data: bytes) -> bytes:
+    if codec == 'pcm.zlib':
+        return zlib.decompress(data)
+    if codec == 'flac':
+        if soundfile is None:
+            raise RuntimeError("FLAC-Audio benötigt soundfile (pip install soundfile)")
+        samples, _ = soundfile.read(io.BytesIO(data), dtype='int16')
+        return samples.astype('<i2').tobytes()
+    raise ValueError(f"Unbekannter Audio-Codec: {codec}")
+
+
+class AudioStore:
+    def __init__(self, store: InterviewStore, root: str = AUDIO_DIR, chunk_seconds: int = CHUNK_SECONDS):
+        self.store = store
+        self.root = root
+        self.chunk_seconds = chunk_seconds
+
+    def _path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.{codec}")
+
+    def _write_blob(self, conn: sqlite3.Connection, pcm: bytes, sample_rate: int) -> str:
+        # Läuft in der Schreibtransaktion, damit gc() die Datei nicht parallel löscht
+        digest = hashlib.sha256(sample_rate.to_bytes(4, 'little') + pcm).hexdigest()
+        if conn.execute('SELECT 1 FROM audio_blobs WHERE hash = ?', (digest,)).fetchone():
+            return digest
+        codec, data = encode(pcm, sample_rate)
+        path = self._path(digest, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        conn.execute(f'INSERT INTO audio_blobs (hash, codec, stored_bytes, pcm_bytes, created_at) VALUES (?, ?, ?, ?, {SQL_NOW})',
+                     (digest, codec, len(data), len(pcm)))
+        return digest
+
+    def append_chunk(self, interview_id: int, seq: int, audio: bytes) -> str:
+        pcm, sample_rate = read_wav(audio)
+        duration_ms = len(pcm) // SAMPLE_WIDTH * 1000 // sample_rate
+        with self.store.pool.transaction() as conn:
+            digest = self._write_blob(conn, pcm, sample_rate)
+            conn.execute(f'''
+                INSERT OR IGNORE INTO audio_chunks (interview_id, seq, hash, sample_rate, duration_ms, created_at)
+                VALUES (?, ?, ?, ?, ?, {SQL_NOW})
+            ''', (interview_id, seq, digest, sample_rate, duration_ms))
+        return digest
+
+    def add_recording(self, interview_id: int, audio: bytes) -> List[int]:
+        # Lange Aufnahmen in Chunks fester Dauer zerlegen und hinten anhängen
+        pcm, sample_rate = read_wav(audio)
+        step = self.chunk_seconds * sample_rate * SAMPLE_WIDTH
+        with self.store.pool.connection() as conn:
+            seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM audio_chunks WHERE interview_id = ?', (interview_id,)).fetchone()[0]
+        seqs = []
+        for offset in range(0, len(pcm), step):
+            seq += 1
+            self.append_chunk(interview_id, seq, write_wav(pcm[offset:offset + step], sample_rate))
+            seqs.append(seq)
+        return seqs
+
+    def chunks(self, interview_id: int) -> List[Dict[str, Any]]:
+        with self.store.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT c.seq, c.hash, b.codec, c.sample_rate, c.duration_ms
+                FROM audio_chunks c JOIN audio_blobs b ON b.hash = c.hash
+                WHERE c.interview_id = ? ORDER BY c.seq
+            ''', (interview_id,)).fetchall()
+        chunks, offset = [], 0
+        for seq, digest, codec, sample_rate, duration_ms in rows:
+            chunks.append({'seq': seq, 'hash': digest, 'codec': codec, 'sample_rate': sample_rate,
+                           'start_ms': offset, 'duration_ms': duration_ms})
+            offset += duration_ms
+        return chunks
+
+    def duration_ms(self, interview_id: int) -> int:
+        with self.store.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(SUM(duration_ms), 0) FROM audio_chunks WHERE interview_id = ?',
+                                (interview_id,)).fetchone()[0]
+
+    def read_chunk(self, chunk: Dict[str, Any]) -> bytes:
+        with open(self._path(chunk['hash'], chunk['codec']), 'rb') as fh:
+            return decode(chunk['codec'], fh.read())
+
+    def read_range(self, interview_id: int, start_ms: int = 0, end_ms: Optional[int] = None) -> Optional[bytes]:
+        # Nur die Chunks lesen, die den Bereich überlappen; Ergebnis als WAV
+        parts, sample_rate = [], None
+        for chunk in self.chunks(interview_id):
+            chunk_end = chunk['start_ms'] + chunk['duration_ms']
+            if chunk_end <= start_ms:
+                continue
+            if end_ms is not None and chunk['start_ms'] >= end_ms:
+                break
+            if sample_rate not in (None, chunk['sample_rate']):
+                raise ValueError("Chunks mit unterschiedlicher Abtastrate")
+            sample_rate = chunk['sample_rate']
+            pcm = self.read_chunk(chunk)
+            first = max(0, (start_ms - chunk['start_ms']) * sample_rate // 1000) * SAMPLE_WIDTH
+            last = len(pcm)
+            if end_ms is not None and end_ms < chunk_end:
+                last = (end_ms - chunk['start_ms']) * sample_rate // 1000 * SAMPLE_WIDTH
+            parts.append(pcm[first:last])
+        if sample_rate is None:
+            return None
+        return write_wav(b''.join(parts), sample_rate)
+
+    def usage(self) -> Dict[str, int]:
+        with self.store.pool.connection() as conn:
+            blobs, stored, raw = conn.execute('SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0), COALESCE(SUM(pcm_bytes), 0) FROM audio_blobs').fetchone()
+            chunks, interviews = conn.execute('SELECT COUNT(*), COUNT(DISTINCT interview_id) FROM audio_chunks').fetchone()
+        return {'blobs': blobs, 'chunks': chunks, 'interviews': interviews, 'stored_bytes': stored, 'pcm_bytes': raw}
+
+    def delete_interview_audio(self, interview_id: int):
+        with self.store.pool.transaction() as conn:
+            conn.execute('DELETE FROM audio_chunks WHERE interview_id = ?', (interview_id,))
+
+    def enforce_retention(self, max_bytes: int = AUDIO_MAX_BYTES, max_age_days: int = AUDIO_MAX_AGE_DAYS) -> Dict[str, int]:
+        # Älteste Interviews zuerst; Audio mit offenen STT-Aufträgen bleibt erhalten. Chunks werden sofort
+        # gelöscht, damit freigegebene Bytes nur Blobs zählen, die kein verbleibendes Interview mehr nutzt
+        evicted = set()
+        with self.store.pool.transaction() as conn:
+            candidates = conn.execute(SQL_RETENTION_CANDIDATES).fetchall()
+            if max_age_days:
+                cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - max_age_days * 86400))
+                evicted = {interview_id for interview_id, last_write in candidates if last_write < cutoff}
+                conn.executemany('DELETE FROM audio_chunks WHERE interview_id = ?', [(i,) for i in evicted])
+            if max_bytes:
+                total = conn.execute(SQL_REFERENCED_BYTES).fetchone()[0]
+                for interview_id, _ in candidates:
+                    if total <= max_bytes:
+                        break
+                    if interview_id in evicted:
+                        continue
+                    total -= conn.execute(SQL_FREED_BYTES, (interview_id, interview_id)).fetchone()[0]
+                    conn.execute('DELETE FROM audio_chunks WHERE interview_id = ?', (interview_id,))
+                    evicted.add(interview_id)
+        removed = self.gc()
+        return {'interviews': len(evicted), 'blobs': removed}
+
+    def gc(self) -> int:
+        # Nicht mehr referenzierte Blobs löschen; Dateien erst nach dem Commit entfernen, unter der
+        # Schreibsperre und nur, wenn _write_blob den Hash nicht inzwischen neu angelegt hat
+        with self.store.pool.transaction() as conn:
+            orphans = conn.execute(SQL_DELETE_ORPHANS).fetchall()
+        if not orphans:
+            return 0
+        with self.store.pool.transaction() as conn:
+            for digest, codec in orphans:
+                if conn.execute('SELECT 1 FROM audio_blobs WHERE hash = ?', (digest,)).fetchone():
+                    continue
+                try:
+                    os.remove(self._path(digest, codec))
+                except FileNotFoundError:
+                    pass
+        return len(orphans)
@@ -0,0 +1,324 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import search
+from .profiling import ProfilingConnection, profiler
+
+DB_PATH = os.environ.get('INTERVIEWS_DB', 'interviews.db')
+PAGE_SIZE = 20
+
+# Pro Verbindung gesetzt; WAL erlaubt parallele Leser neben einem Schreiber
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA mmap_size = 134217728',
+)
+
+# Millisekunden, damit mehrere Änderungen pro Sekunde unterscheidbar bleiben
+SQL_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+SQL_INSERT_INTERVIEW = f'''
+    INSERT INTO interviews (interview_date, interviewer, interviewee_info, transcription, notes, metadata, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, {SQL_NOW})
+'''
+SQL_UPDATE_TRANSCRIPTION = f'UPDATE interviews SET transcription = ?, updated_at = {SQL_NOW} WHERE id = ?'
+SQL_UPDATE_NOTES = f'UPDATE interviews SET notes = ?, updated_at = {SQL_NOW} WHERE id = ?'
+SQL_TOUCH = f'UPDATE interviews SET updated_at = {SQL_NOW} WHERE id = ?'
+# Transkription aus der Spalte oder, falls leer, lazy aus den Live-Segmenten zusammengesetzt; mit Revisionsverlauf
+# kompaktierter Text plus später eingegangene Segmente (search.CURRENT_TRANSCRIPT, revisions.py)
+SQL_TRANSCRIPT = search.CURRENT_TRANSCRIPT.format(ref='interviews')
+# Letzte Spalte: noch nicht kompaktierte Transkript-Patches vorhanden (Migration 4, revisions.py)
+SQL_GET_INTERVIEW = f'''SELECT id, interview_date, interviewer, interviewee_info, {SQL_TRANSCRIPT}, notes, created_at,
+    (SELECT head_rev > compacted_rev FROM transcript_heads WHERE interview_id = interviews.id) FROM interviews WHERE id = ?'''
+SQL_INSERT_SEGMENT = 'INSERT OR IGNORE INTO interview_segments (interview_id, seq, ts, text, vocabulary_version) VALUES (?, ?, ?, ?, ?)'
+SQL_LAST_SEGMENT_SEQ = 'SELECT COALESCE(MAX(seq), 0) FROM interview_segments WHERE interview_id = ?'
+SQL_SEGMENT_TEXTS = 'SELECT text FROM interview_segments WHERE interview_id = ? ORDER BY seq'
+SQL_COUNT = 'SELECT COUNT(*) FROM interviews'
+# transcription_length: per Trigger gepflegt, Teil des Covering-Index (Migration 2)
+SQL_PAGE_COLUMNS = 'id, interview_date, interviewer, interviewee_info, transcription_length, created_at'
+SQL_FIRST_PAGE = f'SELECT {SQL_PAGE_COLUMNS} FROM interviews ORDER BY created_at DESC, id DESC LIMIT ?'
+SQL_NEXT_PAGE = f'SELECT {SQL_PAGE_COLUMNS} FROM interviews WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?'
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, declaration: str):
+    # Bestehende Datenbanken in place erweitern
+    if column not in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def create_schema(conn: sqlite3.Connection):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS interviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interview_date TEXT NOT NULL,
+            interviewer TEXT,
+            interviewee_info TEXT,
+            transcription TEXT,
+            notes TEXT,
+            metadata TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT
+        )
+    ''')
+    add_column(conn, 'interviews', 'updated_at', 'TEXT')
+    # Index für die Übersicht (Keyset-Pagination nach created_at)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_interviews_created_at ON interviews (created_at DESC, id DESC)')
+    # Live-Aufnahme: ein Eintrag pro finalem Erkennungssegment
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS interview_segments (
+            interview_id INTEGER NOT NULL REFERENCES interviews (id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            ts TEXT NOT NULL,
+            text TEXT NOT NULL,
+            vocabulary_version INTEGER,
+            PRIMARY KEY (interview_id, seq)
+        ) WITHOUT ROWID
+    ''')
+    add_column(conn, 'interview_segments', 'vocabulary_version', 'INTEGER')
+    if search.create_search_index(conn):
+        search.rebuild_search_index(conn)
+
+
+class ConnectionPool:
+    def __init__(self, path: str = DB_PATH, size: int = 4, timeout: float = 10.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Anzahl SQL-Anweisungen pro Thread (Streamlit: ein Thread pro Rerun)
+        self._stats = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: Transaktionen steuern wir selbst (BEGIN IMMEDIATE);
+        # mit PROFILE_LOG misst ProfilingConnection die Dauer jeder Anweisung
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None, cached_statements=128,
+                               factory=ProfilingConnection if profiler.enabled else sqlite3.Connection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, statement: str):
+        # Anweisungen aus Triggern ('-- TRIGGER ...') nicht mitzählen
+        if not statement.startswith('--'):
+            self._stats.queries = getattr(self._stats, 'queries', 0) + 1
+
+    def query_count(self) -> int:
+        return getattr(self._stats, 'queries', 0)
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Keine freie DB-Verbindung nach {self.timeout}s") from None
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        # Schreibsperre sofort holen, damit kein Upgrade read -> write mit SQLITE_BUSY scheitert
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class InterviewCache:
+    # Kleiner LRU für einzelne Interviews; die Schreibmethoden des Stores invalidieren ihn.
+    # Schreiber in anderen Prozessen (STT-Worker, CLI) sieht er erst nach Ablauf von ttl.
+    def __init__(self, size: int = 128, ttl: float = 30.0):
+        self.size = size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[int, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, interview_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(interview_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(interview_id)
+            return dict(entry[1])
+
+    def put(self, interview_id: int, interview: Dict[str, Any]):
+        with self._lock:
+            self._entries[interview_id] = (time.monotonic(), dict(interview))
+            self._entries.move_to_end(interview_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *interview_ids: int):
+        with self._lock:
+            for interview_id in interview_ids:
+                self._entries.pop(interview_id, None)
+
+
+class InterviewStore:
+    def __init__(self, path: str = DB_PATH, pool_size: int = 4):
+        self.pool = ConnectionPool(path, size=pool_size)
+        self.cache = InterviewCache()
+
+    def close(self):
+        self.pool.close()
+
+    def init_database(self) -> List[Tuple[int, str]]:
+        # Schema über versionierte Migrationen anlegen bzw. in place aktualisieren
+        from .migrations import migrate
+        return migrate(self.pool)
+
+    @staticmethod
+    def _interview_row(interview_data: Dict[str, Any]) -> Tuple[Any, ...]:
+        date_str = interview_data.get('date', datetime.now().isoformat())
+        if hasattr(date_str, 'isoformat'):
+            date_str = date_str.isoformat()
+        return (
+            date_str,
+            interview_data.get('interviewer', ''),
+            interview_data.get('interviewee_info', ''),
+            interview_data.get('transcription', ''),
+            interview_data.get('notes', ''),
+            json.dumps(interview_data.get('metadata', {}))
+        )
+
+    def save_interview(self, interview_data: Dict[str, Any]) -> int:
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(SQL_INSERT_INTERVIEW, self._interview_row(interview_data))
+        self.cache.invalidate(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def save_interviews(self, interviews: List[Dict[str, Any]]) -> List[int]:
+        # Mehrere Interviews in einer Transaktion (Batch-Import, API)
+        rows = [self._interview_row(interview_data) for interview_data in interviews]
+        with self.pool.transaction() as conn:
+            ids = [conn.execute(SQL_INSERT_INTERVIEW, row).lastrowid for row in rows]
+        self.cache.invalidate(*ids)
+        return ids
+
+    def update_interview_transcription(self, interview_id: int, transcription: str):
+        with self.pool.transaction() as conn:
+            conn.execute(SQL_UPDATE_TRANSCRIPTION, (transcription, interview_id))
+        self.cache.invalidate(interview_id)
+
+    def update_interview_notes(self, interview_id: int, notes: str):
+        with self.pool.transaction() as conn:
+            conn.execute(SQL_UPDATE_NOTES, (notes, interview_id))
+        self.cache.invalidate(interview_id)
+
+    def append_segments(self, interview_id: int, segments: List[Dict[str, Any]]) -> int:
+        # Ein Batch = eine Transaktion; doppelt gesendete Segmente (gleiche seq) werden ignoriert
+        rows = [(interview_id, int(seg['seq']), str(seg.get('ts') or datetime.now().isoformat()), seg['text'],
+                 seg.get('vocabulary_version')) for seg in segments if seg.get('text')]
+        changed = False
+        with self.pool.transaction() as conn:
+            if rows:
+                before = conn.total_changes
+                conn.executemany(SQL_INSERT_SEGMENT, rows)
+                changed = conn.total_changes != before
+                if changed:
+                    conn.execute(SQL_TOUCH, (interview_id,))
+            last_seq = conn.execute(SQL_LAST_SEGMENT_SEQ, (interview_id,)).fetchone()[0]
+        if changed:
+            self.cache.invalidate(interview_id)
+        return last_seq
+
+    def last_segment_seq(self, interview_id: int) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_LAST_SEGMENT_SEQ, (interview_id,)).fetchone()[0]
+
+    def get_segment_transcript(self, interview_id: int) -> str:
+        with self.pool.connection() as conn:
+            return ' '.join(row[0] for row in conn.execute(SQL_SEGMENT_TEXTS, (interview_id,)))
+
+    def search_interviews(self, text: str, limit: int = PAGE_SIZE, offset: int = 0) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return search.search_interviews(conn, text, limit, offset)
+
+    def count_search_results(self, text: str) -> int:
+        with self.pool.connection() as conn:
+            return search.count_search_results(conn, text)
+
+    def rebuild_search_index(self) -> int:
+        with self.pool.transaction() as conn:
+            search.create_search_index(conn)
+            return search.rebuild_search_index(conn)
+
+    def get_interview_by_id(self, interview_id: int, cached: bool = False) -> Optional[Dict[str, Any]]:
+        if cached:
+            interview = self.cache.get(interview_id)
+            if interview is not None:
+                return interview
+        with self.pool.connection() as conn:
+            result = conn.execute(SQL_GET_INTERVIEW, (interview_id,)).fetchone()
+            transcription = result[4] if result else None
+            if result and result[7]:
+                from .revisions import read_transcript
+                transcription = read_transcript(conn, interview_id)[1]
+        if result:
+            interview = {'id': result[0], 'date': result[1], 'interviewer': result[2], 'interviewee_info': result[3], 'transcription': transcription, 'notes': result[5], 'created_at': result[6]}
+            self.cache.put(interview_id, interview)
+            return interview
+        return None
+
+    def count_interviews(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_COUNT).fetchone()[0]
+
+    def list_interviews_page(self, cursor_key: Optional[Tuple[str, int]] = None, limit: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        # Nur Metadaten; Transkription/Notizen werden erst beim Aufklappen geladen
+        with self.pool.connection() as conn:
+            if cursor_key is None:
+                rows = conn.execute(SQL_FIRST_PAGE, (limit,)).fetchall()
+            else:
+                rows = conn.execute(SQL_NEXT_PAGE, (*cursor_key, limit)).fetchall()
+        return [{'id': r[0], 'date': r[1], 'interviewer': r[2], 'interviewee_info': r[3], 'length': r[4] or 0, 'created_at': r[5]} for r in rows]
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import sqlite3
+import tempfile
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .db import SQL_TRANSCRIPT
+from .revisions import current_text, pending_ids
+
+FORMATS = ('ndjson', 'csv', 'json')
+CHUNK_SIZE = 500
+COLUMNS = ('id', 'interview_date', 'interviewer', 'interviewee_info', 'transcription', 'notes', 'metadata', 'created_at')
+MIME_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv', 'json': 'application/json'}
+
+
+def build_query(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                interviewer: Optional[str] = None, columns: Optional[str] = None) -> Tuple[str, List[Any]]:
+    where, params = [], []
+    if date_from:
+        where.append('interview_date >= ?')
+        params.append(str(date_from))
+    if date_to:
+        # interview_date ist ISO-Text, evtl. mit Uhrzeit: bis Ende des Tages
+        where.append("interview_date < date(?, '+1 day')")
+        params.append(str(date_to))
+    if interviewer:
+        where.append('interviewer = ?')
+        params.append(interviewer)
+    if columns is None:
+        columns = f'id, interview_date, interviewer, interviewee_info, {SQL_TRANSCRIPT}, notes, metadata, created_at'
+    sql = f'SELECT {columns} FROM interviews'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return sql + ' ORDER BY id', params
+
+
+def iter_interviews(conn: sqlite3.Connection, chunk_size: int = CHUNK_SIZE, **filters) -> Iterator[Dict[str, Any]]:
+    # Cursor in festen Blöcken lesen, nie die ganze Tabelle im Speicher
+    sql, params = build_query(**filters)
+    # Offene Transkript-Patches dazulesen statt vorher zu kompaktieren (Export schreibt nicht)
+    pending = pending_ids(conn)
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                interview = dict(zip(COLUMNS, row))
+                if interview['id'] in pending:
+                    interview['transcription'] = current_text(conn, interview['id'])
+                yield interview
+    finally:
+        cursor.close()
+
+
+def count_interviews(conn: sqlite3.Connection, **filters) -> int:
+    sql, params = build_query(columns='1', **filters)
+    return conn.execute(f'SELECT COUNT(*) FROM ({sql})', params).fetchone()[0]
+
+
+def _with_progress(rows: Iterator[Dict[str, Any]], total: int, progress: Callable[[int, int], None],
+                   every: int) -> Iterator[Dict[str, Any]]:
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done, total)
+    progress(done, total)
+
+
+def write_ndjson(rows: Iterator[Dict[str, Any]], fh: IO[str]) -> int:
+    count = 0
+    for row in rows:
+        fh.write(json.dumps(row, ensure_ascii=False, default=str))
+        fh.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterator[Dict[str, Any]], fh: IO[str]) -> int:
+    writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_json(rows: Iterator[Dict[str, Any]], fh: IO[str]) -> int:
+    # Gleiches Format wie json.dumps(liste, indent=2), aber Objekt für Objekt geschrieben
+    count = 0
+    fh.write('[')
+    for row in rows:
+        fh.write(',\n  ' if count else '\n  ')
+        fh.write(json.dumps(row, indent=2, ensure_ascii=False, default=str).replace('\n', '\n  '))
+        count += 1
+    fh.write('\n]' if count else ']')
+    return count
+
+
+WRITERS = {'ndjson': write_ndjson, 'csv': write_csv, 'json': write_json}
+
+
+def export_interviews(store, fh: IO[str], fmt: str = 'ndjson', chunk_size: int = CHUNK_SIZE,
+                      progress: Optional[Callable[[int, int], None]] = None, **filters) -> int:
+    # progress(erledigt, gesamt) nach jedem Block, z.B. für Hintergrundaufträge
+    if fmt not in WRITERS:
+        raise ValueError(f"Unbekanntes Exportformat: {fmt} (erlaubt: {', '.join(FORMATS)})")
+    with store.pool.connection() as conn:
+        rows = iter_interviews(conn, chunk_size, **filters)
+        if progress is not None:
+            rows = _with_progress(rows, count_interviews(conn, **filters), progress, chunk_size)
+        return WRITERS[fmt](rows, fh)
+
+
+def export_to_tempfile(store, fmt: str = 'ndjson', **filters) -> Tuple[IO[bytes], int]:
+    # Export in eine temporäre Datei; Aufrufer liest und schliesst sie
+    tmp = tempfile.TemporaryFile(mode='w+b')
+    text = io.TextIOWrapper(tmp, encoding='utf-8', newline='')
+    count = export_interviews(store, text, fmt, **filters)
+    text.flush()
+    raw = text.detach()
+    raw.seek(0)
+    return raw, count
@@ -0,0 +1,455 @@
+import glob
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .db import DB_PATH, SQL_NOW, InterviewStore
+
+# Hintergrundaufträge (Export, Berichte, Wartung) in einer SQLite-Warteschlange; Worker-Threads im App-Prozess
+# (JOB_WORKERS, 0 = keine) oder separat über "python -m interview_store jobs --worker"
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+DOWNLOAD_DIR = os.environ.get('DOWNLOAD_DIR', 'downloads')
+DOWNLOAD_TTL_HOURS = float(os.environ.get('DOWNLOAD_TTL_HOURS', '24'))
+BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+KEEP_BACKUPS = int(os.environ.get('KEEP_BACKUPS', '7'))
+# Schwere Wartung nur, wenn so lange nichts aufgenommen, bearbeitet oder transkribiert wurde
+QUIET_MINUTES = float(os.environ.get('MAINTENANCE_QUIET_MINUTES', '15'))
+# Abgeschlossene Aufträge (ohne Download) so lange in der Liste behalten
+JOB_HISTORY_DAYS = 7
+# Laufende Aufträge ohne Lebenszeichen gelten danach als abgebrochen (Prozess beendet)
+STALE_SECONDS = 120
+HOUSEKEEPING_SECONDS = 30
+MAX_ATTEMPTS = 3
+PROGRESS_INTERVAL = 0.5
+BACKUP_STEP_PAGES = 1024
+
+# Wartung: Art -> (Intervall in Sekunden, nur bei Ruhe); läuft nie parallel zu einer anderen ruhebedürftigen Wartung
+MAINTENANCE = {
+    'cleanup': (3600, False),
+    'compact_transcripts': (3600, False),
+    'analytics': (300, False),
+    'analyze': (86400, True),
+    'fts_optimize': (86400, True),
+    'backup': (86400, True),
+    'audio_retention': (86400, True),
+    'vacuum': (7 * 86400, True),
+}
+QUIET_KINDS = ', '.join(f"'{kind}'" for kind, (_, quiet) in MAINTENANCE.items() if quiet)
+
+JOBS_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        params TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued',
+        priority INTEGER NOT NULL DEFAULT 0,
+        dedupe_key TEXT,
+        run_after TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        error TEXT,
+        worker TEXT,
+        enqueued_at TEXT NOT NULL,
+        started_at TEXT,
+        heartbeat_at TEXT,
+        finished_at TEXT,
+        artifact_path TEXT,
+        artifact_name TEXT,
+        artifact_mime TEXT,
+        artifact_bytes INTEGER,
+        expires_at TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority DESC, id)',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at) WHERE artifact_path IS NOT NULL',
+    # Wiederkehrende Wartung höchstens einmal in der Warteschlange
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key) WHERE status IN ('queued', 'running')",
+)
+
+SQL_ENQUEUE = f'''INSERT OR IGNORE INTO jobs (kind, params, priority, dedupe_key, run_after, enqueued_at)
+                  VALUES (?, ?, ?, ?, COALESCE(?, {SQL_NOW}), {SQL_NOW})'''
+# Nächster fälliger Auftrag; ruhebedürftige Wartung nur mit quiet = 1 und nie parallel zueinander
+SQL_NEXT_JOB = f'''
+    SELECT id FROM jobs WHERE status = 'queued' AND run_after <= {SQL_NOW}
+    AND (kind NOT IN ({QUIET_KINDS}) OR (:quiet AND NOT EXISTS (
+        SELECT 1 FROM jobs WHERE status = 'running' AND kind IN ({QUIET_KINDS}))))
+    ORDER BY priority DESC, id LIMIT 1
+'''
+SQL_CLAIM = f'''
+    UPDATE jobs SET status = 'running', worker = :worker, attempts = attempts + 1, started_at = {SQL_NOW},
+        heartbeat_at = {SQL_NOW}, progress = 0, message = NULL
+    WHERE id = ({SQL_NEXT_JOB})
+    RETURNING id, kind, params
+'''
+SQL_PROGRESS = f'''UPDATE jobs SET progress = ?, message = COALESCE(?, message), heartbeat_at = {SQL_NOW}
+                   WHERE id = ? RETURNING cancel_requested'''
+SQL_FINISH = f'''
+    UPDATE jobs SET status = ?, error = ?, message = COALESCE(?, message), progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END,
+        artifact_path = ?, artifact_name = ?, artifact_mime = ?, artifact_bytes = ?,
+        expires_at = CASE WHEN ? IS NOT NULL THEN strftime('%Y-%m-%d %H:%M:%f', 'now', ?) END,
+        finished_at = {SQL_NOW}
+    WHERE id = ?
+'''
+# Letzte Aktivität: Interview-Änderungen (Segmente, STT-Ergebnisse, Notizen) über den Sync-Zähler,
+# Transkript-Bearbeitungen und offene STT-Aufträge – jeweils über einen Index, ohne Tabellenscan
+SQL_LAST_ACTIVITY = '''SELECT MAX(
+    COALESCE((SELECT COALESCE(updated_at, created_at) FROM interviews ORDER BY change_seq DESC LIMIT 1), ''),
+    COALESCE((SELECT created_at FROM transcript_revisions ORDER BY rowid DESC LIMIT 1), '')
+)'''
+SQL_STT_ACTIVE = "SELECT EXISTS (SELECT 1 FROM stt_jobs WHERE status IN ('queued', 'running'))"
+JOB_COLUMNS = ('id, kind, params, status, progress, message, error, enqueued_at, started_at, finished_at, '
+               'artifact_path, artifact_name, artifact_mime, artifact_bytes, expires_at')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def create_jobs_schema(conn: sqlite3.Connection):
+    for statement in JOBS_SCHEMA:
+        conn.execute(statement)
+
+
+def _job(row) -> Dict[str, Any]:
+    keys = [column.strip() for column in JOB_COLUMNS.split(',')]
+    job = dict(zip(keys, row))
+    job['params'] = json.loads(job['params'] or '{}')
+    return job
+
+
+def submit(store: InterviewStore, kind: str, params: Optional[Dict[str, Any]] = None, priority: int = 0,
+           run_after: Optional[str] = None, dedupe_key: Optional[str] = None) -> Optional[int]:
+    # Liefert None, wenn ein Auftrag mit gleichem dedupe_key schon wartet oder läuft
+    if kind not in TASKS:
+        raise ValueError(f"Unbekannte Auftragsart: {kind} (verfügbar: {', '.join(TASKS)})")
+    with store.pool.transaction() as conn:
+        cursor = conn.execute(SQL_ENQUEUE, (kind, json.dumps(params or {}, ensure_ascii=False), priority, dedupe_key, run_after))
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+def get_job(store: InterviewStore, job_id: int) -> Optional[Dict[str, Any]]:
+    with store.pool.connection() as conn:
+        row = conn.execute(f'SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job(row) if row else None
+
+
+def list_jobs(store: InterviewStore, limit: int = 20, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    where, params = '', []
+    if kinds:
+        where = f"WHERE kind IN ({', '.join('?' * len(kinds))})"
+        params = list(kinds)
+    with store.pool.connection() as conn:
+        rows = conn.execute(f'SELECT {JOB_COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT ?', (*params, limit)).fetchall()
+    return [_job(row) for row in rows]
+
+
+def cancel(store: InterviewStore, job_id: int) -> bool:
+    # Wartende Aufträge sofort; laufende beim nächsten Fortschrittsbericht
+    with store.pool.transaction() as conn:
+        cursor = conn.execute(f'''UPDATE jobs SET status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                                  cancel_requested = 1, finished_at = CASE WHEN status = 'queued' THEN {SQL_NOW} ELSE finished_at END
+                                  WHERE id = ? AND status IN ('queued', 'running')''', (job_id,))
+        return cursor.rowcount > 0
+
+
+def job_counts(store: InterviewStore) -> Dict[str, int]:
+    with store.pool.connection() as conn:
+        return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+def is_quiet(store: InterviewStore, minutes: float = QUIET_MINUTES) -> bool:
+    with store.pool.connection() as conn:
+        if conn.execute(SQL_STT_ACTIVE).fetchone()[0]:
+            return False
+        last = conn.execute(SQL_LAST_ACTIVITY).fetchone()[0]
+        threshold = conn.execute("SELECT strftime('%Y-%m-%d %H:%M:%f', 'now', ?)", (f'-{minutes} minutes',)).fetchone()[0]
+    # updated_at/created_at sind UTC im Format von SQL_NOW; ältere Zeilen evtl. mit 'T' (isoformat)
+    return not last or last.replace('T', ' ') < threshold
+
+
+def schedule_maintenance(store: InterviewStore, kind: Optional[str] = None, delay: float = 0) -> int:
+    # Fehlende wiederkehrende Wartungsaufträge einplanen (dedupe_key = Art)
+    scheduled = 0
+    for name in ([kind] if kind else MAINTENANCE):
+        run_after = None
+        if delay:
+            run_after = (datetime.now(timezone.utc) + timedelta(seconds=delay)).strftime('%Y-%m-%d %H:%M:%S.%f')[:23]
+        scheduled += submit(store, name, priority=-1, run_after=run_after, dedupe_key=name) is not None
+    return scheduled
+
+
+def requeue_stale(store: InterviewStore, stale_seconds: float = STALE_SECONDS) -> int:
+    # Aufträge von beendeten Prozessen wieder freigeben bzw. nach MAX_ATTEMPTS aufgeben
+    with store.pool.transaction() as conn:
+        cutoff = f'-{stale_seconds:.0f} seconds'
+        conn.execute(f'''UPDATE jobs SET status = 'failed', error = 'Worker abgebrochen', finished_at = {SQL_NOW}
+                         WHERE status = 'running' AND attempts >= ? AND heartbeat_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)''',
+                     (MAX_ATTEMPTS, cutoff))
+        cursor = conn.execute('''UPDATE jobs SET status = 'queued', worker = NULL
+                                 WHERE status = 'running' AND heartbeat_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)''', (cutoff,))
+        return cursor.rowcount
+
+
+class JobContext:
+    def __init__(self, store: InterviewStore, job_id: int, kind: str, params: Dict[str, Any]):
+        self.store = store
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self._reported = 0.0
+
+    def progress(self, done: float, total: float = 1.0, message: Optional[str] = None):
+        # Gedrosselt; wirft JobCancelled, wenn der Auftrag abgebrochen wurde
+        now = time.monotonic()
+        if now - self._reported < PROGRESS_INTERVAL and done < total and message is None:
+            return
+        self._reported = now
+        with self.store.pool.transaction() as conn:
+            row = conn.execute(SQL_PROGRESS, (min(1.0, done / total) if total else 0.0, message, self.id)).fetchone()
+        if row and row[0]:
+            raise JobCancelled()
+
+    def artifact_path(self, extension: str) -> str:
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        return os.path.join(DOWNLOAD_DIR, f'job_{self.id}.{extension}')
+
+
+# Aufgaben: liefern eine Meldung (str) oder ein Ergebnis mit Datei {'path', 'name', 'mime', 'message'}
+
+def task_export(ctx: JobContext) -> Dict[str, Any]:
+    from .export import FORMATS, MIME_TYPES, export_interviews
+    fmt = ctx.params.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unbekanntes Exportformat: {fmt}")
+    path = ctx.artifact_path(fmt)
+    with open(path + '.part', 'w', encoding='utf-8', newline='') as fh:
+        count = export_interviews(store=ctx.store, fh=fh, fmt=fmt, progress=lambda done, total: ctx.progress(done, total),
+                                  **ctx.params.get('filters', {}))
+    os.replace(path + '.part', path)
+    return {'path': path, 'name': f"interviews_{datetime.now().strftime('%Y%m%d_%H%M')}.{fmt}", 'mime': MIME_TYPES[fmt],
+            'message': f"{count} Interviews exportiert"}
+
+
+def task_report(ctx: JobContext) -> Dict[str, Any]:
+    from .reports import build_report
+    fmt = ctx.params.get('format', 'zip')
+    data, count = build_report(ctx.store, fmt, progress=lambda done, total: ctx.progress(done, total),
+                               **ctx.params.get('filters', {}))
+    path = ctx.artifact_path(fmt)
+    with open(path + '.part', 'wb') as fh:
+        fh.write(data)
+    os.replace(path + '.part', path)
+    return {'path': path, 'name': f"interview_berichte_{datetime.now().strftime('%Y%m%d_%H%M')}.{fmt}",
+            'mime': 'application/zip' if fmt == 'zip' else 'text/html', 'message': f"{count} Berichte erstellt"}
+
+
+def task_cleanup(ctx: JobContext) -> str:
+    # Abgelaufene Downloads löschen, alte Aufträge aus der Liste entfernen, liegengebliebene Dateien aufräumen
+    with ctx.store.pool.connection() as conn:
+        expired = conn.execute(f'''SELECT id, artifact_path FROM jobs WHERE artifact_path IS NOT NULL
+                                   AND expires_at < {SQL_NOW}''').fetchall()
+    for _, path in expired:
+        if os.path.exists(path):
+            os.remove(path)
+    with ctx.store.pool.transaction() as conn:
+        conn.executemany('UPDATE jobs SET artifact_path = NULL WHERE id = ?', [(job_id,) for job_id, _ in expired])
+        removed = conn.execute(f'''DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND artifact_path IS NULL
+                                   AND finished_at < strftime('%Y-%m-%d %H:%M:%f', 'now', '-{JOB_HISTORY_DAYS:d} days')''').rowcount
+        known = {row[0] for row in conn.execute('SELECT artifact_path FROM jobs WHERE artifact_path IS NOT NULL')}
+    cutoff = time.time() - DOWNLOAD_TTL_HOURS * 3600
+    orphans = [path for path in glob.glob(os.path.join(DOWNLOAD_DIR, 'job_*'))
+               if path not in known and os.path.getmtime(path) < cutoff]
+    for path in orphans:
+        os.remove(path)
+    return f"{len(expired)} Downloads abgelaufen, {len(orphans)} verwaiste Dateien, {removed} alte Aufträge entfernt"
+
+
+def task_compact_transcripts(ctx: JobContext) -> str:
+    from .revisions import compact_pending
+    return f"{compact_pending(ctx.store)} Transkripte kompaktiert"
+
+
+def task_analytics(ctx: JobContext) -> str:
+    from .analytics import refresh
+    return f"{refresh(ctx.store)} Interviews in die Auswertung gebucht"
+
+
+def task_analyze(ctx: JobContext) -> str:
+    # Statistiken für den Query-Planer; analysis_limit hält ANALYZE auch bei grossen Tabellen kurz
+    with ctx.store.pool.connection() as conn:
+        conn.execute('PRAGMA analysis_limit = 1000')
+        conn.execute('ANALYZE')
+    return "Statistiken aktualisiert"
+
+
+def task_fts_optimize(ctx: JobContext) -> str:
+    # FTS5-Segmente zusammenführen (viele kleine Segmente durch Live-Aufnahmen)
+    with ctx.store.pool.transaction() as conn:
+        conn.execute("INSERT INTO interviews_fts (interviews_fts) VALUES ('optimize')")
+    return "Suchindex optimiert"
+
+
+def task_vacuum(ctx: JobContext) -> str:
+    with ctx.store.pool.connection() as conn:
+        before = conn.execute('PRAGMA page_count').fetchone()[0]
+        conn.execute('VACUUM')
+        # VACUUM schreibt die ganze Datenbank ins WAL; danach zurücksetzen
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        after = conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    return f"{(before - after) * page_size / 1024 ** 2:.1f} MB freigegeben"
+
+
+def backup_database(store: InterviewStore, target: str, progress: Optional[Callable[[int, int], None]] = None,
+                    pages: int = BACKUP_STEP_PAGES) -> str:
+    # Online-Backup-API: schrittweise Kopie einer konsistenten Momentaufnahme, Schreiber werden nicht blockiert
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    with store.pool.connection() as conn:
+        destination = sqlite3.connect(target + '.part')
+        try:
+            conn.backup(destination, pages=pages,
+                        progress=(lambda status, remaining, total: progress(total - remaining, total)) if progress else None)
+        finally:
+            destination.close()
+    os.replace(target + '.part', target)
+    return target
+
+
+def task_backup(ctx: JobContext) -> str:
+    name = os.path.splitext(os.path.basename(ctx.store.pool.path))[0]
+    target = os.path.join(BACKUP_DIR, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+    backup_database(ctx.store, target, lambda done, total: ctx.progress(done, total))
+    # Nur die neuesten KEEP_BACKUPS behalten
+    backups = sorted(glob.glob(os.path.join(BACKUP_DIR, f'{glob.escape(name)}_*.db')))
+    for path in backups[:-KEEP_BACKUPS]:
+        os.remove(path)
+    return f"Backup {target} ({os.path.getsize(target) / 1024 ** 2:.1f} MB)"
+
+
+def task_audio_retention(ctx: JobContext) -> str:
+    from .audio import AudioStore
+    result = AudioStore(ctx.store).enforce_retention()
+    return f"Audio von {result['interviews']} Interviews entfernt, {result['blobs']} Dateien gelöscht"
+
+
+TASKS: Dict[str, Callable[[JobContext], Any]] = {
+    'export': task_export,
+    'report': task_report,
+    'cleanup': task_cleanup,
+    'compact_transcripts': task_compact_transcripts,
+    'analytics': task_analytics,
+    'analyze': task_analyze,
+    'fts_optimize': task_fts_optimize,
+    'vacuum': task_vacuum,
+    'backup': task_backup,
+    'audio_retention': task_audio_retention,
+}
+
+
+def claim_job(store: InterviewStore, worker: str, quiet: Optional[bool] = None) -> Optional[JobContext]:
+    # Erst lesend prüfen, damit leerlaufende Worker nicht bei jedem Abfragen die Schreibsperre nehmen
+    with store.pool.connection() as conn:
+        if conn.execute(SQL_NEXT_JOB, {'quiet': 1}).fetchone() is None:
+            return None
+    if quiet is None:
+        quiet = is_quiet(store)
+    with store.pool.transaction() as conn:
+        row = conn.execute(SQL_CLAIM, {'worker': worker, 'quiet': int(quiet)}).fetchone()
+    if row is None:
+        return None
+    return JobContext(store, row[0], row[1], json.loads(row[2] or '{}'))
+
+
+def run_job(store: InterviewStore, ctx: JobContext):
+    status, error, result = 'done', None, None
+    try:
+        result = TASKS[ctx.kind](ctx)
+    except JobCancelled:
+        status = 'cancelled'
+    except Exception as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+    artifact = result if isinstance(result, dict) else {}
+    message = artifact.get('message') if artifact else result
+    path = artifact.get('path')
+    with store.pool.transaction() as conn:
+        conn.execute(SQL_FINISH, (status, error, message, status, path, artifact.get('name'), artifact.get('mime'),
+                                  os.path.getsize(path) if path else None, path, f'+{DOWNLOAD_TTL_HOURS * 3600:.0f} seconds',
+                                  ctx.id))
+    # Wiederkehrende Wartung: nächsten Lauf einplanen, auch nach einem Fehler
+    if ctx.kind in MAINTENANCE:
+        schedule_maintenance(store, ctx.kind, MAINTENANCE[ctx.kind][0])
+
+
+class JobWorkerPool:
+    # Worker-Threads plus ein Thread für Lebenszeichen, verwaiste Aufträge und die Wartungsplanung
+    def __init__(self, db_path: str = DB_PATH, workers: int = JOB_WORKERS, poll_interval: float = 1.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.store = InterviewStore(db_path, pool_size=workers + 1)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        requeue_stale(self.store)
+        schedule_maintenance(self.store)
+        for worker in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.name}:{worker}", worker), daemon=True,
+                                      name=f"job-worker-{worker}")
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._housekeeping, daemon=True, name="job-housekeeping")
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def _work(self, name: str, worker: int):
+        while not self._stop.is_set():
+            try:
+                ctx = claim_job(self.store, name)
+            except sqlite3.OperationalError:
+                ctx = None
+            if ctx is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._lock:
+                self._running[worker] = ctx.id
+            try:
+                run_job(self.store, ctx)
+            except sqlite3.OperationalError:
+                # Abschluss nicht gespeichert: requeue_stale nimmt den Auftrag später wieder auf
+                pass
+            finally:
+                with self._lock:
+                    self._running.pop(worker, None)
+
+    def _housekeeping(self):
+        while not self._stop.wait(HOUSEKEEPING_SECONDS):
+            try:
+                with self._lock:
+                    running = list(self._running.values())
+                with self.store.pool.transaction() as conn:
+                    conn.executemany(f'UPDATE jobs SET heartbeat_at = {SQL_NOW} WHERE id = ?', [(job_id,) for job_id in running])
+                requeue_stale(self.store)
+                schedule_maintenance(self.store)
+            except sqlite3.OperationalError:
+                pass
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.store.close()
+
+    def alive(self) -> int:
+        return sum(thread.is_alive() for thread in self._threads)
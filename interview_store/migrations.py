@@ -0,0 +1,209 @@
+import re
+import sqlite3
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .db import (SQL_FIRST_PAGE, SQL_GET_INTERVIEW, SQL_NEXT_PAGE, SQL_NOW, SQL_SEGMENT_TEXTS, ConnectionPool,
+                 add_column, create_schema)
+
+# Häufig abgefragte metadata-Felder als virtuelle generierte Spalten (meta_<feld>) mit Index.
+# Neue Felder brauchen eine neue Migration, die add_metadata_column aufruft.
+METADATA_FIELDS = (('duration_s', 'REAL'),)
+
+
+def add_metadata_column(conn: sqlite3.Connection, field: str, declaration: str):
+    # Ungültiges JSON ergibt NULL statt eines Fehlers beim Lesen
+    add_column(conn, 'interviews', f'meta_{field}',
+               f"{declaration} GENERATED ALWAYS AS (CASE WHEN json_valid(metadata) THEN json_extract(metadata, '$.{field}') END) VIRTUAL")
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_interviews_meta_{field} ON interviews (meta_{field})')
+
+
+def _baseline(conn: sqlite3.Connection):
+    # Stand vor der Versionierung; alle Schritte sind idempotent, bestehende Datenbanken werden ergänzt
+    from .analytics import create_analytics_schema
+    from .audio import create_audio_schema
+    from .retranscribe import create_retranscribe_schema
+    from .stt import create_stt_schema
+    from .sync import create_sync_schema
+    from .vocabulary import create_vocabulary_schema
+    create_schema(conn)
+    create_stt_schema(conn)
+    create_audio_schema(conn)
+    create_vocabulary_schema(conn)
+    create_retranscribe_schema(conn)
+    create_analytics_schema(conn)
+    create_sync_schema(conn)
+
+
+def _overview_indexes(conn: sqlite3.Connection):
+    # Übersicht: Seite komplett aus dem Index (ohne die grossen Transkriptionen zu lesen). Normale Spalte
+    # per Trigger statt generierter Spalte: SQLite < 3.41 nutzt Indizes darauf nicht als Covering-Index
+    add_column(conn, 'interviews', 'transcription_length', 'INTEGER')
+    conn.execute('UPDATE interviews SET transcription_length = length(transcription)')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS interviews_length_ai AFTER INSERT ON interviews BEGIN
+        UPDATE interviews SET transcription_length = length(new.transcription) WHERE id = new.id;
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS interviews_length_au AFTER UPDATE OF transcription ON interviews BEGIN
+        UPDATE interviews SET transcription_length = length(new.transcription) WHERE id = new.id;
+    END''')
+    conn.execute('DROP INDEX IF EXISTS idx_interviews_created_at')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_interviews_overview ON interviews
+                    (created_at DESC, id DESC, interview_date, interviewer, interviewee_info, transcription_length)''')
+    # Export/Berichte: Filter nach Zeitraum und Interviewer*in
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_interviews_date ON interviews (interview_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_interviews_interviewer_date ON interviews (interviewer, interview_date)')
+
+
+def _metadata_columns(conn: sqlite3.Connection):
+    for field, declaration in METADATA_FIELDS:
+        add_metadata_column(conn, field, declaration)
+
+
+def _transcript_revisions(conn: sqlite3.Connection):
+    from .revisions import create_revisions_schema
+    create_revisions_schema(conn)
+
+
+def _segment_tail(conn: sqlite3.Connection):
+    # Live-Segmente nach einer Bearbeitung: Zähler pro Kopf, Trigger mit angehängten Segmenten neu anlegen.
+    # Bisherige Köpfe: alle vorhandenen Segmente gelten als enthalten (wie bisher gelesen)
+    from .revisions import create_revisions_schema
+    from .search import CURRENT_TRANSCRIPT, HEAD_AWARE_TRIGGERS, create_search_index
+    add_column(conn, 'transcript_heads', 'segment_seq', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(conn, 'transcript_heads', 'compacted_seq', 'INTEGER NOT NULL DEFAULT 0')
+    conn.execute('''UPDATE transcript_heads SET segment_seq = (
+        SELECT COALESCE(MAX(seq), 0) FROM interview_segments WHERE interview_id = transcript_heads.interview_id)''')
+    conn.execute("""UPDATE transcript_heads SET compacted_seq = segment_seq
+                    WHERE (SELECT COALESCE(transcription, '') FROM interviews WHERE id = transcript_heads.interview_id) != ''""")
+    for trigger in (*HEAD_AWARE_TRIGGERS, 'transcript_revisions_au'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    create_search_index(conn)
+    create_revisions_schema(conn)
+    conn.execute(f'''UPDATE interviews_fts SET transcription = (
+        SELECT {CURRENT_TRANSCRIPT.format(ref='interviews')} FROM interviews WHERE id = interviews_fts.rowid
+    ) WHERE rowid IN (SELECT interview_id FROM transcript_heads)''')
+
+
+def _search_rows(conn: sqlite3.Connection):
+    # Suchindex mit Zeilen pro Feld und Live-Segment (search.py) statt einer Zeile pro Interview
+    from .search import LEGACY_TRIGGERS, create_search_index, rebuild_search_index
+    for trigger in LEGACY_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS interviews_fts')
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+def _sync_versions(conn: sqlite3.Connection):
+    # Änderungszähler pro Station und Zeile (sync.py); Trigger neu anlegen, damit sie ihn fortschreiben
+    from .sync import SYNC_TRIGGERS, create_sync_schema
+    for trigger in SYNC_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    create_sync_schema(conn)
+
+
+def _retranscribe_skipped(conn: sqlite3.Connection):
+    from .retranscribe import create_retranscribe_schema
+    create_retranscribe_schema(conn)
+
+
+def _jobs(conn: sqlite3.Connection):
+    from .jobs import create_jobs_schema
+    create_jobs_schema(conn)
+
+
+# (Version, Beschreibung, Funktion) – nur anhängen, nie bestehende Einträge ändern
+MIGRATIONS: Sequence[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = (
+    (1, "Grundschema", _baseline),
+    (2, "Covering-Index für die Übersicht, Indizes für Export-Filter", _overview_indexes),
+    (3, "Generierte Spalten für metadata-Felder", _metadata_columns),
+    (4, "Transkript-Revisionen (Patches und Snapshots)", _transcript_revisions),
+    (5, "Hintergrundaufträge (Export, Berichte, Wartung)", _jobs),
+    (6, "Live-Segmente nach Transkript-Bearbeitung anhängen", _segment_tail),
+    (7, "Suchindex pro Feld und Live-Segment", _search_rows),
+    (8, "Sync: Änderungen pro Station und Zeile", _sync_versions),
+    (9, "Neutranskription: zwischenzeitlich geänderte Interviews zählen", _retranscribe_skipped),
+)
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(pool: ConnectionPool) -> List[Tuple[int, str]]:
+    # Jede Migration in eigener Schreibtransaktion; die Version wird darin erneut geprüft,
+    # damit parallel startende Prozesse nichts doppelt ausführen
+    with pool.connection() as conn:
+        if current_version(conn) >= LATEST:
+            return []
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        with pool.transaction() as conn:
+            if current_version(conn) >= version:
+                continue
+            conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at TEXT NOT NULL
+            )''')
+            apply(conn)
+            conn.execute(f'INSERT OR REPLACE INTO schema_migrations VALUES (?, ?, {SQL_NOW})', (version, description))
+            conn.execute(f'PRAGMA user_version = {version:d}')
+        applied.append((version, description))
+    return applied
+
+
+def history(pool: ConnectionPool) -> List[Dict[str, Any]]:
+    with pool.connection() as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_migrations'").fetchone():
+            return []
+        rows = conn.execute('SELECT version, description, applied_at FROM schema_migrations ORDER BY version').fetchall()
+    return [{'version': r[0], 'description': r[1], 'applied_at': r[2]} for r in rows]
+
+
+# Abfragepläne der tatsächlichen Zugriffspfade: (Name, SQL, Parameter, erwarteter Ausschnitt im Plan)
+def _plan_checks() -> List[Tuple[str, str, Sequence[Any], str]]:
+    from .export import build_query
+    from .jobs import SQL_CLAIM as SQL_CLAIM_JOB
+    from .reports import REPORT_COLUMNS
+    from .revisions import SQL_PATCHES
+    from .search import SQL_SEARCH
+    from .stt import SQL_CLAIM
+    from .sync import SQL_EXPORT
+    export_by_date = build_query('2026-01-01', '2026-12-31')
+    export_by_person = build_query('2026-01-01', None, 'Anna')
+    report_by_date = build_query('2026-01-01', '2026-12-31', columns=REPORT_COLUMNS)
+    return [
+        ("Übersicht erste Seite", SQL_FIRST_PAGE, (20,), 'COVERING INDEX idx_interviews_overview'),
+        ("Übersicht Folgeseite", SQL_NEXT_PAGE, ('2026-01-01 00:00:00', 1, 20), 'COVERING INDEX idx_interviews_overview'),
+        ("Interview laden", SQL_GET_INTERVIEW, (1,), 'INTEGER PRIMARY KEY'),
+        ("Transkript-Revisionen", SQL_PATCHES, (1, 0, 10), 'SEARCH transcript_revisions USING INDEX'),
+        ("Segmente", SQL_SEGMENT_TEXTS, (1,), 'SEARCH interview_segments USING PRIMARY KEY'),
+        ("Export nach Zeitraum", export_by_date[0], export_by_date[1], 'idx_interviews_date'),
+        ("Export nach Interviewer*in", export_by_person[0], export_by_person[1], 'idx_interviews_interviewer_date'),
+        ("Berichte nach Zeitraum", report_by_date[0], report_by_date[1], 'idx_interviews_date'),
+        ("Volltextsuche", SQL_SEARCH, {'t0': '"storch"*', 'all': '"storch"*', 'limit': 20, 'offset': 0},
+         'VIRTUAL TABLE INDEX'),
+        ("Sync-Delta", SQL_EXPORT, (0, 100, None, None), 'idx_interviews_change_seq'),
+        ("STT-Auftrag holen", SQL_CLAIM, (1, 'stub'), 'idx_stt_jobs_status'),
+        ("Hintergrundauftrag holen", SQL_CLAIM_JOB, {'worker': 'stub', 'quiet': 1}, 'idx_jobs_status'),
+    ]
+
+
+# Vollständiger Durchlauf einer Tabelle (ohne Index) ist immer ein Fehler
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (COVERING )?INDEX)(?! VIRTUAL TABLE)')
+
+
+def check_query_plans(pool: ConnectionPool) -> List[Dict[str, Any]]:
+    results = []
+    with pool.connection() as conn:
+        for name, sql, params, expected in _plan_checks():
+            plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            text = '\n'.join(plan)
+            # Zwischenergebnisse (MATERIALIZE/CO-ROUTINE) zu durchlaufen ist kein Tabellen-Vollscan
+            derived = {line.split()[-1] for line in plan if line.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+            scans = [line for line in plan if any(m.group(1) not in derived for m in FULL_SCAN.finditer(line))]
+            problems = []
+            if expected not in text:
+                problems.append(f"erwartet: {expected}")
+            problems.extend(f"Vollscan: {line}" for line in scans)
+            results.append({'name': name, 'plan': plan, 'ok': not problems, 'problems': problems})
+    return results
@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# PROFILE_LOG=<datei>: pro Rerun/Anfrage eine JSON-Zeile mit Laufzeiten, Abschnitten und SQL-Statistik anhängen.
+# PROFILE_RELEASE kennzeichnet den Stand (z.B. Git-Tag), damit sich Releases vergleichen lassen.
+PROFILE_LOG = os.environ.get('PROFILE_LOG', '')
+PROFILE_RELEASE = os.environ.get('PROFILE_RELEASE', '')
+# Anzahl der teuersten Anweisungen pro Eintrag
+TOP_STATEMENTS = 10
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class Profiler:
+    # Sammelt pro Thread (Streamlit: ein Thread pro Rerun); ohne Pfad ist alles ein No-op
+    def __init__(self, path: str = PROFILE_LOG, release: str = PROFILE_RELEASE):
+        self.path = path
+        self.release = release
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start(self):
+        self._local.started = time.perf_counter()
+        self._local.sections = defaultdict(float)
+        self._local.statements = {}
+
+    def record_sql(self, sql: str, seconds: float, executions: int = 0):
+        # executions = 0: Zeilen abholen, zählt nur zur Dauer der Anweisung
+        statements = getattr(self._local, 'statements', None)
+        if statements is None:
+            return
+        entry = statements.get(sql)
+        if entry is None:
+            statements[sql] = [executions, seconds]
+        else:
+            entry[0] += executions
+            entry[1] += seconds
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        if not self.enabled or not hasattr(self._local, 'sections'):
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.sections[name] += time.perf_counter() - start
+
+    def finish(self, kind: str = 'rerun', **fields) -> Optional[Dict[str, Any]]:
+        if not self.enabled or not hasattr(self._local, 'started'):
+            return None
+        statements = self._local.statements
+        top = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)[:TOP_STATEMENTS]
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'kind': kind,
+            'release': self.release,
+            'ms': round((time.perf_counter() - self._local.started) * 1000, 2),
+            'sql_count': sum(count for count, _ in statements.values()),
+            'sql_ms': round(sum(seconds for _, seconds in statements.values()) * 1000, 2),
+            'sections': {name: round(seconds * 1000, 2) for name, seconds in self._local.sections.items()},
+            'top_sql': [{'sql': sql, 'count': count, 'ms': round(seconds * 1000, 3)} for sql, (count, seconds) in top],
+            **fields,
+        }
+        del self._local.started
+        self._local.statements = None
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(line + '\n')
+        return entry
+
+
+profiler = Profiler()
+
+
+def _statement(sql: str) -> str:
+    return WHITESPACE_RE.sub(' ', sql).strip()[:300]
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    # Zeit für execute und das Abholen der Zeilen zählt zur jeweiligen Anweisung
+    def _timed(self, method, *args, executions: int = 0):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            profiler.record_sql(self._sql, time.perf_counter() - start, executions)
+
+    def execute(self, sql, parameters=()):
+        self._sql = _statement(sql)
+        return self._timed(super().execute, sql, parameters, executions=1)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql = _statement(sql)
+        return self._timed(super().executemany, sql, seq_of_parameters, executions=1)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    # Wird von ConnectionPool nur verwendet, wenn PROFILE_LOG gesetzt ist
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Pro (Release, Art): Anzahl, Median/p95 der Laufzeit und mittlere SQL-Anzahl
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for entry in entries:
+        groups[(entry.get('release', ''), entry.get('kind', ''))].append(entry)
+    rows = []
+    for (release, kind), group in sorted(groups.items()):
+        ms = [entry['ms'] for entry in group]
+        rows.append({'release': release, 'kind': kind, 'count': len(group),
+                     'p50_ms': statistics.median(ms), 'p95_ms': _percentile(ms, 0.95),
+                     'sql_count': statistics.mean(entry['sql_count'] for entry in group),
+                     'sql_ms': statistics.mean(entry['sql_ms'] for entry in group)})
+    return rows
@@ -0,0 +1,214 @@
+import json
+import multiprocessing
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .db import SQL_NOW, SQL_TRANSCRIPT, InterviewStore, add_column
+from .revisions import current_text, pending_ids
+from .vocabulary import Normalizer, load_normalizer
+
+PAGE = 200
+WRITE_BATCH = 50
+
+# Stand eines Interviews beim Lesen; --apply überschreibt nur, wenn er sich bis zum Schreiben nicht geändert hat
+# (Bearbeitung, neue Segmente, Transkript-Revision)
+SQL_STAMP = ("COALESCE(updated_at, created_at) || '#' || "
+             "COALESCE((SELECT head_rev FROM transcript_heads WHERE interview_id = interviews.id), 0)")
+SQL_APPLY = f'UPDATE interviews SET transcription = ?, updated_at = {SQL_NOW} WHERE id = ? AND {SQL_STAMP} = ?'
+
+RETRANSCRIBE_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS retranscribe_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        config TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        last_interview_id INTEGER NOT NULL DEFAULT 0,
+        processed INTEGER NOT NULL DEFAULT 0,
+        chars INTEGER NOT NULL DEFAULT 0,
+        seconds REAL NOT NULL DEFAULT 0,
+        started_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS transcript_versions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        interview_id INTEGER NOT NULL REFERENCES interviews (id) ON DELETE CASCADE,
+        run_id INTEGER REFERENCES retranscribe_runs (id),
+        source TEXT NOT NULL,
+        text TEXT NOT NULL,
+        vocabulary_version INTEGER,
+        created_at TEXT NOT NULL,
+        UNIQUE (run_id, interview_id)
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_transcript_versions_interview ON transcript_versions (interview_id, id)',
+)
+
+
+def create_retranscribe_schema(conn: sqlite3.Connection):
+    for statement in RETRANSCRIBE_SCHEMA:
+        conn.execute(statement)
+    add_column(conn, 'transcript_versions', 'vocabulary_version', 'INTEGER')
+    add_column(conn, 'retranscribe_runs', 'skipped', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def postprocess(text: str, normalizer: Normalizer) -> str:
+    # Zeilenumbrüche (Absätze, Sprecherwechsel) bleiben; nur Leerraum innerhalb der Zeilen vereinheitlichen
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    return normalizer.normalize('\n'.join(lines).strip('\n'))
+
+
+# Worker-Prozesse: Zustand einmal pro Prozess im Initializer aufbauen
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(config: Dict[str, Any]):
+    _worker['config'] = config
+    _worker['normalizer'] = Normalizer(config['vocabulary']['rules'], config['vocabulary']['version'])
+    if config['source'] == 'audio':
+        from .audio import AudioStore
+        from .stt import make_backend
+        _worker['backend'] = make_backend(config['backend'], **config.get('backend_options', {}))
+        _worker['store'] = InterviewStore(config['db_path'], pool_size=1)
+        _worker['audio'] = AudioStore(_worker['store'], config['audio_dir'])
+
+
+def _process(item: Tuple[int, Optional[str], str]) -> Tuple[int, Optional[str], str]:
+    interview_id, text, stamp = item
+    if _worker['config']['source'] == 'audio':
+        from .audio import write_wav
+        audio = _worker['audio']
+        parts = []
+        for chunk in audio.chunks(interview_id):
+            parts.append(_worker['backend'].transcribe(write_wav(audio.read_chunk(chunk), chunk['sample_rate'])))
+        text = ' '.join(part for part in parts if part) if parts else None
+    if text is None:
+        return interview_id, None, stamp
+    return interview_id, postprocess(text, _worker['normalizer']), stamp
+
+
+def iter_items(store: InterviewStore, source: str, after_id: int = 0,
+               limit: Optional[int] = None) -> Iterator[Tuple[int, Optional[str], str]]:
+    # Keyset-Seiten mit kurzen Lesetransaktionen, damit der WAL-Checkpoint nicht blockiert wird
+    if source == 'audio':
+        sql = f'''SELECT c.interview_id, NULL, (SELECT {SQL_STAMP} FROM interviews WHERE id = c.interview_id)
+                  FROM (SELECT DISTINCT interview_id FROM audio_chunks WHERE interview_id > ? ORDER BY interview_id LIMIT ?) c'''
+    else:
+        sql = f'SELECT id, {SQL_TRANSCRIPT}, {SQL_STAMP} FROM interviews WHERE id > ? ORDER BY id LIMIT ?'
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page = PAGE if remaining is None else min(PAGE, remaining)
+        with store.pool.connection() as conn:
+            rows = conn.execute(sql, (after_id, page)).fetchall()
+            if source != 'audio':
+                # Offene Transkript-Patches mitnehmen, sonst überschreibt das Ergebnis die Bearbeitung
+                pending = pending_ids(conn)
+                rows = [(row[0], current_text(conn, row[0]), row[2]) if row[0] in pending else row for row in rows]
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        after_id = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def start_run(store: InterviewStore, config: Dict[str, Any]) -> int:
+    with store.pool.transaction() as conn:
+        return conn.execute(f'INSERT INTO retranscribe_runs (config, started_at, updated_at) VALUES (?, {SQL_NOW}, {SQL_NOW})',
+                            (json.dumps(config, ensure_ascii=False),)).lastrowid
+
+
+def load_run(store: InterviewStore, run_id: int) -> Dict[str, Any]:
+    with store.pool.connection() as conn:
+        row = conn.execute('SELECT config, status, last_interview_id, processed, chars, seconds, skipped '
+                           'FROM retranscribe_runs WHERE id = ?', (run_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Lauf #{run_id} existiert nicht")
+    return {'id': run_id, 'config': json.loads(row[0]), 'status': row[1], 'last_interview_id': row[2],
+            'processed': row[3], 'chars': row[4], 'seconds': row[5], 'skipped': row[6]}
+
+
+def _write_batch(store: InterviewStore, run_id: int, results: List[Tuple[int, str, str]], config: Dict[str, Any],
+                 last_id: int, processed: int, chars: int, seconds: float) -> int:
+    # Kurze Schreibtransaktion pro Batch: Versionen + Checkpoint atomar, Live-App wartet höchstens Millisekunden.
+    # Liefert die Zahl der Interviews, die --apply wegen zwischenzeitlicher Änderung ausgelassen hat
+    skipped = 0
+    with store.pool.transaction() as conn:
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO transcript_versions (interview_id, run_id, source, text, vocabulary_version, created_at)
+            VALUES (?, ?, ?, ?, ?, {SQL_NOW})
+        ''', [(interview_id, run_id, config['source'], text, config['vocabulary']['version']) for interview_id, text, _ in results])
+        if config['apply'] and results:
+            # Neue Fassung bleibt in transcript_versions, überschreibt aber keine neuere Bearbeitung
+            cursor = conn.executemany(SQL_APPLY, [(text, interview_id, stamp) for interview_id, text, stamp in results])
+            skipped = len(results) - cursor.rowcount
+        conn.execute(f'''
+            UPDATE retranscribe_runs SET last_interview_id = ?, processed = ?, chars = ?, seconds = ?, skipped = skipped + ?,
+                updated_at = {SQL_NOW}
+            WHERE id = ?
+        ''', (last_id, processed, chars, seconds, skipped, run_id))
+    if config['apply']:
+        store.cache.invalidate(*(interview_id for interview_id, _, _ in results))
+    return skipped
+
+
+def run(store: InterviewStore, config: Optional[Dict[str, Any]] = None, resume: Optional[int] = None,
+        workers: int = 2, limit: Optional[int] = None, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    if resume is not None:
+        state = load_run(store, resume)
+        config = state['config']
+    else:
+        config = dict(config or {})
+        config.setdefault('source', 'text')
+        if 'vocabulary' not in config:
+            normalizer = load_normalizer(store)
+            config['vocabulary'] = {'version': normalizer.version, 'rules': normalizer.rules}
+        config.setdefault('apply', False)
+        config.setdefault('db_path', store.pool.path)
+        state = {'id': start_run(store, config), 'last_interview_id': 0, 'processed': 0, 'chars': 0, 'seconds': 0.0,
+                 'skipped': 0}
+    run_id = state['id']
+    processed, chars, previous_seconds, skipped = state['processed'], state['chars'], state['seconds'], state['skipped']
+    last_id = state['last_interview_id']
+    start = time.perf_counter()
+    results: List[Tuple[int, str, str]] = []
+
+    def stats():
+        seconds = previous_seconds + time.perf_counter() - start
+        return {'run_id': run_id, 'processed': processed, 'chars': chars, 'seconds': seconds,
+                'interviews_per_min': processed / seconds * 60 if seconds else 0.0,
+                'chars_per_sec': chars / seconds if seconds else 0.0, 'last_interview_id': last_id, 'skipped': skipped}
+
+    items = iter_items(store, config['source'], last_id, limit)
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(config,)) as pool:
+        # imap hält die Reihenfolge ein: der Checkpoint (letzte id) ist damit immer lückenlos
+        for interview_id, text, stamp in pool.imap(_process, items, chunksize=8):
+            last_id = interview_id
+            processed += 1
+            if text is not None:
+                results.append((interview_id, text, stamp))
+                chars += len(text)
+            if processed % WRITE_BATCH == 0:
+                skipped += _write_batch(store, run_id, results, config, last_id, processed, chars, stats()['seconds'])
+                results = []
+                if progress:
+                    progress(stats())
+    skipped += _write_batch(store, run_id, results, config, last_id, processed, chars, stats()['seconds'])
+    # Mit --limit abgebrochene Läufe bleiben fortsetzbar
+    if limit is None or processed - state['processed'] < limit:
+        with store.pool.transaction() as conn:
+            conn.execute(f"UPDATE retranscribe_runs SET status = 'done', updated_at = {SQL_NOW} WHERE id = ?", (run_id,))
+    return stats()
+
+
+def default_config(store: InterviewStore, source: str = 'text', vocabulary_version: Optional[int] = None,
+                   apply: bool = False, backend: str = 'stub', model: str = '', audio_dir: Optional[str] = None) -> Dict[str, Any]:
+    # Regelsatz als Schnappschuss in die Konfiguration: ein fortgesetzter Lauf nutzt exakt dieselben Regeln
+    normalizer = load_normalizer(store, vocabulary_version)
+    config = {'source': source, 'apply': apply, 'db_path': store.pool.path,
+              'vocabulary': {'version': normalizer.version, 'rules': normalizer.rules}}
+    if source == 'audio':
+        from .audio import AUDIO_DIR
+        config.update(backend=backend, backend_options={'model': model} if model else {}, audio_dir=audio_dir or AUDIO_DIR)
+    return config
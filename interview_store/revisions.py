@@ -0,0 +1,311 @@
+import difflib
+import json
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .db import SQL_LAST_SEGMENT_SEQ, SQL_NOW, SQL_TRANSCRIPT, SQL_UPDATE_TRANSCRIPTION, InterviewStore
+
+# Bearbeitungen am Transkript werden als Patches gespeichert (Aufwand ~ Grösse der Änderung, nicht des Textes).
+# interviews.transcription (Suche, Analytics) wird erst beim Kompaktieren neu geschrieben; Export, Berichte und Sync
+# lesen offene Patches dazu (pending_ids/current_text). Live-Segmente, die nach dem bearbeiteten Stand eingehen
+# (seq > segment_seq), werden beim Lesen angehängt und mit dem nächsten Speichern des Editors übernommen.
+COMPACT_PATCHES = 100
+# Kompaktieren, sobald die offenen Patches diesen Anteil der Textlänge erreichen (mindestens COMPACT_MIN_CHARS)
+COMPACT_RATIO = 0.25
+COMPACT_MIN_CHARS = 4096
+# Bei jedem neuen Snapshot bleiben die Revisionen ab dem KEEP_SNAPSHOTS-letzten Snapshot erhalten
+KEEP_SNAPSHOTS = 10
+# Grössere geänderte Bereiche wortweise vergleichen statt als einen Block zu speichern
+DIFF_WORDS_ABOVE = 2000
+TOKEN_RE = re.compile(r'\s+|\S+')
+
+REVISIONS_SCHEMA = (
+    # kind = 'snapshot' (data = ganzer Text) oder 'patch' (data = JSON [[start, ende, ersatz], ...] zur Vorgängerrevision)
+    '''CREATE TABLE IF NOT EXISTS transcript_revisions (
+        interview_id INTEGER NOT NULL REFERENCES interviews (id) ON DELETE CASCADE,
+        rev INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK (kind IN ('snapshot', 'patch')),
+        data TEXT NOT NULL,
+        note TEXT,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (interview_id, rev)
+    )''',
+    # Stand pro Interview: compacted_rev = Revision, die in interviews.transcription steht;
+    # segment_seq/compacted_seq = letztes Live-Segment, das in head_rev bzw. in der Spalte enthalten ist
+    '''CREATE TABLE IF NOT EXISTS transcript_heads (
+        interview_id INTEGER PRIMARY KEY REFERENCES interviews (id) ON DELETE CASCADE,
+        head_rev INTEGER NOT NULL,
+        snapshot_rev INTEGER NOT NULL,
+        compacted_rev INTEGER NOT NULL,
+        pending_patches INTEGER NOT NULL DEFAULT 0,
+        pending_chars INTEGER NOT NULL DEFAULT 0,
+        length INTEGER NOT NULL DEFAULT 0,
+        segment_seq INTEGER NOT NULL DEFAULT 0,
+        compacted_seq INTEGER NOT NULL DEFAULT 0
+    )''',
+    # Jedes Schreiben der Spalte (Kompaktieren, Neutranskription, Sync-Import) wird zum Snapshot;
+    # nur für Interviews mit Revisionsverlauf, damit nicht jeder Text doppelt gespeichert wird.
+    # Ein von aussen geschriebener Text enthält alle bisherigen Segmente (_compact setzt die Zähler danach selbst)
+    f'''CREATE TRIGGER IF NOT EXISTS transcript_revisions_au AFTER UPDATE OF transcription ON interviews
+    WHEN EXISTS (SELECT 1 FROM transcript_heads WHERE interview_id = new.id) BEGIN
+        INSERT INTO transcript_revisions (interview_id, rev, kind, data, created_at)
+            SELECT new.id, head_rev + 1, 'snapshot', COALESCE(new.transcription, ''), {SQL_NOW}
+            FROM transcript_heads WHERE interview_id = new.id;
+        UPDATE transcript_heads SET head_rev = head_rev + 1, snapshot_rev = head_rev + 1, compacted_rev = head_rev + 1,
+            pending_patches = 0, pending_chars = 0, length = length(COALESCE(new.transcription, '')),
+            (segment_seq, compacted_seq) = (SELECT COALESCE(MAX(seq), 0), COALESCE(MAX(seq), 0)
+                                            FROM interview_segments WHERE interview_id = new.id)
+        WHERE interview_id = new.id;
+        DELETE FROM transcript_revisions WHERE interview_id = new.id AND rev < (
+            SELECT rev FROM transcript_revisions WHERE interview_id = new.id AND kind = 'snapshot'
+            ORDER BY rev DESC LIMIT 1 OFFSET {KEEP_SNAPSHOTS - 1:d}
+        );
+    END''',
+)
+
+SQL_HEAD = ('SELECT head_rev, snapshot_rev, compacted_rev, pending_patches, pending_chars, segment_seq '
+            'FROM transcript_heads WHERE interview_id = ?')
+SQL_SNAPSHOT = '''SELECT rev, data FROM transcript_revisions
+                  WHERE interview_id = ? AND rev <= ? AND kind = 'snapshot' ORDER BY rev DESC LIMIT 1'''
+SQL_PATCHES = 'SELECT data FROM transcript_revisions WHERE interview_id = ? AND rev > ? AND rev <= ? ORDER BY rev'
+SQL_INSERT_REVISION = f'''INSERT INTO transcript_revisions (interview_id, rev, kind, data, note, created_at)
+                          VALUES (?, ?, ?, ?, ?, {SQL_NOW})'''
+SQL_SEGMENTS_BETWEEN = 'SELECT seq, text FROM interview_segments WHERE interview_id = ? AND seq > ? AND seq <= ? ORDER BY seq'
+SQL_PENDING = 'SELECT interview_id FROM transcript_heads WHERE head_rev > compacted_rev'
+
+Patch = List[Tuple[int, int, str]]
+# (Revision, Text, letztes enthaltenes Segment) des zuletzt geladenen/gespeicherten Stands
+Base = Tuple[int, str, int]
+
+
+def create_revisions_schema(conn: sqlite3.Connection):
+    for statement in REVISIONS_SCHEMA:
+        conn.execute(statement)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # Binäre Suche mit Slice-Vergleichen (in C) statt zeichenweise in Python
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a.startswith(b[:mid]):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a.endswith(b[len(b) - mid:]):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def diff(old: str, new: str) -> Patch:
+    # Operationen (start, ende, ersatz) bezogen auf den alten Text, aufsteigend und ohne Überlappung
+    if old == new:
+        return []
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    old_mid, new_mid = old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+    if len(old_mid) <= DIFF_WORDS_ABOVE or not new_mid:
+        return [(prefix, len(old) - suffix, new_mid)]
+    # Mehrere verstreute Änderungen seit dem letzten Speichern
+    a, b = TOKEN_RE.findall(old_mid), TOKEN_RE.findall(new_mid)
+    offsets = [prefix]
+    for token in a:
+        offsets.append(offsets[-1] + len(token))
+    return [(offsets[i1], offsets[i2], ''.join(b[j1:j2]))
+            for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes() if tag != 'equal']
+
+
+def apply_patch(text: str, patch: Sequence[Sequence[Any]]) -> str:
+    parts, pos = [], 0
+    for start, end, replacement in patch:
+        if start < pos or end > len(text):
+            raise ValueError("Patch passt nicht zum Text")
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+def patch_size(patch: Patch) -> int:
+    return sum(len(replacement) + (end - start) for start, end, replacement in patch)
+
+
+def _text_at(conn: sqlite3.Connection, interview_id: int, rev: int) -> str:
+    snapshot = conn.execute(SQL_SNAPSHOT, (interview_id, rev)).fetchone()
+    if snapshot is None or rev < 1:
+        raise ValueError(f"Revision {rev} von Interview {interview_id} existiert nicht (mehr)")
+    text = snapshot[1]
+    for (data,) in conn.execute(SQL_PATCHES, (interview_id, snapshot[0], rev)):
+        text = apply_patch(text, json.loads(data))
+    return text
+
+
+def _segments(conn: sqlite3.Connection, interview_id: int, after: int, upto: int = 2 ** 63 - 1) -> Tuple[str, int]:
+    # Live-Segmente after < seq <= upto als Text und die letzte enthaltene seq
+    rows = conn.execute(SQL_SEGMENTS_BETWEEN, (interview_id, after, upto)).fetchall()
+    return ' '.join(text for _, text in rows), rows[-1][0] if rows else after
+
+
+def _join(text: str, tail: str) -> str:
+    return f"{text} {tail}" if text and tail else text or tail
+
+
+def read_transcript(conn: sqlite3.Connection, interview_id: int) -> Optional[Base]:
+    # Stand inklusive noch nicht kompaktierter Patches und danach eingegangener Segmente; None ohne Revisionsverlauf
+    head = conn.execute(SQL_HEAD, (interview_id,)).fetchone()
+    if head is None:
+        return None
+    tail, seq = _segments(conn, interview_id, head[5])
+    return head[0], _join(_text_at(conn, interview_id, head[0]), tail), seq
+
+
+def pending_ids(conn: sqlite3.Connection) -> Set[int]:
+    # Interviews mit Patches, die noch nicht in interviews.transcription stehen (meist nur die gerade bearbeiteten)
+    return {row[0] for row in conn.execute(SQL_PENDING)}
+
+
+def current_text(conn: sqlite3.Connection, interview_id: int) -> str:
+    return read_transcript(conn, interview_id)[1]
+
+
+def _compact(conn: sqlite3.Connection, interview_id: int, text: str, segment_seq: int):
+    # Der Trigger legt den Snapshot an, setzt compacted_rev und entfernt alte Revisionen; die Suchtrigger
+    # entfernen mit compacted_seq die nun enthaltenen Segmente aus dem Index
+    conn.execute(SQL_UPDATE_TRANSCRIPTION, (text, interview_id))
+    conn.execute('UPDATE transcript_heads SET segment_seq = ?, compacted_seq = ? WHERE interview_id = ?',
+                 (segment_seq, segment_seq, interview_id))
+    conn.execute('''UPDATE transcript_revisions SET note = 'Kompaktiert' WHERE interview_id = ?
+                    AND rev = (SELECT head_rev FROM transcript_heads WHERE interview_id = ?)''', (interview_id, interview_id))
+
+
+def _save(conn: sqlite3.Connection, interview_id: int, text: str, base: Optional[Base], seq: Optional[int],
+          note: Optional[str], compact: bool) -> Tuple[int, int]:
+    # seq = letztes Live-Segment, das der Aufrufer gesehen hat (in text übernommen oder bewusst entfernt);
+    # spätere Segmente bleiben erhalten und werden beim Lesen angehängt. Liefert (Revision, segment_seq)
+    if seq is None:
+        seq = conn.execute(SQL_LAST_SEGMENT_SEQ, (interview_id,)).fetchone()[0]
+    head = conn.execute(SQL_HEAD, (interview_id,)).fetchone()
+    if head is None:
+        # Erste Bearbeitung: bisherigen Text einmalig als Ausgangssnapshot. Eine gespeicherte Spalte ersetzt
+        # die Segmente (wie SQL_TRANSCRIPT ohne Verlauf), sonst die Segmente, die der Aufrufer kannte
+        column = conn.execute('SELECT transcription FROM interviews WHERE id = ?', (interview_id,)).fetchone()
+        if column is None:
+            raise ValueError(f"Interview {interview_id} existiert nicht")
+        if column[0]:
+            current, compacted_rev = column[0], 1
+            segment_seq = compacted_seq = conn.execute(SQL_LAST_SEGMENT_SEQ, (interview_id,)).fetchone()[0]
+        else:
+            current, compacted_rev = _segments(conn, interview_id, 0, seq)[0], 0
+            segment_seq, compacted_seq = seq, 0
+        conn.execute(SQL_INSERT_REVISION, (interview_id, 1, 'snapshot', current, 'Ausgangstext'))
+        conn.execute('''INSERT INTO transcript_heads (interview_id, head_rev, snapshot_rev, compacted_rev, length,
+                        segment_seq, compacted_seq) VALUES (?, 1, 1, ?, ?, ?, ?)''',
+                     (interview_id, compacted_rev, len(current), segment_seq, compacted_seq))
+        head = (1, 1, compacted_rev, 0, 0, segment_seq)
+    elif base is not None and base[0] == head[0] and base[2] <= head[5]:
+        # Der Aufrufer kennt den zuletzt gespeicherten Stand meist schon; sonst aus der DB rekonstruieren
+        current = base[1]
+    else:
+        current = _text_at(conn, interview_id, head[0])
+    head_rev, _, compacted_rev, pending_patches, pending_chars, segment_seq = head
+    patch = diff(current, text)
+    if patch or seq > segment_seq:
+        head_rev += 1
+        segment_seq = max(segment_seq, seq)
+        size = patch_size(patch)
+        conn.execute(SQL_INSERT_REVISION, (interview_id, head_rev, 'patch',
+                                           json.dumps(patch, ensure_ascii=False, separators=(',', ':')), note))
+        conn.execute('''UPDATE transcript_heads SET head_rev = ?, pending_patches = pending_patches + 1,
+                        pending_chars = pending_chars + ?, length = ?, segment_seq = ? WHERE interview_id = ?''',
+                     (head_rev, size, len(text), segment_seq, interview_id))
+        pending_patches += 1
+        pending_chars += size
+    if head_rev != compacted_rev and (compact or pending_patches >= COMPACT_PATCHES
+                                      or pending_chars >= max(COMPACT_MIN_CHARS, len(text) * COMPACT_RATIO)):
+        _compact(conn, interview_id, text, segment_seq)
+        return head_rev + 1, segment_seq
+    return head_rev, segment_seq
+
+
+def save_transcript(store: InterviewStore, interview_id: int, text: str, base: Optional[Base] = None,
+                    note: Optional[str] = None, compact: bool = False) -> Base:
+    # base = Stand aus load_transcript bzw. dem letzten Speichern; ohne base gelten alle Segmente als gesehen.
+    # Liefert den neuen Stand (Basis für das nächste Speichern)
+    text = text or ''
+    with store.pool.transaction() as conn:
+        rev, seq = _save(conn, interview_id, text, base, base[2] if base is not None else None, note, compact)
+    store.cache.invalidate(interview_id)
+    return rev, text, seq
+
+
+def load_transcript(store: InterviewStore, interview_id: int) -> Base:
+    # Aktueller Text für den Editor; Revision 0 = noch kein Verlauf
+    with store.pool.connection() as conn:
+        current = read_transcript(conn, interview_id)
+        if current is None:
+            row = conn.execute(f'SELECT {SQL_TRANSCRIPT} FROM interviews WHERE id = ?', (interview_id,)).fetchone()
+            current = (0, (row[0] if row else None) or '', conn.execute(SQL_LAST_SEGMENT_SEQ, (interview_id,)).fetchone()[0])
+    return current
+
+
+def compact(store: InterviewStore, interview_id: int) -> bool:
+    # Erst lesend prüfen, damit Aufrufer ohne offene Patches nicht die Schreibsperre nehmen
+    with store.pool.connection() as conn:
+        head = conn.execute(SQL_HEAD, (interview_id,)).fetchone()
+    if head is None or head[0] == head[2]:
+        return False
+    with store.pool.transaction() as conn:
+        head = conn.execute(SQL_HEAD, (interview_id,)).fetchone()
+        if head is None or head[0] == head[2]:
+            return False
+        _compact(conn, interview_id, _text_at(conn, interview_id, head[0]), head[5])
+    store.cache.invalidate(interview_id)
+    return True
+
+
+def compact_pending(store: InterviewStore) -> int:
+    # Alle offenen Patches in interviews.transcription übernehmen (Wartung, CLI)
+    with store.pool.connection() as conn:
+        ids = pending_ids(conn)
+    return sum(compact(store, interview_id) for interview_id in sorted(ids))
+
+
+def rollback(store: InterviewStore, interview_id: int, rev: int) -> int:
+    # Alter Stand wird als neue Revision gespeichert; der Verlauf bleibt erhalten, spätere Segmente ebenfalls
+    with store.pool.transaction() as conn:
+        head = conn.execute(SQL_HEAD, (interview_id,)).fetchone()
+        new_rev, _ = _save(conn, interview_id, _text_at(conn, interview_id, rev), None, head[5] if head else None,
+                           f"Zurückgesetzt auf Revision {rev}", True)
+    store.cache.invalidate(interview_id)
+    return new_rev
+
+
+def text_at(store: InterviewStore, interview_id: int, rev: int) -> str:
+    with store.pool.connection() as conn:
+        return _text_at(conn, interview_id, rev)
+
+
+def history(store: InterviewStore, interview_id: int) -> List[Dict[str, Any]]:
+    # size = Zeichen des Snapshots bzw. des Patches (JSON)
+    with store.pool.connection() as conn:
+        rows = conn.execute('''SELECT rev, kind, note, created_at, length(data) FROM transcript_revisions
+                               WHERE interview_id = ? ORDER BY rev DESC''', (interview_id,)).fetchall()
+    return [{'rev': r[0], 'kind': r[1], 'note': r[2], 'created_at': r[3], 'size': r[4]} for r in rows]
+
+
+def pending_stats(store: InterviewStore) -> Dict[str, int]:
+    with store.pool.connection() as conn:
+        row = conn.execute('''SELECT COUNT(*), COALESCE(SUM(pending_patches), 0), COALESCE(SUM(pending_chars), 0)
+                              FROM transcript_heads WHERE head_rev > compacted_rev''').fetchone()
+    return {'interviews': row[0], 'patches': row[1], 'chars': row[2]}
@@ -0,0 +1,188 @@
+import json
+import re
+import sqlite3
+from typing import Any, Dict, List
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# Transkription zum Lesen: Spalte oder, falls leer, die zusammengesetzten Live-Segmente (db.SQL_TRANSCRIPT)
+SEGMENT_TEXT = '''(SELECT group_concat(text, ' ') FROM (
+    SELECT text FROM interview_segments WHERE interview_id = {ref}.id ORDER BY seq
+))'''
+TRANSCRIPT = "COALESCE(NULLIF({ref}.transcription, ''), " + SEGMENT_TEXT + ", {ref}.transcription)"
+# Mit Revisionsverlauf (transcript_heads, Migration 4): kompaktierter Text aus der Spalte plus die Live-Segmente,
+# die erst danach eingegangen sind (seq > compacted_seq). Tabelle existiert erst ab Migration 4; Trigger werden
+# erst beim Auslösen übersetzt
+HEAD_SEQ = '(SELECT compacted_seq FROM transcript_heads WHERE interview_id = {ref}.id)'
+SEGMENT_TAIL = '''(SELECT group_concat(text, ' ') FROM (
+    SELECT text FROM interview_segments WHERE interview_id = {ref}.id AND seq > ''' + HEAD_SEQ + ''' ORDER BY seq
+))'''
+CURRENT_TRANSCRIPT = ("CASE WHEN " + HEAD_SEQ + " IS NULL THEN " + TRANSCRIPT + " ELSE COALESCE("
+                      "NULLIF({ref}.transcription, '') || COALESCE(' ' || " + SEGMENT_TAIL + ", ''), "
+                      + SEGMENT_TAIL + ", {ref}.transcription, '') END")
+
+# Suchindex: mehrere Zeilen pro Interview, rowid = (id << 32) + Teil. Teil 0 = Spalte transcription,
+# 1 = notes/interviewee_info, 2 + seq = ein Live-Segment, das (noch) nicht in der Spalte steht. So kostet ein
+# neues Segment eine kleine Zeile statt eines Neuindexierens des ganzen Transkripts, und eine Notiz nur ihre Zeile
+ROW_TEXT, ROW_FIELDS, ROW_SEGMENT = 0, 1, 2
+ROW_MASK = 0xFFFFFFFF
+MAX_SEQ = ROW_MASK - ROW_SEGMENT
+# Segment ist live: mit Verlauf nach compacted_seq, sonst solange die Spalte leer ist
+LIVE_SEGMENT = '''CASE WHEN EXISTS (SELECT 1 FROM transcript_heads WHERE interview_id = {id})
+    THEN {seq} > (SELECT compacted_seq FROM transcript_heads WHERE interview_id = {id})
+    ELSE (SELECT COALESCE(transcription, '') FROM interviews WHERE id = {id}) = '' END'''
+LIVE_SEGMENT_NO_HEADS = "(SELECT COALESCE(transcription, '') FROM interviews WHERE id = {id}) = ''"
+# Segmentzeilen eines Interviews neu aufbauen; nur bei Zustandswechseln (erste Bearbeitung, Kompaktieren)
+RESYNC_SEGMENTS = f'''
+        DELETE FROM interviews_fts WHERE rowid BETWEEN ({{id}} << 32) + {ROW_SEGMENT:d} AND ({{id}} << 32) + {ROW_MASK:d};
+        INSERT INTO interviews_fts (rowid, transcription)
+            SELECT ({{id}} << 32) + {ROW_SEGMENT:d} + s.seq, s.text FROM interview_segments s
+            WHERE s.interview_id = {{id}} AND s.seq BETWEEN 0 AND {MAX_SEQ:d}
+              AND {LIVE_SEGMENT.format(id='s.interview_id', seq='s.seq')};'''
+
+FTS_SCHEMA = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS interviews_fts USING fts5 (
+        transcription, notes, interviewee_info,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_fts_rows_ai AFTER INSERT ON interviews BEGIN
+        INSERT INTO interviews_fts (rowid, transcription) VALUES ((new.id << 32) + {ROW_TEXT:d}, new.transcription);
+        INSERT INTO interviews_fts (rowid, notes, interviewee_info)
+        VALUES ((new.id << 32) + {ROW_FIELDS:d}, new.notes, new.interviewee_info);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_fts_text_au AFTER UPDATE OF transcription ON interviews BEGIN
+        DELETE FROM interviews_fts WHERE rowid = (old.id << 32) + {ROW_TEXT:d};
+        INSERT INTO interviews_fts (rowid, transcription) VALUES ((new.id << 32) + {ROW_TEXT:d}, new.transcription);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_fts_fields_au AFTER UPDATE OF notes, interviewee_info ON interviews BEGIN
+        DELETE FROM interviews_fts WHERE rowid = (old.id << 32) + {ROW_FIELDS:d};
+        INSERT INTO interviews_fts (rowid, notes, interviewee_info)
+        VALUES ((new.id << 32) + {ROW_FIELDS:d}, new.notes, new.interviewee_info);
+    END''',
+    # Ohne Verlauf ersetzt eine gespeicherte Spalte die Segmente (und eine geleerte gibt sie wieder frei)
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_fts_segments_au AFTER UPDATE OF transcription ON interviews
+    WHEN (COALESCE(old.transcription, '') = '') != (COALESCE(new.transcription, '') = '')
+      AND NOT EXISTS (SELECT 1 FROM transcript_heads WHERE interview_id = new.id) BEGIN{RESYNC_SEGMENTS.format(id='new.id')}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_fts_rows_ad AFTER DELETE ON interviews BEGIN
+        DELETE FROM interviews_fts WHERE rowid BETWEEN old.id << 32 AND (old.id << 32) + {ROW_MASK:d};
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS interview_segments_fts_row_ai AFTER INSERT ON interview_segments
+    WHEN new.seq BETWEEN 0 AND {MAX_SEQ:d} AND {LIVE_SEGMENT.format(id='new.interview_id', seq='new.seq')} BEGIN
+        INSERT INTO interviews_fts (rowid, transcription) VALUES ((new.interview_id << 32) + {ROW_SEGMENT:d} + new.seq, new.text);
+    END''',
+)
+# Erst anlegen, wenn transcript_heads existiert (Migration 4)
+HEAD_FTS_SCHEMA = (
+    f'''CREATE TRIGGER IF NOT EXISTS transcript_heads_fts_ai AFTER INSERT ON transcript_heads BEGIN{RESYNC_SEGMENTS.format(id='new.interview_id')}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS transcript_heads_fts_au AFTER UPDATE OF compacted_seq ON transcript_heads
+    WHEN new.compacted_seq != old.compacted_seq BEGIN{RESYNC_SEGMENTS.format(id='new.interview_id')}
+    END''',
+)
+# Von Migration 6 ersetzt (vorher ohne Revisionsverlauf)
+HEAD_AWARE_TRIGGERS = ('interviews_fts_au', 'interview_segments_fts_ai')
+# Index mit einer Zeile pro Interview (bis Migration 7), Transkript bei jedem Segment neu zusammengesetzt
+LEGACY_TRIGGERS = ('interviews_fts_ai', 'interviews_fts_au', 'interviews_fts_ad', 'interview_segments_fts_ai')
+
+# Pro Suchbegriff eine Teilabfrage; ein Interview trifft, wenn jeder Begriff in einer seiner Zeilen vorkommt
+# (Spalte, Notizen/Person oder ein Segment)
+TERM_IDS = 'SELECT DISTINCT rowid >> 32 AS id FROM interviews_fts WHERE interviews_fts MATCH :t{term:d}'
+# Rang: beste Zeile, die alle Begriffe enthält (FTS5 schneidet die Begriffe selbst, bm25 nur für diese Zeilen);
+# Interviews, deren Begriffe sich auf mehrere Zeilen verteilen, folgen danach. LIMIT -1 verhindert, dass SQLite
+# die Teilabfrage in die Gruppierung zieht (bm25 geht nur direkt bei MATCH)
+SQL_SCORES = '''SELECT id, MIN(score) AS score FROM (
+        SELECT rowid >> 32 AS id, bm25(interviews_fts, 10.0, 5.0, 2.0) AS score
+        FROM interviews_fts WHERE interviews_fts MATCH :all LIMIT -1
+    ) GROUP BY id'''
+
+
+def _matches(terms: int) -> str:
+    return '\n        INTERSECT '.join(TERM_IDS.format(term=term) for term in range(terms))
+
+
+def build_search(terms: int) -> str:
+    # Bei einem Begriff deckt die Bewertung schon alle Treffer ab
+    hits = SQL_SCORES if terms == 1 else f'''SELECT m.id, COALESCE(s.score, 0) AS score
+        FROM ({_matches(terms)}) m LEFT JOIN ({SQL_SCORES}) s ON s.id = m.id'''
+    return f'''
+    SELECT i.id, i.interview_date, i.interviewer, page.score
+    FROM (
+        SELECT id, score FROM ({hits})
+        ORDER BY score, id DESC LIMIT :limit OFFSET :offset
+    ) page JOIN interviews i ON i.id = page.id
+    ORDER BY page.score, page.id DESC
+'''
+
+
+def build_search_count(terms: int) -> str:
+    return f'SELECT COUNT(*) FROM ({_matches(terms)})'
+
+
+SQL_SEARCH = build_search(1)
+# Ausschnitte nur für die Interviews einer Seite, in einem Durchlauf über die Treffer (Präfixsuche pro Aufruf teuer)
+SQL_SNIPPETS = f'''
+    SELECT rowid >> 32, snippet(interviews_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', ' … ', 16)
+    FROM interviews_fts WHERE interviews_fts MATCH ? AND rowid >> 32 IN (SELECT value FROM json_each(?))
+'''
+
+
+def create_search_index(conn: sqlite3.Connection) -> bool:
+    # Gibt True zurück, wenn der Index neu angelegt wurde und befüllt werden muss
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='interviews_fts'").fetchone()
+    for statement in FTS_SCHEMA:
+        conn.execute(statement)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transcript_heads'").fetchone():
+        for statement in HEAD_FTS_SCHEMA:
+            conn.execute(statement)
+    return exists is None
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> int:
+    # Vor Migration 4 (Grundschema) gibt es noch keinen Revisionsverlauf
+    heads = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transcript_heads'").fetchone()
+    live = (LIVE_SEGMENT if heads else LIVE_SEGMENT_NO_HEADS).format(id='s.interview_id', seq='s.seq')
+    conn.execute('DELETE FROM interviews_fts')
+    conn.execute(f'''INSERT INTO interviews_fts (rowid, transcription)
+                    SELECT (id << 32) + {ROW_TEXT:d}, transcription FROM interviews''')
+    conn.execute(f'''INSERT INTO interviews_fts (rowid, notes, interviewee_info)
+                    SELECT (id << 32) + {ROW_FIELDS:d}, notes, interviewee_info FROM interviews''')
+    conn.execute(f'''INSERT INTO interviews_fts (rowid, transcription)
+                    SELECT (s.interview_id << 32) + {ROW_SEGMENT:d} + s.seq, s.text FROM interview_segments s
+                    WHERE s.seq BETWEEN 0 AND {MAX_SEQ:d} AND {live}''')
+    conn.execute("INSERT INTO interviews_fts (interviews_fts) VALUES ('optimize')")
+    return conn.execute('SELECT COUNT(*) FROM interviews').fetchone()[0]
+
+
+def fts_terms(text: str) -> List[str]:
+    # Freitext -> FTS5-Syntax: jedes Wort als Präfix-Phrase, alle Wörter müssen vorkommen
+    return [f'"{term}"*' for term in re.findall(r'\w+', text)]
+
+
+def _params(terms: List[str], **extra) -> Dict[str, Any]:
+    return {**{f't{i}': term for i, term in enumerate(terms)}, 'all': ' '.join(terms), **extra}
+
+
+def search_interviews(conn: sqlite3.Connection, text: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+    terms = fts_terms(text)
+    if not terms:
+        return []
+    rows = conn.execute(build_search(len(terms)), _params(terms, limit=limit, offset=offset)).fetchall()
+    # Ausschnitt bevorzugt aus einer Zeile mit allen Begriffen, sonst mit irgendeinem (Spalte vor Segmenten)
+    snippets: Dict[int, str] = {}
+    for query in (' '.join(terms), ' OR '.join(terms)):
+        missing = [r[0] for r in rows if r[0] not in snippets]
+        if not missing:
+            break
+        for interview_id, snippet in conn.execute(SQL_SNIPPETS, (query, json.dumps(missing))):
+            snippets.setdefault(interview_id, snippet)
+    return [{'id': r[0], 'date': r[1], 'interviewer': r[2], 'snippet': snippets.get(r[0], ''), 'score': r[3]}
+            for r in rows]
+
+
+def count_search_results(conn: sqlite3.Connection, text: str) -> int:
+    terms = fts_terms(text)
+    if not terms:
+        return 0
+    return conn.execute(build_search_count(len(terms)), _params(terms)).fetchone()[0]
@@ -0,0 +1,269 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import subprocess
+import tempfile
+import time
+import wave
+from typing import Any, Dict, List, Optional
+
+from .db import DB_PATH, SQL_INSERT_SEGMENT, SQL_NOW, SQL_TOUCH, InterviewStore
+from .vocabulary import load_normalizer
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+STT_BACKEND = os.environ.get('STT_BACKEND', '')
+STT_WORKERS = int(os.environ.get('STT_WORKERS', '2'))
+STT_MODEL = os.environ.get('STT_MODEL', '')
+MAX_PENDING = int(os.environ.get('STT_MAX_PENDING', '200'))
+LANGUAGE = 'de'
+
+STT_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS stt_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        interview_id INTEGER NOT NULL REFERENCES interviews (id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        audio BLOB,
+        sample_rate INTEGER,
+        audio_seconds REAL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        backend TEXT,
+        worker INTEGER,
+        error TEXT,
+        enqueued_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        wait_ms REAL,
+        processing_ms REAL,
+        UNIQUE (interview_id, seq)
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_stt_jobs_status ON stt_jobs (status, id)',
+)
+
+SQL_PENDING = "SELECT COUNT(*) FROM stt_jobs WHERE status IN ('queued', 'running')"
+SQL_ENQUEUE = f'''
+    INSERT OR IGNORE INTO stt_jobs (interview_id, seq, audio, sample_rate, audio_seconds, enqueued_at)
+    VALUES (?, ?, ?, ?, ?, {SQL_NOW})
+'''
+SQL_CLAIM = f'''
+    UPDATE stt_jobs SET status = 'running', worker = ?, backend = ?, started_at = {SQL_NOW}
+    WHERE id = (SELECT id FROM stt_jobs WHERE status = 'queued' ORDER BY id LIMIT 1)
+    RETURNING id, interview_id, seq, audio
+'''
+SQL_FINISH = f'''
+    UPDATE stt_jobs SET status = ?, error = ?, audio = CASE WHEN ? = 'done' THEN NULL ELSE audio END,
+        finished_at = {SQL_NOW}, wait_ms = (julianday(started_at) - julianday(enqueued_at)) * 86400000.0,
+        processing_ms = ?
+    WHERE id = ?
+'''
+
+
+def create_stt_schema(conn: sqlite3.Connection):
+    for statement in STT_SCHEMA:
+        conn.execute(statement)
+
+
+def wav_info(audio: bytes):
+    with wave.open(io.BytesIO(audio), 'rb') as wav:
+        return wav.getframerate(), wav.getnframes() / float(wav.getframerate())
+
+
+# Backends: nehmen WAV (PCM16 mono) entgegen und liefern den erkannten Text
+
+class StubBackend:
+    # Deterministisch und ohne Modell; für Tests und Lastmessungen
+    name = 'stub'
+
+    def __init__(self, delay_factor: float = 0.0, **_):
+        self.delay_factor = float(delay_factor)
+
+    def transcribe(self, audio: bytes, language: str = LANGUAGE) -> str:
+        _, seconds = wav_info(audio)
+        if self.delay_factor:
+            time.sleep(seconds * self.delay_factor)
+        return f"[stub {seconds:.1f}s {hashlib.sha1(audio).hexdigest()[:8]}]"
+
+
+class VoskBackend:
+    name = 'vosk'
+
+    def __init__(self, model: str = STT_MODEL, **_):
+        if vosk is None:
+            raise RuntimeError("Vosk ist nicht installiert (pip install vosk)")
+        if not model:
+            raise RuntimeError("Kein Vosk-Modell angegeben (STT_MODEL)")
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(model)
+
+    def transcribe(self, audio: bytes, language: str = LANGUAGE) -> str:
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            recognizer = vosk.KaldiRecognizer(self.model, wav.getframerate())
+            recognizer.AcceptWaveform(wav.readframes(wav.getnframes()))
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+
+class WhisperCppBackend:
+    name = 'whispercpp'
+
+    def __init__(self, model: str = STT_MODEL, binary: str = os.environ.get('WHISPER_CPP_BIN', 'whisper-cli'),
+                 threads: int = 1, **_):
+        if not model:
+            raise RuntimeError("Kein whisper.cpp-Modell angegeben (STT_MODEL)")
+        self.model = model
+        self.binary = binary
+        self.threads = int(threads)
+
+    def transcribe(self, audio: bytes, language: str = LANGUAGE) -> str:
+        with tempfile.NamedTemporaryFile(suffix='.wav') as tmp:
+            tmp.write(audio)
+            tmp.flush()
+            result = subprocess.run(
+                [self.binary, '-m', self.model, '-f', tmp.name, '-l', language, '-t', str(self.threads), '-nt', '-np'],
+                capture_output=True, text=True, check=True)
+        return ' '.join(result.stdout.split())
+
+
+BACKENDS = {backend.name: backend for backend in (StubBackend, VoskBackend, WhisperCppBackend)}
+
+
+def make_backend(name: str, **options):
+    if name not in BACKENDS:
+        raise ValueError(f"Unbekanntes STT-Backend: {name} (verfügbar: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options)
+
+
+# Warteschlange (SQLite) und Worker-Prozesse
+
+class SttQueue:
+    def __init__(self, store: InterviewStore, max_pending: int = MAX_PENDING):
+        self.store = store
+        self.max_pending = max_pending
+
+    def submit(self, interview_id: int, seq: int, audio: bytes) -> bool:
+        # Begrenzte Warteschlange: bei Überlast queue.Full, der Browser sendet später erneut
+        sample_rate, seconds = wav_info(audio)
+        with self.store.pool.transaction() as conn:
+            if conn.execute(SQL_PENDING).fetchone()[0] >= self.max_pending:
+                raise queue.Full(f"STT-Warteschlange voll ({self.max_pending} Aufträge)")
+            cursor = conn.execute(SQL_ENQUEUE, (interview_id, seq, audio, sample_rate, seconds))
+            return cursor.rowcount > 0
+
+    def last_seq(self, interview_id: int) -> int:
+        with self.store.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM stt_jobs WHERE interview_id = ?', (interview_id,)).fetchone()[0]
+
+    def pending(self, interview_id: Optional[int] = None) -> int:
+        with self.store.pool.connection() as conn:
+            if interview_id is None:
+                return conn.execute(SQL_PENDING).fetchone()[0]
+            return conn.execute(SQL_PENDING + ' AND interview_id = ?', (interview_id,)).fetchone()[0]
+
+
+def claim_job(store: InterviewStore, worker: int, backend: str) -> Optional[Dict[str, Any]]:
+    with store.pool.transaction() as conn:
+        row = conn.execute(SQL_CLAIM, (worker, backend)).fetchone()
+    if row is None:
+        return None
+    return {'id': row[0], 'interview_id': row[1], 'seq': row[2], 'audio': row[3]}
+
+
+def run_job(store: InterviewStore, backend, job: Dict[str, Any], normalizer=None):
+    start = time.perf_counter()
+    try:
+        text = backend.transcribe(job['audio']).strip()
+        if normalizer is not None:
+            text = normalizer.normalize(text)
+    except Exception as e:
+        with store.pool.transaction() as conn:
+            conn.execute(SQL_FINISH, ('failed', str(e), 'failed', (time.perf_counter() - start) * 1000, job['id']))
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    # Ergebnis als Segment mit der Chunk-Nummer: Reihenfolge bleibt auch bei parallelen Workern erhalten
+    with store.pool.transaction() as conn:
+        if text:
+            conn.execute(SQL_INSERT_SEGMENT, (job['interview_id'], job['seq'], time.strftime('%Y-%m-%dT%H:%M:%S'), text,
+                                              normalizer.version if normalizer is not None else None))
+            conn.execute(SQL_TOUCH, (job['interview_id'],))
+        conn.execute(SQL_FINISH, ('done', None, 'done', elapsed, job['id']))
+
+
+def worker_main(worker: int, db_path: str, backend_name: str, options: Dict[str, Any], stop, poll_interval: float = 0.5):
+    backend = make_backend(backend_name, **options)
+    store = InterviewStore(db_path, pool_size=1)
+    try:
+        while not stop.is_set():
+            job = claim_job(store, worker, backend_name)
+            if job is None:
+                stop.wait(poll_interval)
+                continue
+            # Aktuelle Vokabular-Version pro Auftrag; kompiliert wird nur bei neuer Version
+            run_job(store, backend, job, load_normalizer(store))
+    finally:
+        store.close()
+
+
+class SttWorkerPool:
+    def __init__(self, db_path: str = DB_PATH, backend: str = STT_BACKEND or 'stub', workers: int = STT_WORKERS,
+                 poll_interval: float = 0.5, **options):
+        self.db_path = db_path
+        self.backend = backend
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.options = options
+        self._ctx = multiprocessing.get_context('spawn')
+        self._stop = self._ctx.Event()
+        self._processes: List[multiprocessing.Process] = []
+
+    def start(self):
+        # Aufträge eines abgestürzten Workers wieder freigeben
+        store = InterviewStore(self.db_path, pool_size=1)
+        try:
+            with store.pool.transaction() as conn:
+                conn.execute("UPDATE stt_jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE status = 'running'")
+        finally:
+            store.close()
+        for worker in range(self.workers):
+            process = self._ctx.Process(target=worker_main, daemon=True, name=f"stt-worker-{worker}",
+                                        args=(worker, self.db_path, self.backend, self.options, self._stop, self.poll_interval))
+            process.start()
+            self._processes.append(process)
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self._processes)
+
+
+def job_stats(store: InterviewStore, interview_id: Optional[int] = None) -> Dict[str, Any]:
+    where, params = ('WHERE interview_id = ?', (interview_id,)) if interview_id is not None else ('', ())
+    with store.pool.connection() as conn:
+        counts = dict(conn.execute(f'SELECT status, COUNT(*) FROM stt_jobs {where} GROUP BY status', params).fetchall())
+        row = conn.execute(f'''
+            SELECT AVG(wait_ms), AVG(processing_ms), SUM(processing_ms), SUM(audio_seconds)
+            FROM stt_jobs {where} {'AND' if where else 'WHERE'} status = 'done'
+        ''', params).fetchone()
+    avg_wait, avg_processing, total_processing, total_audio = row
+    return {
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'done': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'avg_wait_ms': avg_wait or 0.0,
+        'avg_processing_ms': avg_processing or 0.0,
+        # < 1: schneller als Echtzeit pro Worker
+        'real_time_factor': (total_processing / 1000 / total_audio) if total_audio else 0.0,
+    }
@@ -0,0 +1,266 @@
+import io
+import json
+import sqlite3
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+
+from .db import SQL_NOW, SQL_TRANSCRIPT, InterviewStore, add_column
+from .revisions import current_text
+
+FORMAT = 'interview-sync'
+FORMAT_VERSION = 2
+BATCH_SIZE = 500
+
+# Synchronisierte Felder in Dateireihenfolge; die Transkription wird wie beim Export aufgelöst
+COLUMNS = ('uuid', 'origin', 'version', 'changed_by', 'updated_at', 'created_at',
+           'interview_date', 'interviewer', 'interviewee_info', 'transcription', 'notes', 'metadata', 'versions')
+TRANSCRIPTION = COLUMNS.index('transcription')
+VERSIONS = COLUMNS.index('versions')
+CONTENT = slice(COLUMNS.index('interview_date'), VERSIONS)
+
+SQL_SITE = "(SELECT value FROM sync_state WHERE key = 'site')"
+SQL_CLOCK = "(SELECT value FROM sync_state WHERE key = 'clock')"
+SQL_TICK = "UPDATE sync_state SET value = value + 1 WHERE key = 'clock'"
+# versions: JSON {Station: Anzahl ihrer Änderungen, die diese Fassung enthält}; damit erkennt der Import, ob
+# beide Seiten seit dem letzten Abgleich geändert haben, unabhängig davon, wie oft
+SQL_SITE_PATH = f"""'$."' || {SQL_SITE} || '"'"""
+SYNC_TRIGGERS = ('interviews_sync_ai', 'interviews_sync_au')
+
+SYNC_SCHEMA = (
+    # site: zufällige, stabile Kennung dieser Station; clock: lokaler Änderungszähler (change_seq)
+    'CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value) WITHOUT ROWID',
+    '''CREATE TABLE IF NOT EXISTS sync_peers (
+        site TEXT PRIMARY KEY,
+        exported_seq INTEGER NOT NULL DEFAULT 0,
+        imported_seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT
+    ) WITHOUT ROWID''',
+    # Bei gleichzeitiger Bearbeitung auf zwei Stationen: unterlegene Fassung aufbewahren
+    '''CREATE TABLE IF NOT EXISTS sync_conflicts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uuid TEXT NOT NULL,
+        winner TEXT NOT NULL,
+        loser TEXT NOT NULL,
+        detected_at TEXT NOT NULL
+    )''',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_interviews_uuid ON interviews (uuid)',
+    'CREATE INDEX IF NOT EXISTS idx_interviews_change_seq ON interviews (change_seq)',
+    # Neue Zeilen: globale id, Herkunft, Version 1 – ausser der Import liefert sie mit
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_sync_ai AFTER INSERT ON interviews BEGIN
+        {SQL_TICK};
+        UPDATE interviews SET uuid = COALESCE(new.uuid, lower(hex(randomblob(16)))),
+            origin = COALESCE(new.origin, {SQL_SITE}), version = COALESCE(new.version, 1),
+            changed_by = COALESCE(new.changed_by, {SQL_SITE}), change_seq = {SQL_CLOCK},
+            versions = COALESCE(new.versions, json_object({SQL_SITE}, COALESCE(new.version, 1)))
+        WHERE id = new.id;
+    END''',
+    # Jede inhaltliche Änderung zählt die Version hoch; der Import überschreibt version/changed_by/versions danach
+    f'''CREATE TRIGGER IF NOT EXISTS interviews_sync_au
+    AFTER UPDATE OF interview_date, interviewer, interviewee_info, transcription, notes, metadata, updated_at ON interviews BEGIN
+        {SQL_TICK};
+        UPDATE interviews SET version = COALESCE(old.version, 0) + 1, changed_by = {SQL_SITE}, synced_from = NULL,
+            change_seq = {SQL_CLOCK},
+            versions = json_set(COALESCE(old.versions, '{{}}'), {SQL_SITE_PATH},
+                                COALESCE(json_extract(old.versions, {SQL_SITE_PATH}), 0) + 1)
+        WHERE id = new.id;
+    END''',
+)
+
+SQL_EXPORT = f'''
+    SELECT uuid, origin, version, changed_by, COALESCE(updated_at, created_at), created_at,
+           interview_date, interviewer, interviewee_info, {SQL_TRANSCRIPT}, notes, metadata, versions
+    FROM interviews WHERE change_seq > ? AND change_seq <= ? AND changed_by IS NOT ? AND synced_from IS NOT ?
+    ORDER BY change_seq
+'''
+SQL_PENDING_UUIDS = '''SELECT i.uuid, h.interview_id FROM transcript_heads h JOIN interviews i ON i.id = h.interview_id
+                       WHERE h.head_rev > h.compacted_rev'''
+SQL_LOCAL = f'''
+    SELECT id, uuid, origin, version, changed_by, COALESCE(updated_at, created_at), created_at,
+           interview_date, interviewer, interviewee_info, {SQL_TRANSCRIPT}, notes, metadata, versions
+    FROM interviews WHERE uuid IN (SELECT value FROM json_each(?))
+'''
+SQL_IMPORT_INSERT = f'''
+    INSERT INTO interviews ({', '.join(COLUMNS)}, synced_from)
+    VALUES ({', '.join('?' * (len(COLUMNS) + 1))})
+'''
+SQL_IMPORT_UPDATE = '''
+    UPDATE interviews SET updated_at = ?,
+        interview_date = ?, interviewer = ?, interviewee_info = ?, transcription = ?, notes = ?, metadata = ?
+    WHERE id = ?
+'''
+# Nach dem Trigger: Version und Urheber der übernommenen Fassung wiederherstellen
+SQL_IMPORT_VERSION = 'UPDATE interviews SET version = ?, changed_by = ?, synced_from = ?, versions = ? WHERE id = ?'
+# Konflikt zugunsten der lokalen Fassung: sie gilt danach als Nachfolger beider Stände
+SQL_MERGE_VERSIONS = 'UPDATE interviews SET versions = ? WHERE id = ?'
+
+
+def create_sync_schema(conn: sqlite3.Connection):
+    # synced_from: Station, von der die aktuelle Fassung importiert wurde (NULL = lokal geändert)
+    for column in ('uuid', 'origin', 'changed_by', 'synced_from'):
+        add_column(conn, 'interviews', column, 'TEXT')
+    add_column(conn, 'interviews', 'version', 'INTEGER')
+    add_column(conn, 'interviews', 'change_seq', 'INTEGER')
+    add_column(conn, 'interviews', 'versions', 'TEXT')
+    conn.execute(SYNC_SCHEMA[0])
+    conn.execute("INSERT OR IGNORE INTO sync_state VALUES ('site', lower(hex(randomblob(8)))), ('clock', 0)")
+    # Bestehende Zeilen einmalig nachrüsten (change_seq = id hält die Reihenfolge)
+    conn.execute(f'''
+        UPDATE interviews SET uuid = lower(hex(randomblob(16))), origin = {SQL_SITE}, version = 1,
+            changed_by = {SQL_SITE}, change_seq = id
+        WHERE uuid IS NULL
+    ''')
+    # Ohne Verlauf: alle bisherigen Änderungen gelten als die des letzten Bearbeiters
+    conn.execute('UPDATE interviews SET versions = json_object(changed_by, version) WHERE versions IS NULL')
+    conn.execute("UPDATE sync_state SET value = MAX(value, (SELECT COALESCE(MAX(change_seq), 0) FROM interviews)) WHERE key = 'clock'")
+    for statement in SYNC_SCHEMA[1:]:
+        conn.execute(statement)
+
+
+def site_id(store: InterviewStore) -> str:
+    with store.pool.connection() as conn:
+        return conn.execute("SELECT value FROM sync_state WHERE key = 'site'").fetchone()[0]
+
+
+def _versions(row: Sequence[Any]) -> Dict[str, int]:
+    return json.loads(row[VERSIONS] or '{}')
+
+
+def _contains(versions: Dict[str, int], other: Dict[str, int]) -> bool:
+    # Enthält versions alle Änderungen aus other?
+    return all(versions.get(site, 0) >= count for site, count in other.items())
+
+
+def _winner_key(row: Sequence[Any]) -> Tuple[int, str, str]:
+    # Deterministisch auf jeder Station: höhere Version, dann späteres updated_at, dann Site-Kennung
+    version, changed_by, updated_at = row[2], row[3], row[4]
+    return (version or 0, updated_at or '', changed_by or '')
+
+
+def export_delta(store: InterviewStore, fh: IO[str], peer: Optional[str] = None, since: Optional[int] = None,
+                 batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    # Alle Zeilen mit change_seq > since; Zeilen, die vom Ziel stammen oder von dort kamen, entfallen.
+    # Offene Transkript-Patches werden dazugelesen; Patches allein ändern change_seq nicht, sie gehen mit dem
+    # nächsten Kompaktieren (Wartungsauftrag compact_transcripts, Abschliessen) oder der nächsten Änderung mit
+    with store.pool.connection() as conn:
+        pending = dict(conn.execute(SQL_PENDING_UUIDS).fetchall())
+        site, until = conn.execute(f'SELECT {SQL_SITE}, {SQL_CLOCK}').fetchone()
+        if since is None:
+            row = conn.execute('SELECT exported_seq FROM sync_peers WHERE site = ?', (peer,)).fetchone() if peer else None
+            since = row[0] if row else 0
+        header = {'format': FORMAT, 'version': FORMAT_VERSION, 'site': site, 'peer': peer,
+                  'since': since, 'until': until, 'columns': COLUMNS}
+        fh.write(json.dumps(header, ensure_ascii=False) + '\n')
+        count = 0
+        cursor = conn.execute(SQL_EXPORT, (since, until, peer, peer))
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if pending:
+                    rows = [row if row[0] not in pending else
+                            (*row[:TRANSCRIPTION], current_text(conn, pending[row[0]]), *row[TRANSCRIPTION + 1:])
+                            for row in rows]
+                # Eine Zeile pro Batch: JSON-Array von Wertelisten, ohne wiederholte Feldnamen
+                fh.write(json.dumps(rows, ensure_ascii=False, separators=(',', ':')) + '\n')
+                count += len(rows)
+        finally:
+            cursor.close()
+    if peer:
+        with store.pool.transaction() as conn:
+            conn.execute(f'''
+                INSERT INTO sync_peers (site, exported_seq, updated_at) VALUES (?, ?, {SQL_NOW})
+                ON CONFLICT (site) DO UPDATE SET exported_seq = MAX(exported_seq, excluded.exported_seq), updated_at = excluded.updated_at
+            ''', (peer, until))
+    return {'site': site, 'since': since, 'until': until, 'rows': count}
+
+
+def _apply(conn: sqlite3.Connection, source: str, rows: List[Sequence[Any]], stats: Dict[str, int]) -> List[int]:
+    changed = []
+    # Lokale Gegenstücke des ganzen Batches mit einer Abfrage holen
+    existing = {local[1]: local for local in conn.execute(SQL_LOCAL, (json.dumps([row[0] for row in rows]),))}
+    for row in rows:
+        local = existing.get(row[0])
+        if local is None:
+            changed.append(conn.execute(SQL_IMPORT_INSERT, (*row, source)).lastrowid)
+            stats['inserted'] += 1
+            continue
+        local_id, local_row = local[0], local[1:]
+        remote_versions, local_versions = _versions(row), _versions(local_row)
+        if _contains(local_versions, remote_versions):
+            # Bekannte oder ältere Fassung
+            stats['skipped'] += 1
+            continue
+        versions = {site: max(local_versions.get(site, 0), remote_versions.get(site, 0))
+                    for site in local_versions.keys() | remote_versions.keys()}
+        if not _contains(remote_versions, local_versions):
+            # Beide Seiten haben seit dem letzten gemeinsamen Stand geändert: echte Parallelbearbeitung
+            remote_wins = _winner_key(row) > _winner_key(local_row)
+            if tuple(local_row[CONTENT]) != tuple(row[CONTENT]):
+                winner, loser = (row, local_row) if remote_wins else (local_row, row)
+                conn.execute(f'INSERT INTO sync_conflicts (uuid, winner, loser, detected_at) VALUES (?, ?, ?, {SQL_NOW})',
+                             (row[0], winner[3], json.dumps(dict(zip(COLUMNS, loser)), ensure_ascii=False)))
+                stats['conflicts'] += 1
+            if not remote_wins:
+                conn.execute(SQL_MERGE_VERSIONS, (json.dumps(versions), local_id))
+                stats['skipped'] += 1
+                continue
+        conn.execute(SQL_IMPORT_UPDATE, (row[4], *row[CONTENT], local_id))
+        conn.execute(SQL_IMPORT_VERSION, (row[2], row[3], source, json.dumps(versions), local_id))
+        changed.append(local_id)
+        stats['updated'] += 1
+    return changed
+
+
+def import_delta(store: InterviewStore, fh: IO[str]) -> Dict[str, Any]:
+    header = json.loads(fh.readline() or 'null')
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise ValueError("Keine Sync-Datei (interview-sync)")
+    if header['version'] != FORMAT_VERSION or list(header['columns']) != list(COLUMNS):
+        raise ValueError(f"Nicht unterstützte Sync-Version {header['version']}")
+    if header['site'] == site_id(store):
+        raise ValueError("Sync-Datei stammt von dieser Station")
+    stats = {'site': header['site'], 'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'conflicts': 0}
+    # Ein Batch = eine kurze Schreibtransaktion
+    for line in fh:
+        if not line.strip():
+            continue
+        rows = json.loads(line)
+        with store.pool.transaction() as conn:
+            changed = _apply(conn, header['site'], rows, stats)
+        store.cache.invalidate(*changed)
+        stats['rows'] += len(rows)
+    with store.pool.transaction() as conn:
+        conn.execute(f'''
+            INSERT INTO sync_peers (site, imported_seq, updated_at) VALUES (?, ?, {SQL_NOW})
+            ON CONFLICT (site) DO UPDATE SET imported_seq = MAX(imported_seq, excluded.imported_seq), updated_at = excluded.updated_at
+        ''', (header['site'], header['until']))
+    return stats
+
+
+def imported_seq(store: InterviewStore, site: str) -> int:
+    with store.pool.connection() as conn:
+        row = conn.execute('SELECT imported_seq FROM sync_peers WHERE site = ?', (site,)).fetchone()
+    return row[0] if row else 0
+
+
+def sync_stores(local: InterviewStore, remote: InterviewStore) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Zwei lokale Datenbanken abgleichen: jede Seite bekommt nur, was die andere noch nicht importiert hat
+    results = []
+    for source, target in ((local, remote), (remote, local)):
+        buffer = io.StringIO()
+        export_delta(source, buffer, peer=site_id(target), since=imported_seq(target, site_id(source)))
+        buffer.seek(0)
+        results.append(import_delta(target, buffer))
+    return results[0], results[1]
+
+
+def peers(store: InterviewStore) -> List[Dict[str, Any]]:
+    with store.pool.connection() as conn:
+        rows = conn.execute('SELECT site, exported_seq, imported_seq, updated_at FROM sync_peers ORDER BY updated_at DESC').fetchall()
+    return [{'site': r[0], 'exported_seq': r[1], 'imported_seq': r[2], 'updated_at': r[3]} for r in rows]
+
+
+def conflicts(store: InterviewStore, limit: int = 50) -> List[Dict[str, Any]]:
+    with store.pool.connection() as conn:
+        rows = conn.execute('SELECT id, uuid, winner, loser, detected_at FROM sync_conflicts ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    return [{'id': r[0], 'uuid': r[1], 'winner': r[2], 'loser': json.loads(r[3]), 'detected_at': r[4]} for r in rows]
@@ -0,0 +1,146 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .db import SQL_NOW, InterviewStore
+
+# Bisher fest im Browser: .replace(/gruezi/gi, ...) – daher Teilwort-Treffer (whole_word False)
+DEFAULT_RULES = [
+    {'pattern': 'gruezi', 'replacement': 'Grüezi', 'whole_word': False},
+    {'pattern': 'merci', 'replacement': 'Merci', 'whole_word': False},
+]
+
+VOCABULARY_SCHEMA = (
+    # Jede Version ist ein unveränderlicher Schnappschuss aller Regeln
+    '''CREATE TABLE IF NOT EXISTS vocabulary_versions (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        rules TEXT NOT NULL,
+        note TEXT,
+        created_at TEXT NOT NULL
+    )''',
+)
+
+
+def create_vocabulary_schema(conn: sqlite3.Connection):
+    for statement in VOCABULARY_SCHEMA:
+        conn.execute(statement)
+    if conn.execute('SELECT COUNT(*) FROM vocabulary_versions').fetchone()[0] == 0:
+        conn.execute(f'INSERT INTO vocabulary_versions (rules, note, created_at) VALUES (?, ?, {SQL_NOW})',
+                     (json.dumps(DEFAULT_RULES, ensure_ascii=False), 'Standardregeln'))
+
+
+def clean_rules(rules: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Leere Muster verwerfen; bei doppelten Mustern (Gross-/Kleinschreibung egal) gewinnt die letzte Regel
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for rule in rules:
+        pattern = str(rule.get('pattern') or '').strip()
+        if not pattern:
+            continue
+        by_key[pattern.lower()] = {'pattern': pattern, 'replacement': str(rule.get('replacement') or ''),
+                                   'whole_word': bool(rule.get('whole_word', True))}
+    return list(by_key.values())
+
+
+def read_rules_file(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as fh:
+        data = json.load(fh)
+    return [rule if isinstance(rule, dict) else {'pattern': rule[0], 'replacement': rule[1]} for rule in data]
+
+
+class Normalizer:
+    # Alle Regeln in einer einzigen Regex (Alternation, längste Muster zuerst): ein Durchlauf pro Text
+    def __init__(self, rules: Sequence[Dict[str, Any]], version: int = 0):
+        self.rules = clean_rules(rules)
+        self.version = version
+        self.replacements = {rule['pattern'].lower(): rule['replacement'] for rule in self.rules}
+        whole = [rule['pattern'] for rule in self.rules if rule['whole_word']]
+        partial = [rule['pattern'] for rule in self.rules if not rule['whole_word']]
+        alternatives = []
+        if whole:
+            alternatives.append(r'(?<!\w)(?:' + self._alternation(whole) + r')(?!\w)')
+        if partial:
+            alternatives.append('(?:' + self._alternation(partial) + ')')
+        self.regex = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+    @staticmethod
+    def _alternation(patterns: List[str]) -> str:
+        return '|'.join(re.escape(p) for p in sorted(patterns, key=len, reverse=True))
+
+    def _replace(self, match: 're.Match') -> str:
+        return self.replacements.get(match.group(0).lower(), match.group(0))
+
+    def normalize(self, text: str) -> str:
+        if self.regex is None or not text:
+            return text
+        return self.regex.sub(self._replace, text)
+
+    def to_component(self) -> Dict[str, Any]:
+        # Für den Browser: dieselben Regeln, dort ebenfalls zu einer RegExp kompiliert
+        return {'version': self.version,
+                'whole': [[r['pattern'], r['replacement']] for r in self.rules if r['whole_word']],
+                'partial': [[r['pattern'], r['replacement']] for r in self.rules if not r['whole_word']]}
+
+
+# Wie lange die aktuelle Versionsnummer ohne DB-Abfrage gilt (Änderungen aus anderen Prozessen)
+VERSION_TTL = 30.0
+
+_cache: Dict[Tuple[str, int], Normalizer] = {}
+_current: Dict[str, Tuple[float, int]] = {}
+_cache_lock = threading.Lock()
+
+
+def current_version(store: InterviewStore) -> int:
+    with _cache_lock:
+        checked, version = _current.get(store.pool.path, (float('-inf'), 0))
+    if time.monotonic() - checked <= VERSION_TTL:
+        return version
+    with store.pool.connection() as conn:
+        version = conn.execute('SELECT COALESCE(MAX(version), 0) FROM vocabulary_versions').fetchone()[0]
+    with _cache_lock:
+        _current[store.pool.path] = (time.monotonic(), version)
+    return version
+
+
+def load_normalizer(store: InterviewStore, version: Optional[int] = None) -> Normalizer:
+    # Kompilierte Regelsätze pro Version zwischenspeichern (Versionen sind unveränderlich)
+    if version is None:
+        version = current_version(store)
+    key = (store.pool.path, version)
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+    with store.pool.connection() as conn:
+        row = conn.execute('SELECT rules FROM vocabulary_versions WHERE version = ?', (version,)).fetchone()
+    if row is None:
+        raise ValueError(f"Vokabular-Version {version} existiert nicht")
+    normalizer = Normalizer(json.loads(row[0]), version)
+    with _cache_lock:
+        _cache[key] = normalizer
+    return normalizer
+
+
+def get_rules(store: InterviewStore, version: Optional[int] = None) -> List[Dict[str, Any]]:
+    return list(load_normalizer(store, version).rules)
+
+
+def save_rules(store: InterviewStore, rules: Sequence[Dict[str, Any]], note: str = '') -> int:
+    rules = clean_rules(rules)
+    with store.pool.transaction() as conn:
+        version = conn.execute(f'INSERT INTO vocabulary_versions (rules, note, created_at) VALUES (?, ?, {SQL_NOW})',
+                               (json.dumps(rules, ensure_ascii=False), note)).lastrowid
+    with _cache_lock:
+        _current[store.pool.path] = (time.monotonic(), version)
+    return version
+
+
+def add_rules(store: InterviewStore, rules: Sequence[Dict[str, Any]], note: str = '') -> int:
+    return save_rules(store, get_rules(store) + list(rules), note)
+
+
+def list_versions(store: InterviewStore) -> List[Dict[str, Any]]:
+    with store.pool.connection() as conn:
+        rows = conn.execute('SELECT version, json_array_length(rules), note, created_at FROM vocabulary_versions ORDER BY version DESC').fetchall()
+    return [{'version': r[0], 'rules': r[1], 'note': r[2], 'created_at': r[3]} for r in rows]
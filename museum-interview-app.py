@@ -1,87 +1,37 @@
+import pandas as pd
 import streamlit as st
-import sqlite3
+import streamlit.components.v1 as components
 from datetime import datetime
-import json
-from typing import Dict, Any
-
-# PDF-Generierung
-def generate_pdf_simple(interview_data):
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Interview #{interview_data.get('id', 'N/A')}</title>
-        <style>
-            @media print {{
-                body {{ margin: 0; }}
-                .no-print {{ display: none; }}
-            }}
-            body {{
-                font-family: Arial, sans-serif;
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-                line-height: 1.6;
-            }}
-            h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-            h2 {{ color: #34495e; margin-top: 30px; }}
-            .metadata {{ background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-            .metadata p {{ margin: 5px 0; }}
-            .transcription {{
-                background: #ffffff;
-                border: 1px solid #ddd;
-                padding: 20px;
-                border-radius: 5px;
-                white-space: pre-wrap;
-                margin: 20px 0;
-            }}
-            .notes {{
-                background: #fff9e6;
-                border-left: 4px solid #ffc107;
-                padding: 15px;
-                margin: 20px 0;
-            }}
-            .footer {{
-                margin-top: 50px;
-                padding-top: 20px;
-                border-top: 1px solid #ddd;
-                text-align: center;
-                color: #666;
-                font-size: 12px;
-            }}
-        </style>
-    </head>
-    <body>
-        <h1>Interview-Transkription #{interview_data.get('id', 'N/A')}</h1>
-        <div class="metadata">
-            <h2>Interview-Details</h2>
-            <p><strong>Datum:</strong> {interview_data.get('date', 'N/A')}</p>
-            <p><strong>Interviewer:</strong> {interview_data.get('interviewer', 'N/A')}</p>
-            <p><strong>Interviewte Person:</strong> {interview_data.get('interviewee_info', 'N/A')}</p>
-            <p><strong>Erstellt am:</strong> {interview_data.get('created_at', 'N/A')}</p>
-        </div>
-        <h2>Transkription</h2>
-        <div class="transcription">
-            {interview_data.get('transcription', 'Keine Transkription vorhanden')}
-        </div>
-        {f'''<h2>Notizen</h2><div class="notes">{interview_data.get('notes')}</div>''' if interview_data.get('notes') else ''}
-        <div class="footer">
-            <p>Wildvogelpflegestation - Besucherbefragung</p>
-            <p>OST - Ostschweizer Fachhochschule</p>
-            <p>Generiert am: {datetime.now().strftime('%d.%m.%Y %H:%M')}</p>
-        </div>
-        <div class="no-print" style="margin-top: 30px; text-align: center;">
-            <button onclick="window.print()" style="padding: 10px 20px; background: #3498db; color: white; border: none; border-radius: 5px; cursor: pointer;">
-                🖨️ Drucken / Als PDF speichern
-            </button>
-        </div>
-    </body>
-    </html>
-    """
-    return html_content
+import base64
+import html
+import os
+import queue
+import time
+
+from interview_store import DB_PATH, PAGE_SIZE, InterviewStore
+from interview_store import analytics, jobs, revisions
+from interview_store.audio import AudioStore
+from interview_store.profiling import profiler
+from interview_store.export import FORMATS as EXPORT_FORMATS
+from interview_store.reports import render_interview_report
+from interview_store.search import HIGHLIGHT_END, HIGHLIGHT_START
+from interview_store.vocabulary import load_normalizer, save_rules
+from interview_store.stt import STT_BACKEND, STT_MODEL, SttQueue, SttWorkerPool, job_stats
 
 st.set_page_config(page_title="Interview Transkription", page_icon="🎤", layout="wide")
+rerun_started = time.perf_counter()
+# RERUN_STATS=1: Renderzeit und Anzahl DB-Abfragen pro Rerun unten auf der Seite anzeigen
+SHOW_RERUN_STATS = os.environ.get('RERUN_STATS', '') not in ('', '0')
+# PROFILE_LOG=<datei>: Laufzeit pro Rerun und Tab sowie SQL-Anzahl/-Dauer als JSON-Zeilen protokollieren
+if profiler.enabled:
+    profiler.start()
+# Aufträge (Export, Berichte) in der Liste; Aktualisierung alle JOB_REFRESH_SECONDS, solange einer läuft
+USER_JOB_KINDS = ['export', 'report']
+JOB_REFRESH_SECONDS = 2
+# Automatisches Speichern des Editors höchstens alle AUTOSAVE_SECONDS (als Patch, siehe interview_store.revisions)
+AUTOSAVE_SECONDS = float(os.environ.get('AUTOSAVE_SECONDS', '5'))
+# Übersicht/Suche höchstens so alt (neue Interviews dieser Session erscheinen sofort)
+OVERVIEW_TTL_SECONDS = 10
 
 st.markdown("""
 <style>
@@ -91,197 +41,279 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Datenbank
+@st.cache_resource
+def get_store() -> InterviewStore:
+    # Ein Verbindungspool pro Prozess, geteilt von allen Sessions; Schema nur einmal prüfen, nicht bei jedem Rerun
+    store = InterviewStore(DB_PATH)
+    store.init_database()
+    return store
+
 def init_database():
     try:
-        conn = sqlite3.connect('interviews.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name='interviews'")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                CREATE TABLE interviews (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    interview_date TEXT NOT NULL,
-                    interviewer TEXT,
-                    interviewee_info TEXT,
-                    transcription TEXT,
-                    notes TEXT,
-                    metadata TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-        conn.close()
+        get_store()
         return True
     except Exception as e:
         st.error(f"DB Fehler: {e}")
         return False
 
-def save_interview(interview_data: Dict[str, Any]) -> int:
-    conn = sqlite3.connect('interviews.db')
-    cursor = conn.cursor()
-    date_str = interview_data.get('date', datetime.now().isoformat())
-    if isinstance(date_str, datetime):
-        date_str = date_str.isoformat()
-    cursor.execute('''
-        INSERT INTO interviews (interview_date, interviewer, interviewee_info, transcription, notes, metadata)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
-        date_str,
-        interview_data.get('interviewer', ''),
-        interview_data.get('interviewee_info', ''),
-        interview_data.get('transcription', ''),
-        interview_data.get('notes', ''),
-        json.dumps(interview_data.get('metadata', {}))
-    ))
-    interview_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return interview_id
-
-def update_interview_transcription(interview_id: int, transcription: str):
-    conn = sqlite3.connect('interviews.db')
-    cursor = conn.cursor()
-    cursor.execute('UPDATE interviews SET transcription = ? WHERE id = ?', (transcription, interview_id))
-    conn.commit()
-    conn.close()
-
-def get_interview_by_id(interview_id: int):
-    conn = sqlite3.connect('interviews.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, interview_date, interviewer, interviewee_info, transcription, notes, created_at FROM interviews WHERE id = ?', (interview_id,))
-    result = cursor.fetchone()
-    conn.close()
-    if result:
-        return {'id': result[0], 'date': result[1], 'interviewer': result[2], 'interviewee_info': result[3], 'transcription': result[4], 'notes': result[5], 'created_at': result[6]}
-    return None
-
-def create_speech_interface(interview_id):
-    return f"""
-    <div style="padding: 20px; background: #f8f9fa; border-radius: 10px;">
-        <div style="text-align: center; margin-bottom: 20px;">
-            <span id="status" style="font-size: 18px; font-weight: bold;">🎤 Bereit</span>
-        </div>
-        <div style="text-align: center; margin-bottom: 20px;">
-            <button onclick="start()" id="startBtn" style="background: #4CAF50; color: white; padding: 15px 30px; border: none; border-radius: 5px; font-size: 16px; cursor: pointer; margin: 5px;">▶️ Start</button>
-            <button onclick="stop()" id="stopBtn" disabled style="background: #f44336; color: white; padding: 15px 30px; border: none; border-radius: 5px; font-size: 16px; cursor: pointer; margin: 5px;">⏹️ Stop</button>
-            <a id="dlBtn" style="display: none; background: #2196F3; color: white; padding: 15px 30px; border: none; border-radius: 5px; font-size: 16px; cursor: pointer; margin: 5px; text-decoration: none;">💾 Download TXT</a>
-        </div>
-        <div style="margin-top: 20px;">
-            <label style="font-weight: bold;">🗣️ Live:</label>
-            <div id="interim" style="color: #666; font-style: italic; background: white; padding: 10px; border-radius: 5px; min-height: 30px;">...</div>
-        </div>
-        <div style="margin-top: 20px;">
-            <label style="font-weight: bold;">📝 Transkription:</label>
-            <div id="final" style="background: white; padding: 15px; border-radius: 5px; min-height: 150px; max-height: 300px; overflow-y: auto; white-space: pre-wrap;"></div>
-        </div>
-    </div>
-
-    <script>
-        let rec = null;
-        const key = 'tr_{interview_id}';
-        let txt = localStorage.getItem(key) || '';
-        let active = false;
-        
-        if (txt) document.getElementById('final').textContent = txt;
-
-        if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {{
-            const SR = window.SpeechRecognition || window.webkitSpeechRecognition;
-            rec = new SR();
-            rec.continuous = true;
-            rec.interimResults = true;
-            rec.lang = 'de-CH';
-            
-            rec.onstart = () => {{
-                active = true;
-                document.getElementById('status').innerHTML = '🔴 Aufnahme...';
-                document.getElementById('startBtn').disabled = true;
-                document.getElementById('stopBtn').disabled = false;
-            }};
-            
-            rec.onresult = (e) => {{
-                let interim = '';
-                for (let i = e.resultIndex; i < e.results.length; i++) {{
-                    let t = e.results[i][0].transcript.replace(/gruezi/gi, 'Grüezi').replace(/merci/gi, 'Merci');
-                    if (e.results[i].isFinal) {{
-                        txt += t + ' ';
-                        document.getElementById('final').textContent = txt;
-                        localStorage.setItem(key, txt);
-                        updateDownload();
-                    }} else {{
-                        interim += t;
-                    }}
-                }}
-                document.getElementById('interim').textContent = interim || '...';
-            }};
-            
-            rec.onerror = (e) => {{
-                if (e.error === 'no-speech' && active) {{
-                    setTimeout(() => {{ if (active) rec.start(); }}, 100);
-                }} else if (e.error === 'not-allowed') {{
-                    alert('Mikrofon-Zugriff verweigert!');
-                    document.getElementById('status').innerHTML = '❌ Kein Zugriff';
-                    reset();
-                }}
-            }};
-            
-            rec.onend = () => {{
-                if (active) rec.start();
-                else reset();
-            }};
-        }} else {{
-            document.getElementById('status').innerHTML = '❌ Browser nicht unterstützt';
-            document.getElementById('startBtn').disabled = true;
-        }}
-        
-        function start() {{ if (rec) rec.start(); }}
-        
-        function stop() {{
-            if (rec) {{
-                active = false;
-                rec.stop();
-                document.getElementById('status').innerHTML = '✅ Gestoppt';
-                localStorage.setItem(key, txt);
-                updateDownload();
-            }}
-        }}
-        
-        function reset() {{
-            document.getElementById('startBtn').disabled = false;
-            document.getElementById('stopBtn').disabled = true;
-            active = false;
-        }}
+# Bidirektionale Aufnahme-Komponente: sendet finale Segmente gebündelt an den Server
+speech_recorder = components.declare_component(
+    "speech_recorder", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "speech_component")
+)
+
+@st.cache_resource
+def get_stt_workers():
+    # Server-Spracherkennung nur, wenn ein Backend konfiguriert ist (STT_BACKEND=vosk|whispercpp|stub)
+    if not STT_BACKEND:
+        return None
+    return SttWorkerPool(DB_PATH, backend=STT_BACKEND, model=STT_MODEL).start()
+
+@st.cache_resource
+def get_job_workers():
+    # Export, Berichte und Wartung im Hintergrund; JOB_WORKERS=0, wenn "python -m interview_store jobs --worker" separat läuft
+    if jobs.JOB_WORKERS <= 0:
+        return None
+    return jobs.JobWorkerPool(DB_PATH).start()
+
+def sync_speech_segments(interview_id: int):
+    # Letzten Batch der Komponente übernehmen (doppelte Segmente ignoriert die DB)
+    batch = st.session_state.get(f"recorder_{interview_id}")
+    if batch and batch.get('interview_id') == interview_id and batch.get('segments'):
+        if batch['segments'][-1]['seq'] > st.session_state.segments_acked.get(interview_id, 0):
+            st.session_state.segments_acked[interview_id] = store.append_segments(interview_id, batch['segments'])
+    if interview_id not in st.session_state.segments_acked:
+        st.session_state.segments_acked[interview_id] = store.last_segment_seq(interview_id)
+    
+    # Audio-Chunks der Server-Aufnahme in die STT-Warteschlange stellen
+    if interview_id not in st.session_state.audio_acked:
+        st.session_state.audio_acked[interview_id] = stt_queue.last_seq(interview_id)
+    if batch and batch.get('interview_id') == interview_id and batch.get('audio'):
+        for chunk in batch['audio']:
+            if chunk['seq'] <= st.session_state.audio_acked[interview_id]:
+                continue
+            if chunk['seq'] > st.session_state.audio_acked[interview_id] + 1:
+                # Lücke (Nachricht verloren): der Browser sendet ab dem ersten unbestätigten Chunk erneut
+                break
+            audio = base64.b64decode(chunk['data'])
+            try:
+                audio_store.append_chunk(interview_id, chunk['seq'], audio)
+                stt_queue.submit(interview_id, chunk['seq'], audio)
+            except queue.Full:
+                st.warning("⚠️ Server-Transkription ausgelastet, Audio wird erneut gesendet")
+                break
+            st.session_state.audio_acked[interview_id] = chunk['seq']
+    return st.session_state.segments_acked[interview_id], st.session_state.audio_acked[interview_id]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_top_terms(limit: int = 20):
+    # Liest das ganze FTS-Vokabular, daher höchstens einmal pro Minute
+    return analytics.top_terms(get_store(), limit)
+
+def save_transcript(note=None, compact=False):
+    # Nur die Änderung seit dem letzten gespeicherten Stand (transcript_base) wird geschrieben
+    st.session_state.transcript_base = revisions.save_transcript(
+        store, st.session_state.current_interview_id, st.session_state.transcript_text,
+        base=st.session_state.transcript_base, note=note, compact=compact)
+    st.session_state.transcript_saved_at = time.time()
+
+def autosave_transcript():
+    # Entprellt: Änderungen sammeln und frühestens AUTOSAVE_SECONDS nach dem letzten Speichern schreiben;
+    # ausstehende Änderungen schreibt der nachlaufende Fragment-Lauf (siehe Editor)
+    if not st.session_state.transcript_text or st.session_state.transcript_text == st.session_state.transcript_base[1]:
+        return False
+    if time.time() - st.session_state.transcript_saved_at < AUTOSAVE_SECONDS:
+        st.caption("⏳ Ungespeicherte Änderungen")
+        return False
+    save_transcript("Autosave")
+    return True
+
+def load_transcript(interview_id: int):
+    st.session_state.transcript_base = revisions.load_transcript(store, interview_id)
+    st.session_state.transcript_text = st.session_state.transcript_base[1]
+
+def render_jobs(refresh: bool = False):
+    recent_jobs = jobs.list_jobs(store, 10, kinds=USER_JOB_KINDS)
+    if refresh and not any(job['status'] in ('queued', 'running') for job in recent_jobs):
+        # Alles fertig: ganze Seite neu laden, damit die automatische Aktualisierung endet
+        st.rerun()
+    if not recent_jobs:
+        st.caption("Keine Aufträge")
+    for job in recent_jobs:
+        label = "Export" if job['kind'] == 'export' else "Berichte"
+        fmt = job['params'].get('format', '').upper()
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            if job['status'] in ('queued', 'running'):
+                st.progress(job['progress'], text=f"#{job['id']} {label} {fmt}: {job['message'] or ('wartet' if job['status'] == 'queued' else 'läuft')}")
+            elif job['status'] == 'done':
+                st.write(f"✅ #{job['id']} {label} {fmt}: {job['message']}")
+            elif job['status'] == 'failed':
+                st.write(f"❌ #{job['id']} {label} {fmt}: {job['error']}")
+            else:
+                st.write(f"⏹️ #{job['id']} {label} {fmt}: abgebrochen")
+        with col2:
+            if job['status'] in ('queued', 'running'):
+                if st.button("Abbrechen", key=f"cancel_job_{job['id']}"):
+                    jobs.cancel(store, job['id'])
+            elif job['artifact_path'] and os.path.exists(job['artifact_path']):
+                # Datei erst auf Anforderung lesen, und nur für diesen einen Auftrag
+                if st.session_state.get('download_job') != job['id']:
+                    if st.button("📦 Bereitstellen", key=f"prepare_job_{job['id']}",
+                                 help=f"Verfügbar bis {job['expires_at']} UTC"):
+                        st.session_state.download_job = job['id']
+                        st.rerun()
+                else:
+                    with open(job['artifact_path'], 'rb') as fh:
+                        st.download_button("⬇️ Download", data=fh.read(), file_name=job['artifact_name'],
+                                           mime=job['artifact_mime'], key=f"download_job_{job['id']}",
+                                           on_click=lambda: st.session_state.pop('download_job', None))
+
+def render_snippet(snippet: str) -> str:
+    # Treffer-Markierungen aus FTS5 erst nach dem Escapen in <mark> umwandeln
+    return (html.escape(snippet or '')
+            .replace(HIGHLIGHT_START, '<mark>')
+            .replace(HIGHLIGHT_END, '</mark>'))
+
+def render_interview_details(interview_id: int, key_prefix: str = ""):
+    # Transkription/Notizen/HTML erst laden, wenn der Eintrag aufgeklappt und angefordert wird
+    if not st.toggle("🔍 Details laden", key=f"{key_prefix}details_{interview_id}"):
+        return
+    interview_data = store.get_interview_by_id(interview_id, cached=True)
+    if not interview_data:
+        st.warning("⚠️ Interview nicht gefunden")
+        return
+    if interview_data['transcription']:
+        st.text_area("Transkription:", value=interview_data['transcription'], height=150, disabled=True, key=f"{key_prefix}trans_{interview_id}")
+    else:
+        st.warning("⚠️ Keine Transkription")
+    if interview_data['notes']:
+        st.info(f"**Notizen:** {interview_data['notes']}")
+    
+    # Aufnahme und HTML nur auf Anforderung: sonst dekodiert bzw. rendert jeder Rerun erneut
+    if st.toggle("🔊 Aufnahme laden", key=f"{key_prefix}audio_on_{interview_id}"):
+        audio_ms = cached_audio_duration(interview_id)
+        if audio_ms:
+            # Wiedergabe minutenweise, damit nie die ganze Aufnahme dekodiert wird
+            minute = 0
+            if audio_ms > 60000:
+                minute = st.slider("🔊 Aufnahme ab Minute:", 0, audio_ms // 60000, 0, key=f"{key_prefix}audio_{interview_id}")
+            st.audio(cached_audio_minute(interview_id, minute), format="audio/wav")
+        else:
+            st.caption("Keine Aufnahme gespeichert")
+    
+    report_key = f"{key_prefix}report_{interview_id}"
+    if st.button("📄 HTML-Bericht erstellen", key=f"{report_key}_build"):
+        st.session_state[report_key] = render_interview_report(store, interview_id) or ""
+    if report_key in st.session_state:
+        st.download_button(
+            label=f"📥 Interview #{interview_id} als HTML",
+            data=st.session_state[report_key],
+            file_name=f"interview_{interview_id}.html",
+            mime="text/html",
+            key=f"{key_prefix}download_{interview_id}"
+        )
+
+# Aufnahmen: kurz zwischenspeichern (laufende Aufnahmen wachsen), dekodierte Minuten begrenzt
+@st.cache_data(ttl=OVERVIEW_TTL_SECONDS, show_spinner=False)
+def cached_audio_duration(interview_id: int):
+    return audio_store.duration_ms(interview_id)
+
+@st.cache_data(ttl=OVERVIEW_TTL_SECONDS, max_entries=8, show_spinner=False)
+def cached_audio_minute(interview_id: int, minute: int):
+    return audio_store.read_range(interview_id, minute * 60000, (minute + 1) * 60000)
+
+# Übersicht kurz zwischenspeichern: Reruns anderer Tabs (z.B. Aufnahme) fragen die DB nicht jedes Mal ab
+@st.cache_data(ttl=OVERVIEW_TTL_SECONDS, show_spinner=False)
+def cached_overview_page(cursor_key):
+    return get_store().count_interviews(), get_store().list_interviews_page(cursor_key)
+
+@st.cache_data(ttl=OVERVIEW_TTL_SECONDS, show_spinner=False)
+def cached_search(query: str, page_no: int):
+    return (get_store().count_search_results(query),
+            get_store().search_interviews(query, limit=PAGE_SIZE, offset=page_no * PAGE_SIZE))
+
+def render_overview():
+    query = st.text_input("🔎 Suche in Transkriptionen, Notizen und Personen:", placeholder="z.B. Storch, Greifvogel", key="search_query")
+    if query != st.session_state.search_last_query:
+        st.session_state.search_last_query = query
+        st.session_state.search_page = 0
+    
+    if query.strip():
+        page_no = st.session_state.search_page
+        hits, results = cached_search(query, page_no)
+        st.write(f"**{hits} Treffer** · Seite {page_no + 1} von {max(1, (hits + PAGE_SIZE - 1) // PAGE_SIZE)}")
+        for result in results:
+            st.markdown(f"**Interview #{result['id']}** - {html.escape(result['date'] or '')} - {html.escape(result['interviewer'] or '')}<br>{render_snippet(result['snippet'])}", unsafe_allow_html=True)
+            with st.expander(f"Interview #{result['id']} öffnen"):
+                render_interview_details(result['id'], key_prefix="search_")
         
-        function updateDownload() {{
-            const btn = document.getElementById('dlBtn');
-            if (txt) {{
-                const blob = new Blob([txt], {{type: 'text/plain;charset=utf-8'}});
-                const url = URL.createObjectURL(blob);
-                btn.href = url;
-                btn.download = 'interview_{interview_id}_' + new Date().toISOString().slice(0,10) + '.txt';
-                btn.style.display = 'inline-block';
-            }}
-        }}
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("◀️ Zurück", disabled=page_no == 0, use_container_width=True, key="search_prev"):
+                st.session_state.search_page -= 1
+                st.rerun()
+        with col2:
+            if st.button("Weiter ▶️", disabled=(page_no + 1) * PAGE_SIZE >= hits, use_container_width=True, key="search_next"):
+                st.session_state.search_page += 1
+                st.rerun()
+        return
+    total, interviews = cached_overview_page(st.session_state.overview_cursors[-1])
+    if total:
+        page_no = len(st.session_state.overview_cursors)
+        st.write(f"**Gesamt: {total} Interviews** · Seite {page_no} von {(total + PAGE_SIZE - 1) // PAGE_SIZE}")
+        for interview in interviews:
+            with st.expander(f"Interview #{interview['id']} - {interview['date']} - {interview['interviewer']}"):
+                st.write(f"**Person:** {interview['interviewee_info']}")
+                st.write(f"**Textlänge:** {interview['length']} Zeichen")
+                render_interview_details(interview['id'])
         
-        window.addEventListener('load', updateDownload);
-        window.addEventListener('beforeunload', () => {{ if (txt) localStorage.setItem(key, txt); }});
-    </script>
-    """
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("◀️ Zurück", disabled=page_no == 1, use_container_width=True):
+                st.session_state.overview_cursors.pop()
+                st.rerun()
+        with col2:
+            if st.button("Weiter ▶️", disabled=len(interviews) < PAGE_SIZE or page_no * PAGE_SIZE >= total, use_container_width=True):
+                last = interviews[-1]
+                st.session_state.overview_cursors.append((last['created_at'], last['id']))
+                st.rerun()
+    else:
+        st.info("Noch keine Interviews")
 
 # Session State
 if 'current_interview_id' not in st.session_state:
     st.session_state.current_interview_id = None
 if 'transcript_text' not in st.session_state:
     st.session_state.transcript_text = ""
+    # (Revision, Text, letztes Segment) des zuletzt gespeicherten/geladenen Stands für Patches und Autosave;
+    # danach eingegangene Live-Segmente bleiben erhalten und erscheinen beim nächsten "Aus DB laden"
+    st.session_state.transcript_base = (0, "", 0)
+    st.session_state.transcript_saved_at = 0.0
+if 'segments_acked' not in st.session_state:
+    st.session_state.segments_acked = {}
+if 'audio_acked' not in st.session_state:
+    st.session_state.audio_acked = {}
+if 'overview_cursors' not in st.session_state:
+    st.session_state.overview_cursors = [None]
+if 'search_last_query' not in st.session_state:
+    st.session_state.search_last_query = ""
+    st.session_state.search_page = 0
 
 if not init_database():
     st.stop()
+store = get_store()
+rerun_queries = store.pool.query_count()
+stt_queue = SttQueue(store)
+audio_store = AudioStore(store)
+stt_workers = get_stt_workers()
+job_workers = get_job_workers()
 
 st.title("🎤 Interview Transkription")
 st.caption("Wildvogelpflegestation - Besucherbefragung")
 
-tab1, tab2, tab3 = st.tabs(["📝 Neues Interview", "📊 Übersicht", "ℹ️ Hilfe"])
+tab1, tab2, tab_stats, tab3 = st.tabs(["📝 Neues Interview", "📊 Übersicht", "📈 Auswertung", "ℹ️ Hilfe"])
 
-with tab1:
+with tab1, profiler.section("Neues Interview"):
     with st.expander("👤 Interview-Details", expanded=True):
         col1, col2 = st.columns(2)
         with col1:
@@ -304,10 +336,12 @@ with tab1:
                 'notes': '',
                 'metadata': {}
             }
-            interview_id = save_interview(interview_data)
+            interview_id = store.save_interview(interview_data)
             if interview_id:
+                cached_overview_page.clear()
                 st.session_state.current_interview_id = interview_id
                 st.session_state.transcript_text = ""
+                st.session_state.transcript_base = (0, "", 0)
                 st.success(f"✅ Interview #{interview_id} erstellt")
                 st.rerun()
     
@@ -315,7 +349,7 @@ with tab1:
         if st.session_state.current_interview_id:
             if st.button("💾 In DB speichern", use_container_width=True):
                 if st.session_state.transcript_text:
-                    update_interview_transcription(st.session_state.current_interview_id, st.session_state.transcript_text)
+                    save_transcript("Gespeichert")
                     st.success("✅ Gespeichert!")
                 else:
                     st.warning("⚠️ Kein Text!")
@@ -323,11 +357,13 @@ with tab1:
     with col3:
         if st.session_state.current_interview_id:
             if st.button("✅ Abschließen", use_container_width=True, type="secondary"):
+                # Beim Abschliessen kompaktieren: Suche, Export und Sync sehen danach den finalen Text
                 if st.session_state.transcript_text:
-                    update_interview_transcription(st.session_state.current_interview_id, st.session_state.transcript_text)
-                interview_data = get_interview_by_id(st.session_state.current_interview_id)
-                if interview_data:
-                    html_content = generate_pdf_simple(interview_data)
+                    save_transcript("Abgeschlossen", compact=True)
+                else:
+                    revisions.compact(store, st.session_state.current_interview_id)
+                html_content = render_interview_report(store, st.session_state.current_interview_id)
+                if html_content:
                     st.download_button(
                         label="📥 HTML/PDF herunterladen",
                         data=html_content,
@@ -338,16 +374,31 @@ with tab1:
                 st.success(f"✅ Interview #{st.session_state.current_interview_id} abgeschlossen!")
                 st.session_state.current_interview_id = None
                 st.session_state.transcript_text = ""
+                st.session_state.transcript_base = (0, "", 0)
     
     if st.session_state.current_interview_id:
         st.info(f"📍 Aktuelles Interview: #{st.session_state.current_interview_id}")
         
         st.markdown("### 🎙️ Sprachaufnahme")
-        st.components.v1.html(create_speech_interface(st.session_state.current_interview_id), height=450)
+        acked_seq, acked_audio_seq = sync_speech_segments(st.session_state.current_interview_id)
+        speech_recorder(
+            interview_id=st.session_state.current_interview_id,
+            acked_seq=acked_seq,
+            acked_audio_seq=acked_audio_seq,
+            server_stt=stt_workers is not None,
+            vocabulary=load_normalizer(store).to_component(),
+            key=f"recorder_{st.session_state.current_interview_id}",
+            default=None
+        )
+        if stt_workers is not None:
+            stt_stats = job_stats(store, st.session_state.current_interview_id)
+            if stt_stats['queued'] or stt_stats['running'] or stt_stats['failed']:
+                st.caption(f"🖥️ Server-Transkription: {stt_stats['queued']} wartend · {stt_stats['running']} in Arbeit · "
+                           f"{stt_stats['done']} fertig · {stt_stats['failed']} fehlgeschlagen")
         
         st.markdown("---")
         st.markdown("### ✏️ Text bearbeiten / einfügen")
-        st.info("👆 **Nach Aufnahme:** Auf '💾 Download TXT' klicken, dann Datei öffnen und hier einfügen!")
+        st.info("👆 Erkannte Sätze werden **automatisch** gespeichert. Mit '🔄 Aus DB laden' ins Textfeld übernehmen und bearbeiten.")
         
         transcript = st.text_area(
             "Text hier einfügen:",
@@ -358,21 +409,25 @@ with tab1:
         
         if transcript != st.session_state.transcript_text:
             st.session_state.transcript_text = transcript
+        if hasattr(st, 'fragment') and st.session_state.transcript_text != st.session_state.transcript_base[1]:
+            # Nachlaufendes Speichern: ohne weiteren Rerun ginge die letzte Änderung im Fenster sonst verloren
+            st.fragment(run_every=AUTOSAVE_SECONDS)(autosave_transcript)()
+        else:
+            autosave_transcript()
         
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("💾 Speichern", use_container_width=True, type="primary"):
                 if transcript:
-                    update_interview_transcription(st.session_state.current_interview_id, transcript)
+                    save_transcript("Gespeichert")
                     st.success("✅ Gespeichert!")
                 else:
                     st.warning("⚠️ Kein Text!")
         
         with col2:
             if st.button("🔄 Aus DB laden", use_container_width=True):
-                interview_data = get_interview_by_id(st.session_state.current_interview_id)
-                if interview_data and interview_data.get('transcription'):
-                    st.session_state.transcript_text = interview_data['transcription']
+                load_transcript(st.session_state.current_interview_id)
+                if st.session_state.transcript_text:
                     st.rerun()
                 else:
                     st.info("Keine Daten in DB")
@@ -382,88 +437,161 @@ with tab1:
                 st.session_state.transcript_text = ""
                 st.rerun()
         
+        if st.toggle("🕘 Versionen anzeigen", key="show_revisions"):
+            history = revisions.history(store, st.session_state.current_interview_id)
+            if history:
+                labels = {entry['rev']: f"Rev. {entry['rev']} · {entry['created_at'][:19]} · "
+                                        f"{entry['note'] or ('Snapshot' if entry['kind'] == 'snapshot' else 'Änderung')}"
+                          for entry in history}
+                rev = st.selectbox("Version:", list(labels), format_func=labels.get, key="revision_select")
+                st.text_area("Text dieser Version:", value=revisions.text_at(store, st.session_state.current_interview_id, rev),
+                             height=120, disabled=True, key=f"revision_preview_{rev}")
+                if st.button("↩️ Auf diese Version zurücksetzen"):
+                    revisions.rollback(store, st.session_state.current_interview_id, rev)
+                    load_transcript(st.session_state.current_interview_id)
+                    st.rerun()
+            else:
+                st.caption("Noch keine gespeicherten Versionen")
+        
         st.markdown("### 📝 Notizen")
-        current_interview = get_interview_by_id(st.session_state.current_interview_id)
-        current_notes = current_interview.get('notes', '') if current_interview else ''
-        notes = st.text_area("Zusätzliche Beobachtungen:", value=current_notes, height=100, key="notes_field")
+        # Nur beim Wechsel des Interviews aus der DB vorbelegen; danach hält der Widget-State den Text
+        if st.session_state.get('notes_interview_id') != st.session_state.current_interview_id:
+            current_interview = store.get_interview_by_id(st.session_state.current_interview_id, cached=True)
+            st.session_state.notes_field = (current_interview or {}).get('notes') or ''
+            st.session_state.notes_interview_id = st.session_state.current_interview_id
+        notes = st.text_area("Zusätzliche Beobachtungen:", height=100, key="notes_field")
         
         if st.button("💾 Notizen speichern"):
-            conn = sqlite3.connect('interviews.db')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE interviews SET notes = ? WHERE id = ?', (notes, st.session_state.current_interview_id))
-            conn.commit()
-            conn.close()
+            store.update_interview_notes(st.session_state.current_interview_id, notes)
             st.success("✅ Notizen gespeichert!")
 
-with tab2:
+with tab2, profiler.section("Übersicht"):
     st.header("📊 Interview-Übersicht")
-    conn = sqlite3.connect('interviews.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, interview_date, interviewer, interviewee_info, LENGTH(transcription) as length, transcription, notes FROM interviews ORDER BY created_at DESC')
-    interviews = cursor.fetchall()
-    conn.close()
-    
-    if interviews:
-        st.write(f"**Gesamt: {len(interviews)} Interviews**")
-        for interview in interviews:
-            with st.expander(f"Interview #{interview[0]} - {interview[1]} - {interview[2]}"):
-                st.write(f"**Person:** {interview[3]}")
-                st.write(f"**Textlänge:** {interview[4]} Zeichen")
-                if interview[5]:
-                    st.text_area("Transkription:", value=interview[5], height=150, disabled=True, key=f"trans_{interview[0]}")
-                else:
-                    st.warning("⚠️ Keine Transkription")
-                if interview[6]:
-                    st.info(f"**Notizen:** {interview[6]}")
-                
-                interview_data = {
-                    'id': interview[0], 'date': interview[1], 'interviewer': interview[2],
-                    'interviewee_info': interview[3], 'transcription': interview[5] or 'Keine Transkription',
-                    'notes': interview[6], 'created_at': interview[1]
-                }
-                html_content = generate_pdf_simple(interview_data)
-                st.download_button(
-                    label=f"📥 Interview #{interview[0]} als HTML",
-                    data=html_content,
-                    file_name=f"interview_{interview[0]}.html",
-                    mime="text/html",
-                    key=f"download_{interview[0]}"
-                )
+    # Liste als Fragment: Details/Blättern laufen ohne die übrigen Tabs neu
+    if hasattr(st, 'fragment'):
+        st.fragment(render_overview)()
     else:
-        st.info("Noch keine Interviews")
+        render_overview()
     
-    if st.button("📥 Alle als JSON exportieren"):
-        conn = sqlite3.connect('interviews.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM interviews')
-        columns = [desc[0] for desc in cursor.description]
-        data = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        conn.close()
-        json_str = json.dumps(data, indent=2, ensure_ascii=False, default=str)
-        st.download_button(
-            label="⬇️ JSON herunterladen",
-            data=json_str,
-            file_name=f"alle_interviews_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
-        )
+    with st.expander("📥 Export"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            export_format = st.selectbox("Format:", EXPORT_FORMATS, format_func=str.upper)
+        with col2:
+            export_range = st.date_input("Zeitraum:", value=(), key="export_range")
+        with col3:
+            export_interviewer = st.text_input("Interviewer*in (optional):", key="export_interviewer")
+        export_filters = {'interviewer': export_interviewer.strip() or None}
+        if len(export_range) > 0:
+            export_filters['date_from'] = export_range[0].isoformat()
+            export_filters['date_to'] = export_range[-1].isoformat()
+        # Export und Berichte laufen als Hintergrundauftrag; die Dateien liegen danach unter "Aufträge & Downloads"
+        if st.button("📥 Export erstellen"):
+            jobs.submit(store, 'export', {'format': export_format, 'filters': export_filters})
+            st.session_state.show_jobs = True
+
+        col1, col2 = st.columns(2)
+        with col1:
+            report_zip = st.button("🖨️ Berichte als ZIP", use_container_width=True)
+        with col2:
+            report_html = st.button("🖨️ Sammeldokument (HTML)", use_container_width=True)
+        if report_zip or report_html:
+            jobs.submit(store, 'report', {'format': 'zip' if report_zip else 'html', 'filters': export_filters})
+            st.session_state.show_jobs = True
 
-with tab3:
+        if st.toggle("📦 Aufträge & Downloads", key="show_jobs"):
+            if job_workers is None:
+                st.caption("Aufträge werden von einem separaten Worker abgearbeitet (python -m interview_store jobs --worker)")
+            active = any(job['status'] in ('queued', 'running') for job in jobs.list_jobs(store, 10, kinds=USER_JOB_KINDS))
+            if active and hasattr(st, 'fragment'):
+                st.fragment(run_every=JOB_REFRESH_SECONDS)(render_jobs)(refresh=True)
+            else:
+                render_jobs()
+
+with tab_stats, profiler.section("Auswertung"):
+    st.header("📈 Auswertung")
+    # Liest nur die Rollup-Tabellen; geänderte Interviews bucht der Wartungsauftrag 'analytics' nach
+    if st.toggle("📈 Auswertung laden", key="stats_enabled"):
+        outstanding = analytics.pending(store)
+        if outstanding:
+            col1, col2 = st.columns([3, 1])
+            col1.caption(f"{outstanding} geänderte Interviews noch nicht berücksichtigt")
+            if col2.button("🔄 Nachbuchen", use_container_width=True):
+                analytics.refresh(store)
+                st.rerun()
+        stats_range = st.date_input("Zeitraum:", value=(), key="stats_range")
+        stats_filters = {}
+        if len(stats_range) > 0:
+            stats_filters = {'date_from': stats_range[0].isoformat(), 'date_to': stats_range[-1].isoformat()}
+        summary = analytics.summary(store, **stats_filters)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Interviews", summary['interviews'])
+        col2.metric("Ø Wörter", f"{summary['avg_words']:.0f}")
+        col3.metric("Ø Zeichen", f"{summary['avg_chars']:.0f}")
+        col4.metric("Wörter/Minute", f"{summary['words_per_minute']:.0f}" if summary['words_per_minute'] is not None else "–")
+        
+        days = pd.DataFrame(analytics.per_day(store, **stats_filters), columns=['day', 'interviewer', 'interviews', 'words'])
+        if not days.empty:
+            st.subheader("Interviews pro Tag")
+            st.bar_chart(days.pivot_table(index='day', columns='interviewer', values='interviews', aggfunc='sum', fill_value=0))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Pro Interviewer*in")
+            people = pd.DataFrame(analytics.per_interviewer(store, **stats_filters),
+                                  columns=['interviewer', 'interviews', 'avg_words', 'words_per_minute'])
+            st.dataframe(people.round(1), hide_index=True, use_container_width=True, column_config={
+                'interviewer': "Interviewer*in", 'interviews': "Interviews",
+                'avg_words': "Ø Wörter", 'words_per_minute': "Wörter/min",
+            })
+        with col2:
+            st.subheader("Häufigste Begriffe")
+            terms = pd.DataFrame(cached_top_terms(), columns=['term', 'count', 'interviews'])
+            st.dataframe(terms, hide_index=True, use_container_width=True, column_config={
+                'term': "Begriff", 'count': "Vorkommen", 'interviews': "in Interviews",
+            })
+
+with tab3, profiler.section("Hilfe"):
     st.header("ℹ️ Anleitung")
     st.markdown("""
     ### 🚀 So geht's
     
     1. **Interview erstellen:** Details eingeben → Einverständnis ✅ → "Neues Interview"
     2. **Aufnehmen:** "▶️ Start" → Sprechen → "⏹️ Stop"
-    3. **Speichern:** Auf "💾 Download TXT" klicken → Datei öffnen → Text kopieren → In Textfeld einfügen → "💾 Speichern"
-    4. **Abschließen:** "✅ Abschließen" → HTML/PDF Download
+    3. **Speichern:** Erkannte Sätze werden alle paar Sekunden automatisch in der DB gespeichert
+    4. **Bearbeiten (optional):** "🔄 Aus DB laden" → Text korrigieren (wird alle paar Sekunden automatisch gespeichert) → "💾 Speichern"
+    5. **Abschließen:** "✅ Abschließen" → HTML/PDF Download
     
     ### 💡 Wichtig
-    - **Download TXT Button** erscheint nach dem Stoppen der Aufnahme
-    - Text wird **lokal im Browser** gespeichert
-    - **Manuell** in DB übertragen mit "💾 Speichern"
-    - Bei längeren Interviews: Regelmäßig speichern!
+    - Noch nicht gespeicherte Sätze bleiben **lokal im Browser** und werden nachgeschickt
+    - **Download TXT Button** bleibt als Sicherungskopie verfügbar
     
     ### 📱 Browser
     - ✅ Chrome/Edge (empfohlen)
-    - ❌ Safari iOS
-    """)
\ No newline at end of file
+    - ❌ Safari iOS (Browser-Erkennung) – ✅ mit "🎙️ Server-Aufnahme", falls auf dem Server aktiviert
+    """)
+    
+    with st.expander("📚 Vokabular (Dialekt & Vogelnamen)"):
+        normalizer = load_normalizer(store)
+        st.caption(f"Version {normalizer.version} · {len(normalizer.rules)} Regeln · gilt für Live-Aufnahme und Nachbearbeitung")
+        rules_df = pd.DataFrame(normalizer.rules, columns=['pattern', 'replacement', 'whole_word'])
+        edited_rules = st.data_editor(
+            rules_df,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                'pattern': st.column_config.TextColumn("Erkannt als"),
+                'replacement': st.column_config.TextColumn("Ersetzen durch"),
+                'whole_word': st.column_config.CheckboxColumn("Nur ganzes Wort", default=True),
+            },
+            key="vocabulary_editor"
+        )
+        if st.button("💾 Vokabular speichern"):
+            rules = edited_rules.dropna(subset=['pattern']).fillna({'replacement': '', 'whole_word': True}).to_dict('records')
+            version = save_rules(store, rules, "In der App bearbeitet")
+            st.success(f"✅ Vokabular-Version {version} gespeichert")
+
+profiler.finish('rerun', interview_id=st.session_state.current_interview_id)
+if SHOW_RERUN_STATS:
+    st.caption(f"⏱️ Rerun: {(time.perf_counter() - rerun_started) * 1000:.0f} ms · "
+               f"{store.pool.query_count() - rerun_queries} DB-Abfragen")
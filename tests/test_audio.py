@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from interview_store import InterviewStore
+from interview_store.audio import AudioStore, write_wav
+from interview_store.stt import SttQueue
+
+INTERVIEW = {'date': '2026-05-01', 'interviewer': 'Anna', 'interviewee_info': '', 'transcription': '', 'notes': '',
+             'metadata': {}}
+SAMPLE_RATE = 16000
+
+
+def _wav(value: int, seconds: float = 1.0) -> bytes:
+    # Unterschiedliche Werte ergeben unterschiedliche Blobs (Inhaltsadressierung)
+    return write_wav(bytes([value, value + 1]) * int(SAMPLE_RATE * seconds), SAMPLE_RATE)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InterviewStore(str(tmp_path / 'interviews.db'))
+    store.init_database()
+    return store
+
+
+@pytest.fixture
+def audio(store, tmp_path):
+    return AudioStore(store, str(tmp_path / 'audio'))
+
+
+def _recorded(store, audio, *values, written_at=None):
+    interview_id = store.save_interview(dict(INTERVIEW))
+    for seq, value in enumerate(values, 1):
+        audio.append_chunk(interview_id, seq, _wav(value))
+    if written_at:
+        with store.pool.transaction() as conn:
+            conn.execute('UPDATE audio_chunks SET created_at = ? WHERE interview_id = ?', (written_at, interview_id))
+    return interview_id
+
+
+def _files(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+
+def test_chunks_are_stored_once_and_read_back(store, audio):
+    first = _recorded(store, audio, 1, 2)
+    second = _recorded(store, audio, 1)
+    assert audio.usage()['blobs'] == 2
+    assert audio.duration_ms(first) == 2000
+    assert audio.read_range(first, 1000, 2000) == _wav(2)
+    assert audio.read_range(second) == _wav(1)
+    assert len(_files(audio.root)) == 2
+
+
+def test_gc_removes_unreferenced_blobs(store, audio):
+    first = _recorded(store, audio, 1, 2)
+    _recorded(store, audio, 1)
+    audio.delete_interview_audio(first)
+    assert audio.gc() == 1
+    # Blob 1 wird vom zweiten Interview noch genutzt
+    assert audio.usage()['blobs'] == 1
+    assert len(_files(audio.root)) == 1
+    assert audio.gc() == 0
+
+
+def test_retention_by_size_evicts_oldest_first(store, audio):
+    old = _recorded(store, audio, 1, 2, written_at='2026-01-01 00:00:00')
+    middle = _recorded(store, audio, 3, written_at='2026-02-01 00:00:00')
+    new = _recorded(store, audio, 4, written_at='2026-03-01 00:00:00')
+    with store.pool.connection() as conn:
+        sizes = dict(conn.execute('SELECT c.interview_id, SUM(b.stored_bytes) FROM audio_chunks c '
+                                  'JOIN audio_blobs b ON b.hash = c.hash GROUP BY c.interview_id'))
+    result = audio.enforce_retention(max_bytes=sizes[middle] + sizes[new], max_age_days=0)
+    assert result == {'interviews': 1, 'blobs': 2}
+    assert (audio.duration_ms(old), audio.duration_ms(middle), audio.duration_ms(new)) == (0, 1000, 1000)
+    assert len(_files(audio.root)) == 2
+
+
+def test_retention_counts_shared_blobs_only_once(store, audio):
+    old = _recorded(store, audio, 1, written_at='2026-01-01 00:00:00')
+    new = _recorded(store, audio, 1, 2, written_at='2026-02-01 00:00:00')
+    total = audio.usage()['stored_bytes']
+    # Entfernen von "old" gibt nichts frei (Blob geteilt), also muss auch "new" weichen
+    result = audio.enforce_retention(max_bytes=total - 1, max_age_days=0)
+    assert result == {'interviews': 2, 'blobs': 2}
+    assert audio.duration_ms(old) == audio.duration_ms(new) == 0
+    assert _files(audio.root) == []
+
+
+def test_retention_by_age_keeps_audio_with_open_stt_jobs(store, audio):
+    old = _recorded(store, audio, 1, written_at='2020-01-01 00:00:00')
+    busy = _recorded(store, audio, 2, written_at='2020-01-01 00:00:00')
+    recent = _recorded(store, audio, 3)
+    SttQueue(store).submit(busy, 1, _wav(2))
+    result = audio.enforce_retention(max_bytes=0, max_age_days=30)
+    assert result == {'interviews': 1, 'blobs': 1}
+    assert (audio.duration_ms(old), audio.duration_ms(busy), audio.duration_ms(recent)) == (0, 1000, 1000)
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+import pytest
+
+from interview_store import InterviewStore, revisions
+from interview_store.export import COLUMNS, FORMATS, export_interviews, export_to_tempfile
+
+INTERVIEWS = [
+    {'date': '2026-05-01', 'interviewer': 'Anna', 'interviewee_info': 'Familie, "Huber"',
+     'transcription': 'Ich sah\neinen Storch', 'notes': 'Kinder dabei', 'metadata': {'duration_s': 60}},
+    {'date': '2026-05-02T15:30', 'interviewer': 'Ben', 'interviewee_info': '',
+     'transcription': 'Ein Igel', 'notes': '', 'metadata': {}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InterviewStore(str(tmp_path / 'interviews.db'))
+    store.init_database()
+    store.save_interviews([dict(interview) for interview in INTERVIEWS])
+    return store
+
+
+def _parse(fmt, text):
+    if fmt == 'ndjson':
+        return [json.loads(line) for line in text.splitlines()]
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(text, newline='')))
+    return json.loads(text)
+
+
+def _export(store, fmt, **filters):
+    buffer = io.StringIO(newline='')
+    count = export_interviews(store, buffer, fmt, chunk_size=1, **filters)
+    return count, _parse(fmt, buffer.getvalue())
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_formats_round_trip(store, fmt):
+    count, rows = _export(store, fmt)
+    assert count == len(rows) == 2
+    assert [list(row) for row in rows] == [list(COLUMNS)] * 2
+    assert [row['interviewee_info'] for row in rows] == ['Familie, "Huber"', '']
+    assert rows[0]['transcription'] == 'Ich sah\neinen Storch'
+    assert [str(row['id']) for row in rows] == ['1', '2']
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_empty_export_is_valid(store, fmt):
+    count, rows = _export(store, fmt, date_from='2030-01-01')
+    assert count == 0
+    assert rows == []
+
+
+def test_json_matches_dumped_list(store):
+    buffer = io.StringIO()
+    export_interviews(store, buffer, 'json')
+    with store.pool.connection() as conn:
+        expected = [dict(zip(COLUMNS, row)) for row in conn.execute(f'SELECT {", ".join(COLUMNS)} FROM interviews ORDER BY id')]
+    assert buffer.getvalue() == json.dumps(expected, indent=2, ensure_ascii=False)
+
+
+def test_filters_include_whole_end_day(store):
+    assert [row['id'] for row in _export(store, 'ndjson', date_to='2026-05-02')[1]] == [1, 2]
+    assert [row['id'] for row in _export(store, 'ndjson', date_from='2026-05-02')[1]] == [2]
+    assert [row['id'] for row in _export(store, 'ndjson', interviewer='Anna')[1]] == [1]
+
+
+def test_export_reads_pending_patches(store):
+    revisions.save_transcript(store, 2, 'Ein verletzter Igel')
+    assert revisions.pending_stats(store)['interviews'] == 1
+    assert _export(store, 'ndjson')[1][1]['transcription'] == 'Ein verletzter Igel'
+
+
+def test_progress_and_tempfile(store):
+    calls = []
+    export_interviews(store, io.StringIO(), 'csv', chunk_size=1, progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (2, 2)
+    fh, count = export_to_tempfile(store, 'ndjson')
+    with fh:
+        lines = fh.read().decode('utf-8').splitlines()
+    assert count == len(lines) == 2
+
+
+def test_unknown_format(store):
+    with pytest.raises(ValueError):
+        export_interviews(store, io.StringIO(), 'xml')
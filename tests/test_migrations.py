@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from interview_store import InterviewStore
+from interview_store.migrations import LATEST, check_query_plans, current_version, history
+
+# Schema der ursprünglichen App (eine Tabelle, ohne Versionierung)
+LEGACY_SCHEMA = '''
+    CREATE TABLE interviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        interview_date TEXT NOT NULL,
+        interviewer TEXT,
+        interviewee_info TEXT,
+        transcription TEXT,
+        notes TEXT,
+        metadata TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def _legacy_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO interviews (interview_date, interviewer, interviewee_info, transcription, notes, metadata) "
+                 "VALUES ('2024-05-01', 'Anna', 'Besucherin', 'Ich sah einen Storch', '', '{\"duration_s\": 60}')")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(params=['neu', 'alt'])
+def store(request, tmp_path):
+    path = str(tmp_path / 'interviews.db')
+    if request.param == 'alt':
+        _legacy_database(path)
+    store = InterviewStore(path)
+    store.init_database()
+    return store
+
+
+def test_migrates_to_latest(store):
+    with store.pool.connection() as conn:
+        assert current_version(conn) == LATEST
+    assert [entry['version'] for entry in history(store.pool)] == list(range(1, LATEST + 1))
+    assert store.init_database() == []
+
+
+def test_legacy_rows_survive(tmp_path):
+    path = str(tmp_path / 'interviews.db')
+    _legacy_database(path)
+    store = InterviewStore(path)
+    store.init_database()
+    assert store.get_interview_by_id(1)['transcription'] == 'Ich sah einen Storch'
+
+
+def test_query_plans(store):
+    results = check_query_plans(store.pool)
+    assert results
+    for result in results:
+        assert result['ok'], f"{result['name']}: {result['problems']}\n" + '\n'.join(result['plan'])
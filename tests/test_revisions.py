@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from interview_store import InterviewStore, revisions
+
+INTERVIEW = {'date': '2026-05-01', 'interviewer': 'Anna', 'interviewee_info': 'Besucher', 'notes': '',
+             'metadata': {}}
+TEXT = 'Ich sah einen Storch auf dem Dach. ' * 200
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InterviewStore(str(tmp_path / 'interviews.db'))
+    store.init_database()
+    return store
+
+
+def _revisions(store, interview_id):
+    with store.pool.connection() as conn:
+        return conn.execute('SELECT rev, kind, data, note FROM transcript_revisions WHERE interview_id = ? ORDER BY rev',
+                            (interview_id,)).fetchall()
+
+
+def _column(store, interview_id):
+    with store.pool.connection() as conn:
+        return conn.execute('SELECT transcription FROM interviews WHERE id = ?', (interview_id,)).fetchone()[0]
+
+
+def test_edit_is_stored_as_patch(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    edited = TEXT.replace('Dach', 'Kirchturm', 1)
+    revisions.save_transcript(store, interview_id, edited, base=revisions.load_transcript(store, interview_id))
+
+    rows = _revisions(store, interview_id)
+    assert [(rev, kind) for rev, kind, _, _ in rows] == [(1, 'snapshot'), (2, 'patch')]
+    start = TEXT.index('Dach')
+    assert json.loads(rows[1][2]) == [[start, start + len('Dach'), 'Kirchturm']]
+    # Spalte erst beim Kompaktieren; Lesen liefert trotzdem den bearbeiteten Stand
+    assert _column(store, interview_id) == TEXT
+    assert store.get_interview_by_id(interview_id)['transcription'] == edited
+    assert revisions.pending_stats(store)['interviews'] == 1
+
+
+def test_compaction_writes_column_and_snapshot(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    edited = TEXT.replace('Storch', 'Reiher', 1)
+    revisions.save_transcript(store, interview_id, edited, compact=True)
+
+    assert _column(store, interview_id) == edited
+    assert revisions.pending_stats(store)['interviews'] == 0
+    rev, kind, data, note = _revisions(store, interview_id)[-1]
+    assert (kind, data, note) == ('snapshot', edited, 'Kompaktiert')
+    assert revisions.load_transcript(store, interview_id)[:2] == (rev, edited)
+
+
+def test_compacts_after_too_many_patches(store, monkeypatch):
+    monkeypatch.setattr(revisions, 'COMPACT_PATCHES', 3)
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    base = revisions.load_transcript(store, interview_id)
+    for word in ('eins', 'zwei'):
+        base = revisions.save_transcript(store, interview_id, base[1] + word, base=base)
+    assert revisions.pending_stats(store)['patches'] == 2
+    base = revisions.save_transcript(store, interview_id, base[1] + 'drei', base=base)
+    assert revisions.pending_stats(store)['patches'] == 0
+    assert _column(store, interview_id) == TEXT + 'einszweidrei'
+
+
+def test_rollback_keeps_history(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    revisions.save_transcript(store, interview_id, 'Ganz neuer Text')
+    rev = revisions.rollback(store, interview_id, 1)
+
+    assert revisions.load_transcript(store, interview_id)[:2] == (rev, TEXT)
+    assert revisions.text_at(store, interview_id, 2) == 'Ganz neuer Text'
+    # Rücksetzen = Patch mit Vermerk, danach sofort kompaktiert
+    assert [entry['note'] for entry in revisions.history(store, interview_id)[:2]] == [
+        'Kompaktiert', 'Zurückgesetzt auf Revision 1']
+    assert _column(store, interview_id) == TEXT
+
+
+def test_rollback_to_unknown_revision_fails(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    with pytest.raises(ValueError):
+        revisions.rollback(store, interview_id, 5)
+
+
+def test_diff_falls_back_to_words_for_large_changes():
+    old = ' '.join(f'wort{i}' for i in range(1000))
+    new = old.replace('wort10 ', 'Storch ').replace('wort990 ', 'Reiher ')
+    patch = revisions.diff(old, new)
+    assert len(patch) == 2
+    assert revisions.apply_patch(old, patch) == new
+    # Kleiner geänderter Bereich: ein Block
+    small = old.replace('wort10 ', 'Storch ').replace('wort20 ', 'Reiher ')
+    assert len(revisions.diff(old, small)) == 1
+    assert revisions.apply_patch(old, revisions.diff(old, small)) == small
+
+
+def test_stale_base_is_rebuilt_from_database(store):
+    # Zweiter Editor hat inzwischen gespeichert: der Patch wird gegen den gespeicherten Stand berechnet
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=TEXT))
+    stale = revisions.load_transcript(store, interview_id)
+    revisions.save_transcript(store, interview_id, TEXT + 'anderer Editor', base=stale)
+    revisions.save_transcript(store, interview_id, 'Letzter Stand', base=stale)
+    assert revisions.load_transcript(store, interview_id)[1] == 'Letzter Stand'
+
+
+def test_live_segments_after_edit_are_appended(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(interview_id, [{'seq': 1, 'text': 'Ich sah'}, {'seq': 2, 'text': 'einen Storch'}])
+    base = revisions.load_transcript(store, interview_id)
+    assert base[1:] == ('Ich sah einen Storch', 2)
+    revisions.save_transcript(store, interview_id, 'Ich sah einen Weissstorch', base=base)
+    store.append_segments(interview_id, [{'seq': 3, 'text': 'im Nest'}])
+    assert revisions.load_transcript(store, interview_id)[1:] == ('Ich sah einen Weissstorch im Nest', 3)
+    assert store.get_interview_by_id(interview_id)['transcription'] == 'Ich sah einen Weissstorch im Nest'
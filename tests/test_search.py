@@ -0,0 +1,100 @@
+import pytest
+
+from interview_store import InterviewStore, revisions
+from interview_store.search import ROW_FIELDS, ROW_SEGMENT, ROW_TEXT, rebuild_search_index
+
+INTERVIEW = {'date': '2026-05-01', 'interviewer': 'Anna', 'interviewee_info': 'Familie Huber',
+             'notes': 'Kinder dabei', 'metadata': {}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InterviewStore(str(tmp_path / 'interviews.db'))
+    store.init_database()
+    return store
+
+
+def _index(store, interview_id):
+    # Zeilen des Suchindex eines Interviews: Teil -> (transcription, notes, interviewee_info)
+    with store.pool.connection() as conn:
+        rows = conn.execute('SELECT rowid, transcription, notes, interviewee_info FROM interviews_fts '
+                            'WHERE rowid BETWEEN ? AND ?', (interview_id << 32, (interview_id + 1 << 32) - 1))
+        return {rowid - (interview_id << 32): tuple(values) for rowid, *values in rows}
+
+
+def _hits(store, query):
+    return sorted(result['id'] for result in store.search_interviews(query, 20))
+
+
+def test_rows_per_field_and_segment(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(interview_id, [{'seq': 1, 'text': 'Ich sah einen Storch'}, {'seq': 2, 'text': 'im Nest'}])
+    assert _index(store, interview_id) == {
+        ROW_TEXT: ('', None, None),
+        ROW_FIELDS: (None, 'Kinder dabei', 'Familie Huber'),
+        ROW_SEGMENT + 1: ('Ich sah einen Storch', None, None),
+        ROW_SEGMENT + 2: ('im Nest', None, None),
+    }
+    assert _hits(store, 'Storch') == [interview_id]
+    # Alle Begriffe müssen vorkommen, dürfen aber in verschiedenen Zeilen stehen
+    assert _hits(store, 'Storch Nest Kinder') == [interview_id]
+    assert _hits(store, 'Storch Uhu') == []
+    assert store.count_search_results('Storch Nest') == 1
+
+
+def test_notes_update_touches_only_fields_row(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription='Ein Igel im Garten'))
+    before = _index(store, interview_id)
+    store.update_interview_notes(interview_id, 'Igel verletzt')
+    after = _index(store, interview_id)
+    assert after[ROW_TEXT] == before[ROW_TEXT]
+    assert after[ROW_FIELDS] == (None, 'Igel verletzt', 'Familie Huber')
+    assert _hits(store, 'verletzt') == [interview_id]
+    assert _hits(store, 'dabei') == []
+
+
+def test_compaction_drops_contained_segments(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(interview_id, [{'seq': 1, 'text': 'Ich sah einen Storch'}])
+    base = revisions.load_transcript(store, interview_id)
+    revisions.save_transcript(store, interview_id, 'Ich sah einen Weissstorch', base=base)
+    # Offener Patch: Segment bleibt suchbar, bis kompaktiert wird
+    assert _hits(store, 'Storch') == [interview_id]
+    store.append_segments(interview_id, [{'seq': 2, 'text': 'auf dem Dach'}])
+    revisions.compact(store, interview_id)
+
+    index = _index(store, interview_id)
+    assert index[ROW_TEXT] == ('Ich sah einen Weissstorch', None, None)
+    # Segment 2 kam nach der Bearbeitung und steht nicht in der Spalte
+    assert [part for part in index if part >= ROW_SEGMENT] == [ROW_SEGMENT + 2]
+    assert _hits(store, 'Storch') == []
+    assert _hits(store, 'Weissstorch Dach') == [interview_id]
+
+
+def test_column_write_hides_segments_without_history(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(interview_id, [{'seq': 1, 'text': 'Turmfalke'}])
+    store.update_interview_transcription(interview_id, 'Ein Mäusebussard')
+    assert _hits(store, 'Turmfalke') == []
+    assert _hits(store, 'Mausebussard') == [interview_id]
+
+
+def test_delete_removes_all_rows(store):
+    interview_id = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(interview_id, [{'seq': 1, 'text': 'Storch'}])
+    with store.pool.transaction() as conn:
+        conn.execute('DELETE FROM interviews WHERE id = ?', (interview_id,))
+    assert _index(store, interview_id) == {}
+
+
+def test_rebuild_matches_triggers(store):
+    first = store.save_interview(dict(INTERVIEW, transcription='Ein Uhu'))
+    second = store.save_interview(dict(INTERVIEW, transcription=''))
+    store.append_segments(second, [{'seq': 1, 'text': 'Storch'}, {'seq': 2, 'text': 'Nest'}])
+    revisions.save_transcript(store, second, 'Storch', compact=True)
+    store.append_segments(second, [{'seq': 3, 'text': 'Amsel'}])
+    expected = (_index(store, first), _index(store, second))
+    with store.pool.transaction() as conn:
+        conn.execute('DELETE FROM interviews_fts')
+        assert rebuild_search_index(conn) == 2
+    assert (_index(store, first), _index(store, second)) == expected
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from interview_store import InterviewStore, sync
+
+INTERVIEW = {'date': '2026-05-01', 'interviewer': 'Anna', 'interviewee_info': '', 'notes': '',
+             'transcription': 'Ich sah einen Storch', 'metadata': {}}
+
+
+@pytest.fixture
+def stations(tmp_path):
+    stores = []
+    for name in ('a', 'b'):
+        store = InterviewStore(str(tmp_path / f'{name}.db'))
+        store.init_database()
+        stores.append(store)
+    return stores
+
+
+def _id(store, uuid):
+    with store.pool.connection() as conn:
+        return conn.execute('SELECT id FROM interviews WHERE uuid = ?', (uuid,)).fetchone()[0]
+
+
+def _shared(a, b):
+    # Interview auf A anlegen und nach B übertragen; liefert die ids auf beiden Stationen
+    interview_id = a.save_interview(dict(INTERVIEW))
+    sync.sync_stores(a, b)
+    with a.pool.connection() as conn:
+        uuid = conn.execute('SELECT uuid FROM interviews WHERE id = ?', (interview_id,)).fetchone()[0]
+    return interview_id, _id(b, uuid)
+
+
+def test_new_rows_are_copied_once(stations):
+    a, b = stations
+    a_id, b_id = _shared(a, b)
+    assert b.get_interview_by_id(b_id)['transcription'] == 'Ich sah einen Storch'
+    to_b, to_a = sync.sync_stores(a, b)
+    assert to_b['rows'] == to_a['rows'] == 0
+
+
+def test_sequential_edits_do_not_conflict(stations):
+    a, b = stations
+    a_id, b_id = _shared(a, b)
+    a.update_interview_notes(a_id, 'eins')
+    sync.sync_stores(a, b)
+    b.update_interview_transcription(b_id, 'Ich sah einen Uhu')
+    to_b, to_a = sync.sync_stores(a, b)
+    assert to_a['updated'] == 1
+    assert (to_b['conflicts'], to_a['conflicts']) == (0, 0)
+    assert a.get_interview_by_id(a_id)['transcription'] == 'Ich sah einen Uhu'
+    assert a.get_interview_by_id(a_id)['notes'] == 'eins'
+    assert sync.conflicts(a) == sync.conflicts(b) == []
+
+
+def test_concurrent_edits_keep_the_losing_version(stations):
+    # A ändert zweimal (Version 3), B einmal (Version 2): B war nicht veraltet, sondern parallel
+    a, b = stations
+    a_id, b_id = _shared(a, b)
+    a.update_interview_notes(a_id, 'eins')
+    a.update_interview_notes(a_id, 'zwei')
+    b.update_interview_transcription(b_id, 'Ich sah einen Uhu')
+    to_b, to_a = sync.sync_stores(a, b)
+
+    assert to_b['conflicts'] + to_a['conflicts'] == 1
+    recorded = sync.conflicts(a) + sync.conflicts(b)
+    assert [conflict['loser']['transcription'] for conflict in recorded] == ['Ich sah einen Uhu']
+    # Beide Stationen haben danach dieselbe Fassung
+    assert a.get_interview_by_id(a_id) == dict(b.get_interview_by_id(b_id), id=a_id)
+    # Weitere Änderungen laufen wieder ohne Konflikt
+    b.update_interview_transcription(b_id, 'Ich sah einen Uhu und einen Storch')
+    to_b, to_a = sync.sync_stores(a, b)
+    assert (to_b['conflicts'], to_a['conflicts'], to_a['updated']) == (0, 0, 1)
+    assert len(sync.conflicts(a) + sync.conflicts(b)) == 1
+
+
+def test_rejects_own_file(stations):
+    a, _ = stations
+    buffer = io.StringIO()
+    sync.export_delta(a, buffer)
+    buffer.seek(0)
+    with pytest.raises(ValueError):
+        sync.import_delta(a, buffer)